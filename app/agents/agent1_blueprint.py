@@ -4,13 +4,15 @@ Fixes the missing _create_workflow_steps_in_db method and ensures database compa
 """
 
 import asyncio
+import hashlib
 import json
 import logging
+import mmap
 import time
 import os
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Union
 
 import PyPDF2
 import pytesseract
@@ -27,6 +29,36 @@ from app.database.database_manager import get_testing_db
 
 logger = logging.getLogger(__name__)
 
+# Blueprint fields tied to one task run; stripped before a blueprint is cached as a plan template
+_PER_RUN_BLUEPRINT_KEYS = ("seq_id", "generated_at", "folder_structure")
+
+# Documents arrive as any bytes-like buffer (used in place) or a file path (memory-mapped, never read whole)
+DocumentInput = Union[bytes, bytearray, memoryview, str, Path]
+ScreenshotInput = Union[bytes, memoryview]
+
+
+def document_size(document_content: DocumentInput) -> int:
+    """Size in bytes of a document buffer or file path without loading it"""
+    if isinstance(document_content, (str, Path)):
+        return os.path.getsize(document_content)
+    return memoryview(document_content).nbytes
+
+
+def plan_cache_key(document_content: Union[bytes, memoryview], screenshots: List[ScreenshotInput],
+                   instruction: str, platform: str) -> str:
+    """Hash the blueprint inputs into a plan cache key (length-prefixed so fields can't run together)"""
+    digest = hashlib.sha256()
+    for part in (instruction.encode('utf-8'), platform.encode('utf-8'), document_content, *screenshots):
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def blueprint_template(blueprint: Dict[str, Any]) -> Dict[str, Any]:
+    """Generalize a blueprint into a reusable plan by dropping its per-run fields"""
+    return {key: value for key, value in blueprint.items() if key not in _PER_RUN_BLUEPRINT_KEYS}
+
+
 class UpdatedAgent1_BlueprintGenerator:
     """Agent 1: Blueprint Generation - COMPLETE with all methods"""
     
@@ -41,8 +73,8 @@ class UpdatedAgent1_BlueprintGenerator:
     
     async def process_and_generate_blueprint(
         self, 
-        document_content: bytes, 
-        screenshots: List[bytes], 
+        document_content: DocumentInput, 
+        screenshots: List[ScreenshotInput], 
         instruction: str, 
         platform: str, 
         additional_data: Dict[str, Any] = None
@@ -52,7 +84,7 @@ class UpdatedAgent1_BlueprintGenerator:
         start_time = time.time()
         
         logger.info(f"🔵 [Agent1] Starting blueprint generation")
-        logger.info(f"🔵 [Agent1] Document size: {len(document_content)} bytes")
+        logger.info(f"🔵 [Agent1] Document size: {document_size(document_content)} bytes")
         logger.info(f"🔵 [Agent1] Screenshots: {len(screenshots)} images")
         logger.info(f"🔵 [Agent1] Instruction: {instruction}")
         logger.info(f"🔵 [Agent1] Platform: {platform}")
@@ -89,66 +121,87 @@ class UpdatedAgent1_BlueprintGenerator:
                 seq_id, instruction, platform, text_content, ui_elements
             )
             
-            # STEP 5: Save blueprint to agent1/blueprint.json
-            blueprint_path = agent1_path / "blueprint.json"
-            with open(blueprint_path, 'w', encoding='utf-8') as f:
-                json.dump(blueprint, f, indent=2, ensure_ascii=False)
-            
-            # Save file metadata to database
-            await self.db_manager.save_generated_file(
-                seq_id=seq_id,
-                agent_name=self.agent_name,
-                file_name="blueprint.json",
-                file_path=str(blueprint_path),
-                file_type="blueprint",
-                version=1
-            )
-            
-            # STEP 6: Create workflow steps in database (FIXED METHOD)
-            await self._create_workflow_steps_in_db(seq_id, blueprint.get("steps", []))
-            
-            # STEP 7: Initialize SQLite database in task folder
-            task_db_path = base_path / "sqlite_db.sqlite"
-            await self._initialize_task_database(task_db_path, seq_id)
-            
-            await self.db_manager.update_task_progress(seq_id, blueprint_generated=True)
-            await self.db_manager.update_task_status(seq_id, "blueprint_completed", "agent1")
+            # STEP 5-7: Save blueprint, workflow steps and task database
+            blueprint_path, task_db_path = await self._persist_blueprint(seq_id, base_path, blueprint)
             
             processing_time = time.time() - start_time
             confidence = self._calculate_confidence(text_content, ui_elements, blueprint)
             
-            logger.info(f"🔵 [Agent1] Blueprint saved to {blueprint_path}")
-            logger.info(f"🔵 [Agent1] Task database initialized: {task_db_path}")
             logger.info(f"🔵 [Agent1] ✅ Blueprint generation completed")
             logger.info(f"🔵 [Agent1] Blueprint confidence: {confidence:.2f}")
             logger.info(f"🔵 [Agent1] Automation steps: {len(blueprint.get('steps', []))}")
             
+            return self._blueprint_result(
+                seq_id, base_path, blueprint_path, task_db_path, blueprint,
+                text_extracted=len(text_content),
+                confidence=confidence,
+                processing_time=processing_time
+            )
+            
+        except Exception as e:
+            error_msg = f"Blueprint generation failed: {str(e)}"
+            logger.error(f"🔴 [Agent1] {error_msg}")
+            
+            if 'seq_id' in locals():
+                await self.db_manager.update_task_status(seq_id, "failed", "agent1")
+            
             return {
-                "success": True,
-                "seq_id": seq_id,
+                "success": False,
+                "error": error_msg,
                 "agent": self.agent_name,
-                "base_path": str(base_path),
-                "agent1_path": str(agent1_path),
-                "blueprint_path": str(blueprint_path),
-                "sqlite_db_path": str(task_db_path),
-                "text_extracted": len(text_content),
-                "ui_elements": len(ui_elements),
-                "blueprint_confidence": confidence,
-                "automation_steps": len(blueprint.get("steps", [])),
-                "platform": platform,
-                "processing_time": processing_time,
-                "blueprint": blueprint,
-                "folder_structure": {
-                    "base": str(base_path),
-                    "agent1": str(agent1_path),
-                    "agent2": str(base_path / "agent2"),
-                    "agent3_testing": str(base_path / "agent3"),
-                    "agent4": str(base_path / "agent4")
-                }
+                "processing_time": time.time() - start_time
+            }
+    
+    async def adapt_cached_blueprint(
+        self,
+        cached_plan: Dict[str, Any],
+        instruction: str,
+        platform: str,
+        additional_data: Dict[str, Any] = None,
+        screenshots: List[ScreenshotInput] = None
+    ) -> Dict[str, Any]:
+        """Create a new task from a cached plan template, skipping text extraction and OCR"""
+        
+        start_time = time.time()
+        logger.info(f"🔵 [Agent1] Adapting cached blueprint plan")
+        
+        try:
+            seq_id = await self.db_manager.create_task(
+                instruction=instruction,
+                platform=platform,
+                additional_data=additional_data or {}
+            )
+            
+            base_path = Path(f"generated_code/{seq_id}")
+            agent1_path = base_path / "agent1"
+            agent1_path.mkdir(parents=True, exist_ok=True)
+            await self.db_manager.update_task_status(seq_id, "processing", "agent1")
+            
+            # Same task artifacts as a cache miss; only the OCR pass is skipped
+            self._save_screenshots(screenshots or [], agent1_path)
+            
+            # Substitute the per-run fields back into the template
+            blueprint = {
+                **cached_plan["blueprint"],
+                "seq_id": seq_id,
+                "generated_at": datetime.utcnow().isoformat(),
+                "folder_structure": self._blueprint_folders(seq_id)
             }
+            blueprint_path, task_db_path = await self._persist_blueprint(seq_id, base_path, blueprint)
+            
+            logger.info(f"🔵 [Agent1] ✅ Cached blueprint adapted for task {seq_id}")
+            
+            result = self._blueprint_result(
+                seq_id, base_path, blueprint_path, task_db_path, blueprint,
+                text_extracted=cached_plan.get("text_extracted", 0),
+                confidence=cached_plan.get("blueprint_confidence", 0.0),
+                processing_time=time.time() - start_time
+            )
+            result["plan_cache_hit"] = True
+            return result
             
         except Exception as e:
-            error_msg = f"Blueprint generation failed: {str(e)}"
+            error_msg = f"Cached blueprint adaptation failed: {str(e)}"
             logger.error(f"🔴 [Agent1] {error_msg}")
             
             if 'seq_id' in locals():
@@ -161,12 +214,95 @@ class UpdatedAgent1_BlueprintGenerator:
                 "processing_time": time.time() - start_time
             }
     
-    async def _extract_text_content(self, document_content: bytes) -> str:
+    async def _persist_blueprint(self, seq_id: int, base_path: Path, blueprint: Dict[str, Any]):
+        """Save blueprint.json, its workflow steps and the task database; returns both paths"""
+        blueprint_path = base_path / "agent1" / "blueprint.json"
+        with open(blueprint_path, 'w', encoding='utf-8') as f:
+            json.dump(blueprint, f, indent=2, ensure_ascii=False)
+        
+        # Save file metadata to database
+        await self.db_manager.save_generated_file(
+            seq_id=seq_id,
+            agent_name=self.agent_name,
+            file_name="blueprint.json",
+            file_path=str(blueprint_path),
+            file_type="blueprint",
+            version=1
+        )
+        
+        # Create workflow steps in database (FIXED METHOD)
+        await self._create_workflow_steps_in_db(seq_id, blueprint.get("steps", []))
+        
+        # Initialize SQLite database in task folder
+        task_db_path = base_path / "sqlite_db.sqlite"
+        await self._initialize_task_database(task_db_path, seq_id)
+        
+        await self.db_manager.update_task_progress(seq_id, blueprint_generated=True)
+        await self.db_manager.update_task_status(seq_id, "blueprint_completed", "agent1")
+        
+        logger.info(f"🔵 [Agent1] Blueprint saved to {blueprint_path}")
+        logger.info(f"🔵 [Agent1] Task database initialized: {task_db_path}")
+        return blueprint_path, task_db_path
+    
+    def _blueprint_result(
+        self,
+        seq_id: int,
+        base_path: Path,
+        blueprint_path: Path,
+        task_db_path: Path,
+        blueprint: Dict[str, Any],
+        text_extracted: int,
+        confidence: float,
+        processing_time: float
+    ) -> Dict[str, Any]:
+        """Build the Agent 1 result handed to the orchestrators"""
+        agent1_path = base_path / "agent1"
+        return {
+            "success": True,
+            "seq_id": seq_id,
+            "agent": self.agent_name,
+            "base_path": str(base_path),
+            "agent1_path": str(agent1_path),
+            "blueprint_path": str(blueprint_path),
+            "sqlite_db_path": str(task_db_path),
+            "text_extracted": text_extracted,
+            "ui_elements": len(blueprint.get("ui_elements", [])),
+            "blueprint_confidence": confidence,
+            "automation_steps": len(blueprint.get("steps", [])),
+            "platform": blueprint.get("platform"),
+            "processing_time": processing_time,
+            "blueprint": blueprint,
+            "folder_structure": {
+                "base": str(base_path),
+                "agent1": str(agent1_path),
+                "agent2": str(base_path / "agent2"),
+                "agent3_testing": str(base_path / "agent3"),
+                "agent4": str(base_path / "agent4")
+            }
+        }
+    
+    def _blueprint_folders(self, seq_id: int) -> Dict[str, str]:
+        """Per-task folder layout recorded inside the blueprint"""
+        return {
+            "agent2_folder": f"generated_code/{seq_id}/agent2",
+            "agent3_testing": f"generated_code/{seq_id}/agent3", 
+            "agent4_folder": f"generated_code/{seq_id}/agent4"
+        }
+    
+    async def _extract_text_content(self, document_content: DocumentInput) -> str:
         """Extract text from document content"""
+        if isinstance(document_content, (str, Path)):
+            # Map the file read-only; PyPDF2/PIL read the mapping as a stream instead of a copied buffer
+            with open(document_content, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return await self._extract_text_content(b"")
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return await self._extract_text_content(mapped)
+        
         try:
             # Try PDF extraction first
-            if document_content.startswith(b'%PDF'):
-                pdf_reader = PyPDF2.PdfReader(io.BytesIO(document_content))
+            if document_content[:4] == b'%PDF':
+                pdf_reader = PyPDF2.PdfReader(self._document_stream(document_content))
                 text_content = ""
                 for page in pdf_reader.pages:
                     text_content += page.extract_text()
@@ -175,7 +311,7 @@ class UpdatedAgent1_BlueprintGenerator:
             
             # Try as image with OCR
             try:
-                image = Image.open(io.BytesIO(document_content))
+                image = Image.open(self._document_stream(document_content))
                 text_content = pytesseract.image_to_string(image)
                 if text_content.strip():
                     return text_content.strip()
@@ -184,33 +320,33 @@ class UpdatedAgent1_BlueprintGenerator:
             
             # Try as text
             try:
-                text_content = document_content.decode('utf-8', errors='ignore')
+                text_content = str(document_content, 'utf-8', 'ignore')
                 if text_content.strip():
                     return text_content.strip()
             except:
                 pass
             
-            return f"Document content for automation task. Size: {len(document_content)} bytes"
+            return f"Document content for automation task. Size: {document_size(document_content)} bytes"
             
         except Exception as e:
             logger.warning(f"🔵 [Agent1] Text extraction failed: {str(e)}")
-            return f"Text extraction failed, but document received: {len(document_content)} bytes"
+            return f"Text extraction failed, but document received: {document_size(document_content)} bytes"
     
-    async def _process_screenshots(self, screenshots: List[bytes], agent1_path: Path) -> List[Dict[str, Any]]:
+    def _document_stream(self, document_content: Union[bytes, bytearray, memoryview, mmap.mmap]):
+        """File-like view over a document buffer (an mmap is already one, rewound for each reader)"""
+        if isinstance(document_content, mmap.mmap):
+            document_content.seek(0)
+            return document_content
+        return io.BytesIO(document_content)
+    
+    async def _process_screenshots(self, screenshots: List[ScreenshotInput], agent1_path: Path) -> List[Dict[str, Any]]:
         """Process screenshots and identify UI elements"""
         ui_elements = []
         
-        # Create screenshots folder in agent1
-        screenshots_dir = agent1_path / "screenshots"
-        screenshots_dir.mkdir(exist_ok=True)
+        self._save_screenshots(screenshots, agent1_path)
         
         for i, screenshot_bytes in enumerate(screenshots):
             try:
-                # Save screenshot
-                screenshot_path = screenshots_dir / f"screenshot_{i+1}.png"
-                with open(screenshot_path, 'wb') as f:
-                    f.write(screenshot_bytes)
-                
                 # Perform OCR
                 image = Image.open(io.BytesIO(screenshot_bytes))
                 ocr_text = pytesseract.image_to_string(image)
@@ -226,6 +362,18 @@ class UpdatedAgent1_BlueprintGenerator:
         
         return ui_elements
     
+    def _save_screenshots(self, screenshots: List[ScreenshotInput], agent1_path: Path):
+        """Save input screenshots to agent1/screenshots as screenshot_<n>.png"""
+        screenshots_dir = agent1_path / "screenshots"
+        screenshots_dir.mkdir(exist_ok=True)
+        
+        for i, screenshot_bytes in enumerate(screenshots):
+            try:
+                with open(screenshots_dir / f"screenshot_{i+1}.png", 'wb') as f:
+                    f.write(screenshot_bytes)
+            except Exception as e:
+                logger.warning(f"🔵 [Agent1] Screenshot {i+1} save failed: {str(e)}")
+    
     def _identify_ui_elements(self, ocr_text: str, source: str) -> List[Dict[str, Any]]:
         """Identify UI elements from OCR text"""
         elements = []
@@ -310,11 +458,7 @@ class UpdatedAgent1_BlueprintGenerator:
             "requirements": self._generate_requirements(platform, task_category),
             "generated_at": datetime.utcnow().isoformat(),
             "agent": self.agent_name,
-            "folder_structure": {
-                "agent2_folder": f"generated_code/{seq_id}/agent2",
-                "agent3_testing": f"generated_code/{seq_id}/agent3", 
-                "agent4_folder": f"generated_code/{seq_id}/agent4"
-            }
+            "folder_structure": self._blueprint_folders(seq_id)
         }
         
         return blueprint
@@ -502,10 +646,9 @@ class UpdatedAgent1_BlueprintGenerator:
         # This allows each task to have its own portable database
         task_db_path.parent.mkdir(parents=True, exist_ok=True)
         
-        # Copy main database to task folder (simplified approach)
-        import shutil
-        if Path("sqlite_db.sqlite").exists():
-            shutil.copy2("sqlite_db.sqlite", str(task_db_path))
+        # Snapshot main database into task folder (backup API also captures WAL contents)
+        if Path(self.db_manager.db_path).exists():
+            await self.db_manager.backup_to(str(task_db_path))
             logger.info(f"🔵 [Agent1] Task database created: {task_db_path}")
         else:
             # Create new database with same schema
@@ -12,7 +12,6 @@ from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 import shutil
-import aiosqlite
 
 
 # Import the updated database manager
@@ -23,6 +22,9 @@ logger = logging.getLogger(__name__)
 class UpdatedAgent4_FinalReporter:
     """Agent 4: Final Reporting and CSV Export with Conversation Logs"""
     
+    # Report reads Agent 3's test executions/environment, so it must run after testing
+    requires_agent3_output = True
+    
     def __init__(self):
         self.agent_name = "agent4"
         self.db_manager = None
@@ -144,30 +146,14 @@ class UpdatedAgent4_FinalReporter:
         workflow_steps = await self.db_manager.get_workflow_steps(seq_id)
         
         # Get agent communications
-        communications = []
-        async with aiosqlite.connect(self.db_manager.db_path) as db:
-            cursor = await db.execute("""
-                SELECT * FROM agent_communications WHERE seq_id = ? ORDER BY created_at
-            """, (seq_id,))
-            
-            rows = await cursor.fetchall()
-            columns = [description[0] for description in cursor.description]
-            communications = [dict(zip(columns, row)) for row in rows]
+        communications = await self.db_manager.get_agent_communications(seq_id)
         
         # Get test executions
-        test_executions = []
-        async with aiosqlite.connect(self.db_manager.db_path) as db:
-            cursor = await db.execute("""
-                SELECT * FROM test_executions WHERE seq_id = ? ORDER BY created_at
-            """, (seq_id,))
-            
-            rows = await cursor.fetchall()
-            columns = [description[0] for description in cursor.description]
-            test_executions = [dict(zip(columns, row)) for row in rows]
+        test_executions = await self.db_manager.get_test_executions(seq_id)
         
         # Get generated files
         generated_files = []
-        async with aiosqlite.connect(self.db_manager.db_path) as db:
+        async with self.db_manager.acquire() as db:
             cursor = await db.execute("""
                 SELECT * FROM generated_files WHERE seq_id = ? ORDER BY created_at
             """, (seq_id,))
@@ -178,7 +164,7 @@ class UpdatedAgent4_FinalReporter:
         
         # Get testing environment info
         testing_env = []
-        async with aiosqlite.connect(self.db_manager.db_path) as db:
+        async with self.db_manager.acquire() as db:
             cursor = await db.execute("""
                 SELECT * FROM testing_environments WHERE seq_id = ?
             """, (seq_id,))
@@ -500,15 +486,7 @@ End of Report - Generated by {self.agent_name}
         
         try:
             # Get all communications
-            communications = []
-            async with aiosqlite.connect(self.db_manager.db_path) as db:
-                cursor = await db.execute("""
-                    SELECT * FROM agent_communications WHERE seq_id = ? ORDER BY created_at
-                """, (seq_id,))
-                
-                rows = await cursor.fetchall()
-                columns = [description[0] for description in cursor.description]
-                communications = [dict(zip(columns, row)) for row in rows]
+            communications = await self.db_manager.get_agent_communications(seq_id)
             
             # Format conversation log
             conversation_log = {
@@ -8,21 +8,28 @@ import sqlite3
 import asyncio
 import aiosqlite
 import json
+import orjson
 import logging
+import os
+import zlib
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Any, AsyncIterator
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
 # Updated Database Schema SQL
 DATABASE_SCHEMA = """
+-- Larger pages for fresh databases (no-op once the file has tables)
+PRAGMA page_size = 16384;
+
 -- Main tasks table with sequential IDs
 CREATE TABLE IF NOT EXISTS automation_tasks (
     seq_id INTEGER PRIMARY KEY AUTOINCREMENT,
     instruction TEXT NOT NULL,
     platform TEXT DEFAULT 'auto-detect',
-    additional_data TEXT DEFAULT '{}',
+    additional_data BLOB DEFAULT (x'7b7d'), -- orjson-encoded, '{}' by default
     status TEXT DEFAULT 'pending',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -120,8 +127,16 @@ CREATE TABLE IF NOT EXISTS test_executions (
     FOREIGN KEY (step_id) REFERENCES workflow_steps(step_id)
 );
 
+-- Generalized Agent 1 blueprints keyed by a hash of instruction, platform, document and screenshots
+CREATE TABLE IF NOT EXISTS plan_cache (
+    cache_key TEXT PRIMARY KEY,
+    blueprint BLOB NOT NULL, -- orjson-encoded blueprint template
+    blueprint_confidence REAL DEFAULT 0.0,
+    text_extracted INTEGER DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Indexes for performance
-CREATE INDEX IF NOT EXISTS idx_tasks_seq_id ON automation_tasks(seq_id);
 CREATE INDEX IF NOT EXISTS idx_tasks_status ON automation_tasks(status);
 CREATE INDEX IF NOT EXISTS idx_steps_seq_id ON workflow_steps(seq_id);
 CREATE INDEX IF NOT EXISTS idx_steps_status ON workflow_steps(status);
@@ -129,8 +144,131 @@ CREATE INDEX IF NOT EXISTS idx_comms_seq_id ON agent_communications(seq_id);
 CREATE INDEX IF NOT EXISTS idx_files_seq_id ON generated_files(seq_id);
 CREATE INDEX IF NOT EXISTS idx_envs_seq_id ON testing_environments(seq_id);
 CREATE INDEX IF NOT EXISTS idx_execs_seq_id ON test_executions(seq_id);
+
+-- Composite indexes for the hot lookup predicates
+CREATE INDEX IF NOT EXISTS idx_steps_seq_order ON workflow_steps(seq_id, step_order);
+CREATE INDEX IF NOT EXISTS idx_steps_seq_status_order ON workflow_steps(seq_id, status, step_order);
+CREATE INDEX IF NOT EXISTS idx_files_script_version ON generated_files(seq_id, file_type, is_active, version DESC);
+CREATE INDEX IF NOT EXISTS idx_execs_seq_created ON test_executions(seq_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_comms_seq_created ON agent_communications(seq_id, created_at);
+
+-- Stamp updated_at here instead of in every UPDATE statement
+CREATE TRIGGER IF NOT EXISTS trg_tasks_updated AFTER UPDATE ON automation_tasks
+FOR EACH ROW WHEN NEW.updated_at = OLD.updated_at
+BEGIN
+    UPDATE automation_tasks SET updated_at = CURRENT_TIMESTAMP WHERE seq_id = OLD.seq_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_steps_updated AFTER UPDATE ON workflow_steps
+FOR EACH ROW WHEN NEW.updated_at = OLD.updated_at
+BEGIN
+    UPDATE workflow_steps SET updated_at = CURRENT_TIMESTAMP WHERE step_id = OLD.step_id;
+END;
+"""
+
+# One-shot migrations for databases created by older schema versions
+DATABASE_MIGRATIONS = """
+-- seq_id is the rowid of automation_tasks; a separate index only duplicates it
+DROP INDEX IF EXISTS idx_tasks_seq_id;
 """
 
+# Large free-text columns (OCR dumps, execution output, agent messages) are
+# stored zlib-compressed behind a magic header. Short values and rows written
+# before compression stay plain TEXT, so readers must go through _unpack.
+_PACKED_MAGIC = b"\x00zl1"
+_PACK_MIN_CHARS = 1024
+
+
+def _pack(text: Any) -> Any:
+    """Compress a large string into a tagged BLOB; other values pass through"""
+    if not isinstance(text, str) or len(text) < _PACK_MIN_CHARS:
+        return text
+    return _PACKED_MAGIC + zlib.compress(text.encode('utf-8'))
+
+
+def _unpack(value: Any) -> Any:
+    """Reverse _pack; plain TEXT values pass through unchanged"""
+    if isinstance(value, bytes) and value.startswith(_PACKED_MAGIC):
+        return zlib.decompress(value[len(_PACKED_MAGIC):]).decode('utf-8')
+    return value
+
+
+def _unpack_row(row: aiosqlite.Row, columns) -> Dict:
+    """Convert a row to a dict, decompressing the given packed columns"""
+    record = dict(row)
+    for column in columns:
+        if column in record:
+            record[column] = _unpack(record[column])
+    return record
+
+
+_PACKED_STEP_COLUMNS = ('ocr_validation_text',)
+_PACKED_COMM_COLUMNS = ('message_content', 'response_content')
+_PACKED_EXEC_COLUMNS = ('execution_output', 'error_details', 'ocr_before', 'ocr_after')
+
+# How often the background task refreshes planner statistics
+_OPTIMIZE_INTERVAL_SECONDS = 3600
+
+# Connection pool bounds: connections opened at warm-up / most checked out at once
+_POOL_MIN_SIZE = 5
+_POOL_MAX_SIZE = 20
+
+# Optional columns accepted by the kwargs-driven update methods
+_TASK_PROGRESS_COLUMNS = (
+    'blueprint_generated', 'code_generated', 'testing_completed', 'final_report_generated'
+)
+_STEP_UPDATE_COLUMNS = (
+    'actual_result', 'test_attempt', 'ocr_screenshot_path',
+    'ocr_validation_text', 'error_message', 'execution_time'
+)
+_ENV_UPDATE_COLUMNS = (
+    'requirements_installed', 'appium_server_running',
+    'playwright_installed', 'setup_status', 'setup_error'
+)
+
+# O(1) membership checks for filtering incoming kwargs
+_TASK_PROGRESS_COLS = frozenset(_TASK_PROGRESS_COLUMNS)
+_STEP_UPDATE_COLS = frozenset(_STEP_UPDATE_COLUMNS)
+_ENV_COLS = frozenset(_ENV_UPDATE_COLUMNS)
+
+
+def _coalesce_assignments(columns) -> str:
+    """SET clause where a NULL parameter keeps the column's current value"""
+    return ", ".join(f"{column} = COALESCE(?, {column})" for column in columns)
+
+
+# One fixed statement per update method, whatever subset of kwargs is passed
+_UPDATE_TASK_PROGRESS_SQL = (
+    f"UPDATE automation_tasks SET {_coalesce_assignments(_TASK_PROGRESS_COLUMNS)} "
+    "WHERE seq_id = ?"
+)
+_UPDATE_STEP_STATUS_SQL = (
+    f"UPDATE workflow_steps SET status = ?, {_coalesce_assignments(_STEP_UPDATE_COLUMNS)} "
+    "WHERE step_id = ?"
+)
+_UPDATE_TESTING_ENV_SQL = (
+    f"UPDATE testing_environments SET {_coalesce_assignments(_ENV_UPDATE_COLUMNS)} "
+    "WHERE seq_id = ?"
+)
+
+# CSV export queries - fixed strings so SQLite's statement cache is reused
+_EXPORT_TASK_SQL = (
+    "SELECT seq_id, instruction, platform, status, created_at "
+    "FROM automation_tasks WHERE seq_id = ?"
+)
+_EXPORT_STEPS_SQL = (
+    "SELECT step_id, step_name, action_type, status, test_attempt, execution_time "
+    "FROM workflow_steps WHERE seq_id = ? ORDER BY step_order"
+)
+_EXPORT_COMMS_SQL = (
+    "SELECT from_agent, to_agent, message_type, status, created_at "
+    "FROM agent_communications WHERE seq_id = ? ORDER BY created_at"
+)
+_EXPORT_EXECS_SQL = (
+    "SELECT script_version, execution_attempt, success, execution_duration, created_at "
+    "FROM test_executions WHERE seq_id = ? ORDER BY created_at"
+)
+
 
 class TestingDatabaseManager:
     """Enhanced database manager for testing environment workflow - FIXED VERSION"""
@@ -138,36 +276,120 @@ class TestingDatabaseManager:
     def __init__(self, db_path: str = "sqlite_db.sqlite"):
         self.db_path = db_path
         self.initialized = False
+        self._init_event = asyncio.Event()
+        self._init_lock = asyncio.Lock()
+        self._latest_version_cache: Dict[int, int] = {}
+        self._optimize_task: Optional[asyncio.Task] = None
+        self._pool: asyncio.Queue = asyncio.Queue()
+        self._pool_slots = asyncio.Semaphore(_POOL_MAX_SIZE)
     
     async def initialize(self):
-        """Initialize database with testing schema"""
-        if self.initialized:
+        """Initialize database with testing schema (runs once, even under concurrent first use)"""
+        if self._init_event.is_set():
             return
-            
-        logger.info(f"🗄️ Initializing testing database: {self.db_path}")
-        
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.executescript(DATABASE_SCHEMA)
-            await db.commit()
-        
-        self.initialized = True
-        logger.info("✅ Testing database initialized")
+
+        async with self._init_lock:
+            if self._init_event.is_set():
+                return
+
+            logger.info("🗄️ Initializing testing database: %s", self.db_path)
+
+            async with aiosqlite.connect(self.db_path) as db:
+                # Schema first: its page_size pragma only applies before the header is written
+                await db.executescript(DATABASE_SCHEMA)
+                # WAL lets pooled readers run alongside the writer; persisted in the file
+                await db.execute("PRAGMA journal_mode = WAL")
+                await db.executescript(DATABASE_MIGRATIONS)
+                # Give the planner statistics for the very first queries
+                await db.execute("ANALYZE automation_tasks")
+                await db.execute("ANALYZE workflow_steps")
+                await db.commit()
+
+            for _ in range(_POOL_MIN_SIZE):
+                self._pool.put_nowait(await self._open_connection())
+
+            self._optimize_task = asyncio.create_task(self._optimize_periodically())
+            self.initialized = True
+            self._init_event.set()
+            logger.info("✅ Testing database initialized")
+
+    async def optimize(self):
+        """Let SQLite refresh stale planner statistics (usually a no-op)"""
+        async with self.acquire() as db:
+            await db.execute("PRAGMA optimize")
+
+    async def _optimize_periodically(self):
+        """Run PRAGMA optimize on a fixed interval for long-lived processes"""
+        while True:
+            await asyncio.sleep(_OPTIMIZE_INTERVAL_SECONDS)
+            try:
+                await self.optimize()
+            except Exception as e:
+                logger.warning("⚠️ PRAGMA optimize failed: %s", e)
+
+    async def close(self):
+        """Stop background maintenance, optimize and close pooled connections"""
+        if self._optimize_task is not None:
+            self._optimize_task.cancel()
+            self._optimize_task = None
+
+        if self._init_event.is_set():
+            await self.optimize()
+            while not self._pool.empty():
+                await self._pool.get_nowait().close()
+            logger.info("🔒 Testing database closed")
+
+    async def _open_connection(self) -> aiosqlite.Connection:
+        """Open a pooled connection with per-connection pragmas applied"""
+        db = await aiosqlite.connect(self.db_path)
+        db.row_factory = aiosqlite.Row
+        # Safe with WAL: a crash can lose the last commits but never corrupts the file
+        await db.execute("PRAGMA synchronous = NORMAL")
+        return db
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Borrow a pooled connection, creating the schema on first use"""
+        if not self._init_event.is_set():
+            await self.initialize()
+
+        async with self._pool_slots:
+            try:
+                db = self._pool.get_nowait()
+            except asyncio.QueueEmpty:
+                db = await self._open_connection()
+
+            try:
+                yield db
+            finally:
+                try:
+                    # Never hand the next borrower a half-finished transaction
+                    if db.in_transaction:
+                        await db.rollback()
+                    self._pool.put_nowait(db)
+                except Exception as e:
+                    logger.warning("⚠️ Dropping broken pooled connection: %s", e)
+                    await db.close()
+
+    async def backup_to(self, target_path: str):
+        """Copy the database (including WAL contents) to target_path"""
+        if not self._init_event.is_set():
+            await self.initialize()
+        await asyncio.to_thread(_backup_sync, self.db_path, target_path)
     
     async def create_task(self, instruction: str, platform: str = "auto-detect", 
                          additional_data: Dict = None) -> int:
         """Create new automation task and return sequential ID"""
-        await self.initialize()
-        
         base_path = "generated_code"
-        additional_data_str = json.dumps(additional_data or {})
+        additional_data_blob = orjson.dumps(additional_data or {})
         
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.acquire() as db:
             cursor = await db.execute(
                 """
                 INSERT INTO automation_tasks (instruction, platform, additional_data, base_path)
                 VALUES (?, ?, ?, ?)
                 """,
-                (instruction, platform, additional_data_str, base_path)
+                (instruction, platform, additional_data_blob, base_path)
             )
             seq_id = cursor.lastrowid
             await db.commit()
@@ -179,19 +401,17 @@ class TestingDatabaseManager:
             )
             await db.commit()
         
-        logger.info(f"📝 Created task {seq_id}: {instruction[:50]}...")
+        logger.info("📝 Created task %s: %.50s...", seq_id, instruction)
         return seq_id
     
     async def update_task_status(self, seq_id: int, status: str, current_agent: str = None):
         """Update task status and current agent"""
-        await self.initialize()
-        
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.acquire() as db:
             if current_agent:
                 await db.execute(
                     """
                     UPDATE automation_tasks 
-                    SET status = ?, current_agent = ?, updated_at = CURRENT_TIMESTAMP 
+                    SET status = ?, current_agent = ?
                     WHERE seq_id = ?
                     """,
                     (status, current_agent, seq_id)
@@ -200,79 +420,99 @@ class TestingDatabaseManager:
                 await db.execute(
                     """
                     UPDATE automation_tasks 
-                    SET status = ?, updated_at = CURRENT_TIMESTAMP 
+                    SET status = ?
                     WHERE seq_id = ?
                     """,
                     (status, seq_id)
                 )
             await db.commit()
     
+    async def finalize_task(self, seq_id: int, status: str, current_agent: str = None, **progress):
+        """Write terminal status and progress flags in a single transaction"""
+        values = {key: value for key, value in progress.items() if key in _TASK_PROGRESS_COLS}
+        
+        async with self.acquire() as db:
+            await db.execute(
+                """
+                UPDATE automation_tasks 
+                SET status = ?, current_agent = COALESCE(?, current_agent)
+                WHERE seq_id = ?
+                """,
+                (status, current_agent, seq_id)
+            )
+            if values:
+                params = [values.get(column) for column in _TASK_PROGRESS_COLUMNS]
+                params.append(seq_id)
+                await db.execute(_UPDATE_TASK_PROGRESS_SQL, params)
+            await db.commit()
+    
     async def update_task_progress(self, seq_id: int, **kwargs):
         """Update task progress flags"""
-        await self.initialize()
-        
-        updates = []
-        params = []
+        values = {key: value for key, value in kwargs.items() if key in _TASK_PROGRESS_COLS}
         
-        for key, value in kwargs.items():
-            if key in ['blueprint_generated', 'code_generated', 'testing_completed', 'final_report_generated']:
-                updates.append(f"{key} = ?")
-                params.append(value)
-        
-        if updates:
+        if values:
+            params = [values.get(column) for column in _TASK_PROGRESS_COLUMNS]
             params.append(seq_id)
-            sql = f"UPDATE automation_tasks SET {', '.join(updates)}, updated_at = CURRENT_TIMESTAMP WHERE seq_id = ?"
             
-            async with aiosqlite.connect(self.db_path) as db:
-                await db.execute(sql, params)
+            async with self.acquire() as db:
+                await db.execute(_UPDATE_TASK_PROGRESS_SQL, params)
                 await db.commit()
     
     async def create_workflow_steps(self, seq_id: int, agent_name: str, steps: List[Dict]) -> List[int]:
         """Create workflow steps for task"""
-        await self.initialize()
-        
-        step_ids = []
-        
-        async with aiosqlite.connect(self.db_path) as db:
-            for i, step_data in enumerate(steps):
-                cursor = await db.execute(
-                    """
-                    INSERT INTO workflow_steps 
-                    (seq_id, agent_name, step_name, step_order, action_type, expected_result)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        seq_id, agent_name,
-                        step_data.get('step_name', f"Step {i+1}"),
-                        i+1,
-                        step_data.get('action_type', 'action'),
-                        step_data.get('expected_result', 'Success')
-                    )
-                )
-                step_ids.append(cursor.lastrowid)
+        if not steps:
+            return []
+
+        payload = json.dumps([
+            {
+                "step_name": step_data.get('step_name', f"Step {i+1}"),
+                "step_order": i+1,
+                "action_type": step_data.get('action_type', 'action'),
+                "expected_result": step_data.get('expected_result', 'Success')
+            }
+            for i, step_data in enumerate(steps)
+        ])
+
+        async with self.acquire() as db:
+            # Single statement: SQLite explodes the JSON array via json_each
+            await db.execute(
+                """
+                INSERT INTO workflow_steps
+                (seq_id, agent_name, step_name, step_order, action_type, expected_result)
+                SELECT ?, ?,
+                       json_extract(value, '$.step_name'),
+                       json_extract(value, '$.step_order'),
+                       json_extract(value, '$.action_type'),
+                       json_extract(value, '$.expected_result')
+                FROM json_each(?)
+                """,
+                (seq_id, agent_name, payload)
+            )
+
+            # Recover the new step IDs - the last N rows of this task by step_id
+            cursor = await db.execute(
+                "SELECT step_id FROM workflow_steps WHERE seq_id = ? ORDER BY step_id DESC LIMIT ?",
+                (seq_id, len(steps))
+            )
+            step_ids = [row[0] for row in reversed(await cursor.fetchall())]
             await db.commit()
         
-        logger.info(f"📋 Created {len(step_ids)} workflow steps for task {seq_id}")
+        logger.info("📋 Created %d workflow steps for task %s", len(step_ids), seq_id)
         return step_ids
     
     async def update_step_status(self, step_id: int, status: str, **kwargs):
         """Update workflow step status and details"""
-        await self.initialize()
-        
-        updates = ["status = ?", "updated_at = CURRENT_TIMESTAMP"]
-        params = [status]
+        values = {key: value for key, value in kwargs.items() if key in _STEP_UPDATE_COLS}
         
-        for key, value in kwargs.items():
-            if key in ['actual_result', 'test_attempt', 'ocr_screenshot_path', 
-                      'ocr_validation_text', 'error_message', 'execution_time']:
-                updates.append(f"{key} = ?")
-                params.append(value)
+        if 'ocr_validation_text' in values:
+            values['ocr_validation_text'] = _pack(values['ocr_validation_text'])
         
+        params = [status]
+        params.extend(values.get(column) for column in _STEP_UPDATE_COLUMNS)
         params.append(step_id)
-        sql = f"UPDATE workflow_steps SET {', '.join(updates)} WHERE step_id = ?"
         
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(sql, params)
+        async with self.acquire() as db:
+            await db.execute(_UPDATE_STEP_STATUS_SQL, params)
             await db.commit()
     
     # NEW FIXED METHOD - Uses step_order instead of step_number
@@ -289,34 +529,30 @@ class TestingDatabaseManager:
         """Update workflow step status - FIXED to use step_order column instead of step_number"""
         
         try:
-            await self.initialize()
-            
             # Use step_order column (which exists) instead of step_number (which doesn't exist)
             update_query = """
             UPDATE workflow_steps 
             SET 
                 status = ?,
                 execution_time = ?,
-                error_message = ?,
-                updated_at = CURRENT_TIMESTAMP
+                error_message = ?
             WHERE seq_id = ? AND step_order = ?
             """
             
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.acquire() as db:
                 await db.execute(
                     update_query,
                     (status, execution_time, error_details, seq_id, step_number)
                 )
                 await db.commit()
             
-            logger.info(f"📊 Updated workflow step {step_number} status: {status}")
+            logger.info("📊 Updated workflow step %s status: %s", step_number, status)
             return True
             
         except Exception as e:
-            logger.error(f"❌ Failed to update workflow step status: {str(e)}")
+            logger.error("❌ Failed to update workflow step status: %s", e)
             return False
     
-    # NEW FIXED METHOD - Uses existing create_agent_communication
     async def save_agent_communication(
         self,
         seq_id: int,
@@ -326,68 +562,54 @@ class TestingDatabaseManager:
         message_content: str,
         status: str = "sent"
     ) -> Optional[int]:
-        """Save agent-to-agent communication - COMPATIBLE VERSION"""
+        """Save agent-to-agent communication record"""
         
         try:
-            await self.initialize()
-            
-            # Use the existing create_agent_communication method
-            comm_id = await self.create_agent_communication(
-                seq_id, from_agent, to_agent, message_type, message_content
-            )
+            async with self.acquire() as db:
+                cursor = await db.execute(
+                    """
+                    INSERT INTO agent_communications 
+                    (seq_id, from_agent, to_agent, message_type, message_content, status)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    (seq_id, from_agent, to_agent, message_type, _pack(message_content), status)
+                )
+                comm_id = cursor.lastrowid
+                await db.commit()
             
-            logger.info(f"💬 Saved agent communication: {from_agent} -> {to_agent}")
+            logger.info("💬 Agent %s -> %s: %s", from_agent, to_agent, message_type)
             return comm_id
             
         except Exception as e:
-            logger.error(f"❌ Failed to save agent communication: {str(e)}")
+            logger.error("❌ Failed to save agent communication: %s", e)
             return None
     
-    async def create_agent_communication(self, seq_id: int, from_agent: str, to_agent: str,
-                                       message_type: str, message_content: str) -> int:
-        """Create agent communication record"""
-        await self.initialize()
-        
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute(
-                """
-                INSERT INTO agent_communications 
-                (seq_id, from_agent, to_agent, message_type, message_content)
-                VALUES (?, ?, ?, ?, ?)
-                """,
-                (seq_id, from_agent, to_agent, message_type, message_content)
-            )
-            comm_id = cursor.lastrowid
-            await db.commit()
-        
-        logger.info(f"💬 Agent {from_agent} -> {to_agent}: {message_type}")
-        return comm_id
-    
     async def update_communication_response(self, comm_id: int, response_content: str):
         """Update agent communication with response"""
-        await self.initialize()
-        
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.acquire() as db:
             await db.execute(
                 """
                 UPDATE agent_communications 
                 SET response_content = ?, status = 'resolved', resolved_at = CURRENT_TIMESTAMP 
                 WHERE comm_id = ?
                 """,
-                (response_content, comm_id)
+                (_pack(response_content), comm_id)
             )
             await db.commit()
     
     async def save_generated_file(
         self, seq_id: int, agent_name: str, file_name: str, 
-        file_path: str, file_type: str, version: int = 1
+        file_path: str, file_type: str, version: int = 1,
+        file_size: Optional[int] = None
     ) -> int:
-        """Save generated file metadata"""
-        await self.initialize()
-        
-        file_size = Path(file_path).stat().st_size if Path(file_path).exists() else 0
-        
-        async with aiosqlite.connect(self.db_path) as db:
+        """Save generated file metadata (pass file_size to skip the stat call)"""
+        if file_size is None:
+            try:
+                file_size = os.stat(file_path).st_size
+            except OSError:
+                file_size = 0
+        
+        async with self.acquire() as db:
             cursor = await db.execute(
                 """
                 INSERT INTO generated_files 
@@ -399,14 +621,13 @@ class TestingDatabaseManager:
             file_id = cursor.lastrowid
             await db.commit()
         
-        logger.info(f"💾 Saved file {file_name} (v{version}) for task {seq_id}")
+        self._latest_version_cache.pop(seq_id, None)
+        logger.info("💾 Saved file %s (v%s) for task %s", file_name, version, seq_id)
         return file_id
     
     async def create_testing_environment(self, seq_id: int, environment_type: str, venv_path: str) -> int:
         """Create testing environment record"""
-        await self.initialize()
-        
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.acquire() as db:
             cursor = await db.execute(
                 """
                 INSERT INTO testing_environments 
@@ -418,30 +639,19 @@ class TestingDatabaseManager:
             env_id = cursor.lastrowid
             await db.commit()
         
-        logger.info(f"🧪 Created testing environment {environment_type} for task {seq_id}")
+        logger.info("🧪 Created testing environment %s for task %s", environment_type, seq_id)
         return env_id
     
     async def update_testing_environment(self, seq_id: int, **kwargs):
         """Update testing environment status"""
-        await self.initialize()
-        
-        updates = []
-        params = []
+        values = {key: value for key, value in kwargs.items() if key in _ENV_COLS}
         
-        for key, value in kwargs.items():
-            if key in [
-                'requirements_installed', 'appium_server_running', 
-                'playwright_installed', 'setup_status', 'setup_error'
-            ]:
-                updates.append(f"{key} = ?")
-                params.append(value)
-        
-        if updates:
+        if values:
+            params = [values.get(column) for column in _ENV_UPDATE_COLUMNS]
             params.append(seq_id)
-            sql = f"UPDATE testing_environments SET {', '.join(updates)} WHERE seq_id = ?"
             
-            async with aiosqlite.connect(self.db_path) as db:
-                await db.execute(sql, params)
+            async with self.acquire() as db:
+                await db.execute(_UPDATE_TESTING_ENV_SQL, params)
                 await db.commit()
     
     async def save_test_execution(
@@ -449,9 +659,7 @@ class TestingDatabaseManager:
         success: bool, **kwargs
     ) -> int:
         """Save test execution result"""
-        await self.initialize()
-        
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.acquire() as db:
             cursor = await db.execute(
                 """
                 INSERT INTO test_executions 
@@ -463,42 +671,45 @@ class TestingDatabaseManager:
                 """,
                 (
                     seq_id, script_version, execution_attempt, success,
-                    kwargs.get('execution_output', ''),
-                    kwargs.get('error_details', ''),
+                    _pack(kwargs.get('execution_output', '')),
+                    _pack(kwargs.get('error_details', '')),
                     kwargs.get('screenshot_before', ''),
                     kwargs.get('screenshot_after', ''),
-                    kwargs.get('ocr_before', ''),
-                    kwargs.get('ocr_after', ''),
+                    _pack(kwargs.get('ocr_before', '')),
+                    _pack(kwargs.get('ocr_after', '')),
                     kwargs.get('execution_duration', 0.0)
                 )
             )
             exec_id = cursor.lastrowid
             await db.commit()
         
-        status_emoji = "✅" if success else "❌"
-        logger.info(f"🎯 Test execution {status_emoji} - Task {seq_id}, Script v{script_version}, Attempt {execution_attempt}")
+        if logger.isEnabledFor(logging.INFO):
+            status_emoji = "✅" if success else "❌"
+            logger.info(
+                "🎯 Test execution %s - Task %s, Script v%s, Attempt %s",
+                status_emoji, seq_id, script_version, execution_attempt
+            )
         return exec_id
-    
+
     async def get_task_info(self, seq_id: int) -> Optional[Dict]:
-        """Get complete task information"""
-        await self.initialize()
-        
-        async with aiosqlite.connect(self.db_path) as db:
+        """Get complete task information (additional_data decoded to a dict)"""
+        async with self.acquire() as db:
             cursor = await db.execute(
                 "SELECT * FROM automation_tasks WHERE seq_id = ?", (seq_id,)
             )
             row = await cursor.fetchone()
-            
-            if row:
-                columns = [desc[0] for desc in cursor.description]
-                return dict(zip(columns, row))
+        
+        if not row:
             return None
+        
+        task_info = dict(row)
+        # orjson.loads accepts both new BLOB rows and legacy TEXT rows
+        task_info['additional_data'] = orjson.loads(task_info['additional_data'] or b'{}')
+        return task_info
     
     async def get_workflow_steps(self, seq_id: int, status: str = None) -> List[Dict]:
         """Get workflow steps for task"""
-        await self.initialize()
-        
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.acquire() as db:
             if status:
                 cursor = await db.execute(
                     "SELECT * FROM workflow_steps WHERE seq_id = ? AND status = ? ORDER BY step_order",
@@ -511,85 +722,139 @@ class TestingDatabaseManager:
                 )
             
             rows = await cursor.fetchall()
-            columns = [desc[0] for desc in cursor.description]
-            return [dict(zip(columns, row)) for row in rows]
+            return [_unpack_row(row, _PACKED_STEP_COLUMNS) for row in rows]
+    
+    async def get_agent_communications(self, seq_id: int) -> List[Dict]:
+        """Get agent communications for task, oldest first"""
+        async with self.acquire() as db:
+            cursor = await db.execute(
+                "SELECT * FROM agent_communications WHERE seq_id = ? ORDER BY created_at",
+                (seq_id,)
+            )
+            rows = await cursor.fetchall()
+            return [_unpack_row(row, _PACKED_COMM_COLUMNS) for row in rows]
+    
+    async def get_test_executions(self, seq_id: int) -> List[Dict]:
+        """Get test execution results for task, oldest first"""
+        async with self.acquire() as db:
+            cursor = await db.execute(
+                "SELECT * FROM test_executions WHERE seq_id = ? ORDER BY created_at",
+                (seq_id,)
+            )
+            rows = await cursor.fetchall()
+            return [_unpack_row(row, _PACKED_EXEC_COLUMNS) for row in rows]
     
     async def get_latest_script_version(self, seq_id: int) -> int:
-        """Get latest script version number"""
-        await self.initialize()
+        """Get latest script version number (cached until the task saves a new file)"""
+        cached = self._latest_version_cache.get(seq_id)
+        if cached is not None:
+            return cached
         
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.acquire() as db:
+            # Answered from idx_files_script_version without touching table rows
             cursor = await db.execute(
                 """
-                SELECT MAX(version) FROM generated_files 
-                WHERE seq_id = ? AND file_type = 'script' AND is_active = TRUE
+                SELECT version FROM generated_files 
+                WHERE seq_id = ? AND file_type = 'script' AND is_active = 1
+                ORDER BY version DESC LIMIT 1
                 """,
                 (seq_id,)
             )
             result = await cursor.fetchone()
-            return result[0] if result and result[0] else 1
+        
+        version = result[0] if result and result[0] else 1
+        self._latest_version_cache[seq_id] = version
+        return version
     
-    async def export_to_csv(self, seq_id: int, export_path: str):
-        """Export task data to CSV for Agent 4"""
-        await self.initialize()
-        import csv
+    async def get_cached_plan(self, cache_key: str) -> Optional[Dict]:
+        """Get a cached blueprint plan (blueprint decoded to a dict), or None on a miss"""
+        async with self.acquire() as db:
+            cursor = await db.execute(
+                "SELECT * FROM plan_cache WHERE cache_key = ?", (cache_key,)
+            )
+            row = await cursor.fetchone()
         
-        # Get comprehensive data
-        task_info = await self.get_task_info(seq_id)
-        workflow_steps = await self.get_workflow_steps(seq_id)
+        if not row:
+            return None
         
-        async with aiosqlite.connect(self.db_path) as db:
-            # Get communications
-            comm_cursor = await db.execute(
-                "SELECT * FROM agent_communications WHERE seq_id = ? ORDER BY created_at",
-                (seq_id,)
-            )
-            communications = await comm_cursor.fetchall()
-            
-            # Get executions
-            exec_cursor = await db.execute(
-                "SELECT * FROM test_executions WHERE seq_id = ? ORDER BY created_at",
-                (seq_id,)
+        plan = dict(row)
+        plan['blueprint'] = orjson.loads(plan['blueprint'])
+        return plan
+    
+    async def save_cached_plan(self, cache_key: str, blueprint: Dict, 
+                               blueprint_confidence: float = 0.0, text_extracted: int = 0):
+        """Store (or refresh) the blueprint plan for cache_key"""
+        async with self.acquire() as db:
+            await db.execute(
+                """
+                INSERT OR REPLACE INTO plan_cache (cache_key, blueprint, blueprint_confidence, text_extracted)
+                VALUES (?, ?, ?, ?)
+                """,
+                (cache_key, orjson.dumps(blueprint), blueprint_confidence, text_extracted)
             )
-            executions = await exec_cursor.fetchall()
+            await db.commit()
+        
+        logger.info("🗂️ Cached blueprint plan %.12s", cache_key)
+    
+    async def export_to_csv(self, seq_id: int, export_path: str):
+        """Export task data to CSV for Agent 4 (written on a worker thread)"""
+        if not self._init_event.is_set():
+            await self.initialize()
         
-        # Write to CSV
+        await asyncio.to_thread(_write_csv_sync, self.db_path, seq_id, export_path)
+        
+        logger.info("📊 Exported task %s data to %s", seq_id, export_path)
+
+
+def _backup_sync(db_path: str, target_path: str):
+    """Online backup through SQLite's backup API (a raw file copy would miss the WAL)"""
+    source = sqlite3.connect(db_path)
+    target = sqlite3.connect(target_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+def _write_csv_sync(db_path: str, seq_id: int, export_path: str):
+    """Stream task data from a synchronous connection into a CSV file"""
+    import csv
+    
+    conn = sqlite3.connect(db_path)
+    try:
         with open(export_path, 'w', newline='', encoding='utf-8') as csvfile:
             writer = csv.writer(csvfile)
             
+            # All four reads share one consistent snapshot
+            conn.execute("BEGIN")
+            
             # Task summary
             writer.writerow(['=== TASK SUMMARY ==='])
             writer.writerow(['seq_id','instruction','platform','status','created_at'])
-            writer.writerow([
-                task_info['seq_id'], task_info['instruction'], 
-                task_info['platform'], task_info['status'], task_info['created_at']
-            ])
+            writer.writerows(conn.execute(_EXPORT_TASK_SQL, (seq_id,)))
             writer.writerow([])
             
-            # Workflow steps  
+            # Workflow steps
             writer.writerow(['=== WORKFLOW STEPS ==='])
             writer.writerow(['step_id','step_name','action_type','status','test_attempt','execution_time'])
-            for step in workflow_steps:
-                writer.writerow([
-                    step['step_id'], step['step_name'], step['action_type'],
-                    step['status'], step['test_attempt'], step['execution_time']
-                ])
+            writer.writerows(conn.execute(_EXPORT_STEPS_SQL, (seq_id,)))
             writer.writerow([])
             
             # Agent communications
             writer.writerow(['=== AGENT COMMUNICATIONS ==='])
             writer.writerow(['from_agent','to_agent','message_type','status','created_at'])
-            for comm in communications:
-                writer.writerow([comm[2],comm[3],comm[4],comm[7],comm[8]])
+            writer.writerows(conn.execute(_EXPORT_COMMS_SQL, (seq_id,)))
             writer.writerow([])
             
             # Test executions
             writer.writerow(['=== TEST EXECUTIONS ==='])
             writer.writerow(['script_version','execution_attempt','success','execution_duration','created_at'])
-            for ex in executions:
-                writer.writerow([ex[2],ex[3],ex[4],ex[9],ex[10]])
-        
-        logger.info(f"📊 Exported task {seq_id} data to {export_path}")
+            writer.writerows(conn.execute(_EXPORT_EXECS_SQL, (seq_id,)))
+            
+            conn.execute("COMMIT")
+    finally:
+        conn.close()
 
 
 # Global database manager instance
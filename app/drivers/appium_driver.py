@@ -3,29 +3,53 @@ Appium mobile automation driver
 """
 import time
 import json
-from typing import Dict, Any, Optional, List, Union
-from appium import webdriver
-from appium.options.android import UiAutomator2Options
-from appium.webdriver.common.appiumby import AppiumBy
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+import logging
+import base64
+import hashlib
+from collections import deque
+from typing import Dict, Any, Optional, List, Union, Deque, Tuple, TYPE_CHECKING
 from app.config.settings import settings
+from app.drivers.screenshot_sink import ScreenshotSink
+from app.drivers.script_parser import CapturePolicy, parse_appium_script, should_capture
+
+# appium/selenium are imported where used so web-only workers don't pay for them
+if TYPE_CHECKING:
+    from appium import webdriver
+    from selenium.webdriver.support.ui import WebDriverWait
+
+logger = logging.getLogger(__name__)
+
+SCREENSHOT_POOL_SIZE = 32
+EXECUTION_LOG_LIMIT = 10_000
+# One budget shared by all locator strategies, so elements appearing after a transition are still found
+ELEMENT_WAIT_TIMEOUT_S = 10.0
 
 class AppiumDriver:
     """Appium mobile automation driver"""
     
     def __init__(self):
         """Initialize Appium driver"""
-        self.driver: Optional[webdriver.Remote] = None
+        self.driver: Optional["webdriver.Remote"] = None
+        # Unique captures keyed by blake2b digest; screenshots holds digests in capture order
+        self._shot_store: Dict[bytes, bytearray] = {}
         self.screenshots: List[bytes] = []
-        self.execution_logs: List[str] = []
-        self.wait: Optional[WebDriverWait] = None
+        # Optional sink that takes screenshot bytes out of memory; only refs are kept here
+        self.screenshot_sink: Optional[ScreenshotSink] = None
+        self._sink_refs: Dict[bytes, str] = {}
+        self.execution_logs: Deque[str] = deque(maxlen=EXECUTION_LOG_LIMIT)
+        self.wait: Optional["WebDriverWait"] = None
     
     def setup_android(self, device_name: str = "emulator-5554", 
-                     app_package: str = None, app_activity: str = None) -> bool:
+                     app_package: str = None, app_activity: str = None,
+                     wait_for_idle_ms: int = 100,
+                     screenshot_sink: Optional[ScreenshotSink] = None) -> bool:
         """Setup Android driver"""
         try:
+            from appium import webdriver
+            from appium.options.android import UiAutomator2Options
+            from selenium.webdriver.support.ui import WebDriverWait
+            
+            self.screenshot_sink = screenshot_sink
             options = UiAutomator2Options()
             options.platform_name = "Android"
             options.device_name = device_name
@@ -43,10 +67,21 @@ class AppiumDriver:
             options.set_capability("appium:androidInstallTimeout", 90000)
             options.set_capability("appium:autoGrantPermissions", True)
             options.set_capability("appium:ignoreHiddenApiPolicyError", True)
+            options.set_capability("appium:waitForQuiescence", False)
             
             self.driver = webdriver.Remote(settings.APPIUM_HOST, options=options)
             self.wait = WebDriverWait(self.driver, 30)
             
+            # Shorten UiAutomator2 idle/selector waits so element lookups don't stall on busy apps
+            uia2_settings = {
+                "waitForIdleTimeout": wait_for_idle_ms,
+                "waitForSelectorTimeout": wait_for_idle_ms,
+                "actionAcknowledgmentTimeout": wait_for_idle_ms,
+                "keyInjectionDelay": 0,
+            }
+            self.driver.update_settings(uia2_settings)
+            self._log(f"UiAutomator2 settings applied: {uia2_settings}")
+            
             self._log("Android driver setup completed")
             return True
             
@@ -54,46 +89,58 @@ class AppiumDriver:
             self._log(f"Android driver setup failed: {str(e)}")
             return False
     
-    def execute_script(self, script: str) -> Dict[str, Any]:
-        """Execute automation script"""
+    def execute_script(self, script: str, capture_policy: CapturePolicy = "on_error",
+                       capture_every: int = 5) -> Dict[str, Any]:
+        """Execute automation script, capturing screenshots per capture_policy"""
         try:
             if not self.driver:
                 raise Exception("Driver not initialized")
             
             self._log("Starting script execution")
+            self._reset_screenshots()
             
             # Parse script commands
             commands = self._parse_script(script)
-            results = []
+            # Slot per command, filled by index
+            results: List[Optional[Dict[str, Any]]] = [None] * len(commands)
+            success_count = 0
+            fail_count = 0
             
             for i, command in enumerate(commands):
                 try:
                     result = self._execute_command(command)
-                    results.append({
+                    results[i] = {
                         "step": i + 1,
                         "command": command,
                         "success": True,
                         "result": result
-                    })
+                    }
+                    success_count += 1
                     
-                    # Take screenshot after each step
-                    self._take_screenshot()
+                    if should_capture(i + 1, capture_policy, every_n=capture_every):
+                        self._take_screenshot()
                     
                 except Exception as e:
                     self._log(f"Command failed: {str(e)}")
-                    results.append({
+                    results[i] = {
                         "step": i + 1,
                         "command": command,
                         "success": False,
                         "error": str(e)
-                    })
+                    }
+                    fail_count += 1
+                    if should_capture(i + 1, capture_policy, failed=True, every_n=capture_every):
+                        self._take_screenshot()
                     # Continue execution even if one step fails
             
+            if capture_policy == "final" and results:
+                self._take_screenshot()
+            
             return {
-                "success": any(r["success"] for r in results),  # At least one step succeeded
+                "success": success_count > 0,  # At least one step succeeded
                 "results": results,
-                "screenshots": self.screenshots,
-                "logs": self.execution_logs
+                "screenshots": self._collect_screenshots(),
+                "logs": list(self.execution_logs)
             }
         
         except Exception as e:
@@ -101,41 +148,12 @@ class AppiumDriver:
             return {
                 "success": False,
                 "error": str(e),
-                "logs": self.execution_logs
+                "logs": list(self.execution_logs)
             }
     
-    def _parse_script(self, script: str) -> List[Dict[str, Any]]:
-        """Parse automation script into commands"""
-        commands = []
-        lines = script.strip().split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith('#'):
-                continue
-            
-            # Parse different command types based on comp.py structure
-            if 'find_element' in line and 'click' in line:
-                # Extract selector from find_element call
-                selector = self._extract_selector(line)
-                commands.append({"action": "click", "selector": selector})
-            
-            elif 'find_element' in line and 'send_keys' in line:
-                selector = self._extract_selector(line)
-                value = self._extract_send_keys_value(line)
-                commands.append({"action": "input", "selector": selector, "value": value})
-            
-            elif 'wait' in line.lower() or 'sleep' in line.lower():
-                timeout = self._extract_timeout(line)
-                commands.append({"action": "wait", "timeout": timeout})
-            
-            elif 'screenshot' in line.lower():
-                commands.append({"action": "screenshot"})
-            
-            elif 'scroll' in line.lower() or 'swipe' in line.lower():
-                commands.append({"action": "scroll"})
-        
-        return commands
+    def _parse_script(self, script: str) -> Tuple[Dict[str, Any], ...]:
+        """Parse automation script into commands (cached per script, treat as read-only)"""
+        return parse_appium_script(script)
     
     def _execute_command(self, command: Dict[str, Any]) -> Any:
         """Execute individual command"""
@@ -178,68 +196,102 @@ class AppiumDriver:
         else:
             raise Exception(f"Unknown action: {action}")
     
-    def _find_element_safely(self, selector: str, timeout: int = 10) -> Optional[Any]:
-        """Find element with multiple strategies"""
+    def _find_element_safely(self, selector: str, timeout: float = ELEMENT_WAIT_TIMEOUT_S,
+                             poll_frequency: float = 0.1) -> Optional[Any]:
+        """Find element with multiple strategies under one shared explicit wait"""
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.common.exceptions import TimeoutException, NoSuchElementException
+        
+        try:
+            # Every poll tick tries all strategies, so the timeout is shared rather than per strategy
+            return WebDriverWait(
+                self.driver, timeout,
+                poll_frequency=poll_frequency,
+                ignored_exceptions=(NoSuchElementException,)
+            ).until(lambda _driver: self._probe_strategies(selector) or False)
+        except TimeoutException:
+            return None
+    
+    def _probe_strategies(self, selector: str) -> Optional[Any]:
+        """Single non-blocking pass over locator strategies, cheapest first"""
+        from appium.webdriver.common.appiumby import AppiumBy
+        
+        quoted = selector.replace('\\', '\\\\').replace('"', '\\"')
         strategies = [
-            (AppiumBy.ID, selector),
-            (AppiumBy.XPATH, selector),
             (AppiumBy.ACCESSIBILITY_ID, selector),
+            (AppiumBy.ID, selector),
             (AppiumBy.CLASS_NAME, selector),
-            (AppiumBy.ANDROID_UIAUTOMATOR, f'new UiSelector().textContains("{selector}")'),
-            (AppiumBy.ANDROID_UIAUTOMATOR, f'new UiSelector().descriptionContains("{selector}")'),
+            # UiAutomator2 returns the union of ';'-separated selectors in one call
+            (AppiumBy.ANDROID_UIAUTOMATOR,
+             f'new UiSelector().textContains("{quoted}");'
+             f'new UiSelector().descriptionContains("{quoted}")'),
+            (AppiumBy.XPATH, selector),
         ]
         
         for strategy, locator in strategies:
             try:
-                element = WebDriverWait(self.driver, timeout).until(
-                    EC.presence_of_element_located((strategy, locator))
-                )
-                return element
-            except TimeoutException:
+                elements = self.driver.find_elements(strategy, locator)
+            except Exception:
                 continue
+            if elements:
+                return elements[0]
         
         return None
     
-    def _extract_selector(self, line: str) -> str:
-        """Extract selector from script line"""
-        # Simple extraction - look for common patterns
-        if 'By.ID' in line:
-            return line.split('"')[1] if '"' in line else line.split("'")[1]
-        elif 'By.XPATH' in line:
-            return line.split('"')[1] if '"' in line else line.split("'")[1]
-        elif 'resource-id' in line:
-            return line.split('"')[1] if '"' in line else line.split("'")[1]
-        else:
-            # Default extraction
-            parts = line.split('"')
-            return parts[1] if len(parts) > 1 else line.strip()
-    
-    def _extract_send_keys_value(self, line: str) -> str:
-        """Extract value from send_keys call"""
-        if 'send_keys(' in line:
-            start = line.find('send_keys(') + len('send_keys(')
-            end = line.rfind(')')
-            value = line[start:end].strip().strip('"\'')
-            return value
-        return ""
-    
-    def _extract_timeout(self, line: str) -> int:
-        """Extract timeout value from wait/sleep call"""
-        import re
-        numbers = re.findall(r'\d+', line)
-        return int(numbers[0]) * 1000 if numbers else 3000  # Default 3 seconds
-    
     def _take_screenshot(self) -> bytes:
         """Take device screenshot"""
         try:
             if self.driver:
-                screenshot = self.driver.get_screenshot_as_png()
-                self.screenshots.append(screenshot)
-                return screenshot
+                data = base64.b64decode(self.driver.get_screenshot_as_base64())
+                if self.screenshot_sink is not None:
+                    return self._sink_screenshot(data)
+                self._store_screenshot(data)
+                return data
         except Exception as e:
             self._log(f"Screenshot failed: {str(e)}")
         return b""
     
+    def _store_screenshot(self, data: bytes) -> bytearray:
+        """Store screenshot once per unique content, recycling the oldest buffer when full"""
+        digest = hashlib.blake2b(data, digest_size=8).digest()
+        buf = self._shot_store.get(digest)
+        if buf is None:
+            if len(self._shot_store) >= SCREENSHOT_POOL_SIZE:
+                buf = self._shot_store.pop(next(iter(self._shot_store)))
+                buf[:] = data
+            else:
+                buf = bytearray(data)
+            self._shot_store[digest] = buf
+        self.screenshots.append(digest)
+        return buf
+    
+    def _sink_screenshot(self, data: bytes) -> bytes:
+        """Hand a unique screenshot to the sink, keeping only its reference"""
+        digest = hashlib.blake2b(data, digest_size=8).digest()
+        if digest not in self._sink_refs:
+            name = f"{len(self._sink_refs):04d}_{digest.hex()}.png"
+            self._sink_refs[digest] = self.screenshot_sink.write_sync(name, data)
+        self.screenshots.append(digest)
+        return data
+    
+    def get_screenshot(self, index: int) -> bytes:
+        """Resolve an in-memory screenshot by position (empty if recycled or sent to a sink)"""
+        return bytes(self._shot_store.get(self.screenshots[index], b""))
+    
+    def _collect_screenshots(self) -> List[Union[bytes, str]]:
+        """Screenshots in capture order (sink references when a sink is set)"""
+        if self.screenshot_sink is not None:
+            return [self._sink_refs[digest] for digest in self.screenshots]
+        # Copies, since pooled buffers are recycled by later captures
+        store = self._shot_store
+        return [bytes(store[digest]) for digest in self.screenshots if digest in store]
+    
+    def _reset_screenshots(self):
+        """Forget the previous run's captures so results only carry this run's screenshots"""
+        self._shot_store.clear()
+        self.screenshots.clear()
+        self._sink_refs.clear()
+    
     def _scroll_down(self):
         """Scroll down on the screen"""
         try:
@@ -257,7 +309,7 @@ class AppiumDriver:
     def _log(self, message: str):
         """Add log message"""
         self.execution_logs.append(message)
-        print(f"[Appium] {message}")
+        logger.debug("[Appium] %s", message)
     
     def cleanup(self):
         """Cleanup driver resources"""
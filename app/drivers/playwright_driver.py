@@ -2,172 +2,303 @@
 Playwright web automation driver with stealth mode optimization
 """
 import asyncio
+import base64
 import json
-from typing import Dict, Any, Optional, List
-from playwright.async_api import async_playwright, Browser, BrowserContext, Page
+import logging
+import re
+import hashlib
+import textwrap
+from collections import deque
+from typing import Dict, Any, Optional, List, Deque, Set, Tuple, Union, TYPE_CHECKING
 from app.config.settings import settings
+from app.drivers.screenshot_sink import ScreenshotSink
+from app.drivers.script_parser import CapturePolicy, parse_playwright_script, should_capture
+
+# playwright is imported where used so mobile-only workers don't pay for it
+if TYPE_CHECKING:
+    from playwright.async_api import Browser, BrowserContext, CDPSession, Locator, Page
+
+logger = logging.getLogger(__name__)
+
+# Screenshot capture options per mode; "off" disables capture entirely
+SCREENSHOT_MODES: Dict[str, Optional[Dict[str, Any]]] = {
+    "png_full": {"type": "png", "full_page": True},
+    "jpeg_viewport": {"type": "jpeg", "quality": 60, "full_page": False},
+    "off": None,
+}
+DEFAULT_SCREENSHOT_MODE = "jpeg_viewport"
+# Raw CDP Page.captureScreenshot params for viewport modes; full-page capture stays on page.screenshot
+_CDP_SCREENSHOT_PARAMS: Dict[str, Dict[str, Any]] = {
+    mode: {
+        "format": options["type"],
+        "captureBeyondViewport": False,
+        **({"quality": options["quality"]} if "quality" in options else {})
+    }
+    for mode, options in SCREENSHOT_MODES.items()
+    if options and not options["full_page"]
+}
+SCREENSHOT_POOL_SIZE = 32
+EXECUTION_LOG_LIMIT = 10_000
+NETWORK_IDLE_TIMEOUT_MS = 1500
+HUMAN_TYPING_DELAY_MS = 50
+
+# Browser launch args (based on outlook.py patterns), stealth args appended when enabled
+_BASE_BROWSER_ARGS: Tuple[str, ...] = ('--no-sandbox', '--disable-setuid-sandbox')
+_STEALTH_BROWSER_ARGS: Tuple[str, ...] = (
+    '--no-first-run',
+    '--no-service-autorun',
+    '--no-default-browser-check',
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+    '--disable-web-security',
+    '--disable-features=VizDisplayCompositor',
+    '--disable-blink-features=AutomationControlled',
+    '--disable-extensions',
+    '--disable-plugins',
+    '--disable-default-apps',
+    '--disable-background-timer-throttling',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-renderer-backgrounding',
+    '--disable-features=TranslateUI',
+    '--disable-ipc-flooding-protection',
+    '--disable-hang-monitor',
+    '--disable-prompt-on-repost',
+    '--disable-sync',
+    '--disable-translate',
+    '--metrics-recording-only',
+    '--no-report-upload',
+    '--safebrowsing-disable-auto-update',
+    '--enable-automation=false',
+    '--disable-client-side-phishing-detection',
+)
+
+_DEFAULT_CONTEXT_OPTIONS: Dict[str, Any] = {
+    'viewport': {'width': 1366, 'height': 768},
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+}
+_STEALTH_CONTEXT_OPTIONS: Dict[str, Any] = {
+    'locale': 'en-US',
+    'timezone_id': 'America/New_York',
+    'permissions': ['geolocation', 'notifications'],
+    'extra_http_headers': {
+        'Accept-Language': 'en-US,en;q=0.9',
+        'Accept-Encoding': 'gzip, deflate, br',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8',
+        'Upgrade-Insecure-Requests': '1',
+        'Sec-Fetch-Site': 'none',
+        'Sec-Fetch-Mode': 'navigate',
+        'Sec-Fetch-User': '?1',
+        'Sec-Fetch-Dest': 'document'
+    }
+}
+# Punctuated strings (CSS, XPath, engine prefixes) are treated as selectors and tried first
+STRUCTURED_SELECTOR = re.compile(r"[#.\[\]/=>:()]")
+# A bare word may be a tag name ("button", "div") matching every such element, so it is tried last
+BARE_SELECTOR = re.compile(r"^[\w-]+$")
+
+# Stealth init script, built once at import and attached at context level
+_STEALTH_JS: str = textwrap.dedent("""
+    // Remove webdriver property
+    Object.defineProperty(navigator, 'webdriver', {
+        get: () => undefined,
+        set: () => {},
+        configurable: true,
+        enumerable: false
+    });
+
+    // Override chrome property with realistic values
+    window.chrome = {
+        runtime: { onConnect: undefined, onMessage: undefined },
+        loadTimes: function() {
+            return {
+                requestTime: Date.now() / 1000 - Math.random() * 1000,
+                startLoadTime: Date.now() / 1000 - Math.random() * 1000,
+                commitLoadTime: Date.now() / 1000 - Math.random() * 1000,
+                finishDocumentLoadTime: Date.now() / 1000 - Math.random() * 1000,
+                finishLoadTime: Date.now() / 1000 - Math.random() * 1000,
+                firstPaintTime: Date.now() / 1000 - Math.random() * 1000,
+                firstPaintAfterLoadTime: 0,
+                navigationType: 'Other',
+                wasFetchedViaSpdy: false,
+                wasNpnNegotiated: false,
+                npnNegotiatedProtocol: 'unknown',
+                wasAlternateProtocolAvailable: false,
+                connectionInfo: 'unknown'
+            };
+        }
+    };
+
+    // Mock plugins
+    Object.defineProperty(navigator, 'plugins', {
+        get: () => [
+            { 0: { type: "application/x-google-chrome-pdf", suffixes: "pdf", description: "Portable Document Format", __proto__: MimeType.prototype }, description: "Portable Document Format", filename: "internal-pdf-viewer", length: 1, name: "Chrome PDF Plugin" },
+            { 0: { type: "application/pdf", suffixes: "pdf", description: "", __proto__: MimeType.prototype }, description: "", filename: "mhjfbmdgcfjbbpaeojofohoefgiehjai", length: 1, name: "Chrome PDF Viewer" }
+        ],
+        configurable: true,
+        enumerable: false
+    });
+
+    // Mock languages
+    Object.defineProperty(navigator, 'languages', {
+        get: () => ['en-US', 'en'],
+        configurable: true,
+        enumerable: false
+    });
+
+    // Override permissions query
+    const originalQuery = window.navigator.permissions.query;
+    window.navigator.permissions.query = (parameters) => (
+        parameters.name === 'notifications' ?
+            Promise.resolve({ state: Notification.permission }) :
+            originalQuery(parameters)
+    );
+
+    // Add connection info
+    Object.defineProperty(navigator, 'connection', {
+        get: () => ({ effectiveType: '4g', rtt: 50, downlink: 10, saveData: false }),
+        configurable: true,
+        enumerable: false
+    });
+
+    // Mock hardware
+    Object.defineProperty(navigator, 'hardwareConcurrency', { get: () => 4, configurable: true, enumerable: false });
+    Object.defineProperty(navigator, 'deviceMemory', { get: () => 8, configurable: true, enumerable: false });
+
+    // Remove automation traces
+    delete navigator.__proto__.webdriver;
+""")
+
+
+class PlaywrightDriverPool:
+    """Warm Chromium browsers shared across script runs, keyed by (headless, stealth_mode)"""
+    
+    def __init__(self, size: int = 2):
+        """Initialize empty pool; browsers are launched lazily on first acquire"""
+        self.size = size
+        self.playwright = None
+        self._free: Dict[Tuple[bool, bool], asyncio.Queue] = {}
+        self._launched: Dict[Tuple[bool, bool], int] = {}
+        # Every live browser, idle or checked out, so close() reaches them all
+        self._browsers: Set["Browser"] = set()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self, headless: bool, stealth_mode: bool) -> "Browser":
+        """Hand out a free browser, launching one while under the pool size"""
+        key = (headless, stealth_mode)
+        async with self._lock:
+            queue = self._free.setdefault(key, asyncio.Queue())
+            if queue.empty() and self._launched.get(key, 0) < self.size:
+                if self.playwright is None:
+                    from playwright.async_api import async_playwright
+                    self.playwright = await async_playwright().start()
+                browser = await self._launch(headless, stealth_mode)
+                self._launched[key] = self._launched.get(key, 0) + 1
+                self._browsers.add(browser)
+                return browser
+        
+        browser = await queue.get()
+        if browser.is_connected():
+            return browser
+        # Browser died while idle; free its slot and acquire again
+        self._launched[key] -= 1
+        self._browsers.discard(browser)
+        return await self.acquire(headless, stealth_mode)
+    
+    async def release(self, browser: "Browser", headless: bool, stealth_mode: bool):
+        """Return a browser to the pool once its contexts are closed"""
+        key = (headless, stealth_mode)
+        if browser.is_connected():
+            self._free.setdefault(key, asyncio.Queue()).put_nowait(browser)
+        else:
+            self._launched[key] = max(self._launched.get(key, 1) - 1, 0)
+            self._browsers.discard(browser)
+    
+    async def _launch(self, headless: bool, stealth_mode: bool) -> "Browser":
+        """Launch a Chromium instance with the configured args"""
+        browser_args = list(_BASE_BROWSER_ARGS + (_STEALTH_BROWSER_ARGS if stealth_mode else ()))
+        return await self.playwright.chromium.launch(
+            headless=headless,
+            args=browser_args
+        )
+    
+    async def close(self):
+        """Close every launched browser, idle or checked out, and stop Playwright"""
+        async with self._lock:
+            browsers, self._browsers = self._browsers, set()
+            self._free.clear()
+            self._launched.clear()
+            # Checked-out browsers come back disconnected; release() then just drops them
+            for outcome in await asyncio.gather(*(browser.close() for browser in browsers), return_exceptions=True):
+                if isinstance(outcome, Exception):
+                    logger.warning("⚠️ Browser close failed: %s", outcome)
+            if self.playwright:
+                await self.playwright.stop()
+                self.playwright = None
+
+# Shared browser pool used by every PlaywrightDriver
+playwright_pool = PlaywrightDriverPool()
+
 
 class PlaywrightDriver:
     """Playwright web automation driver with stealth capabilities"""
     
     def __init__(self):
         """Initialize Playwright driver"""
-        self.playwright = None
-        self.browser: Optional[Browser] = None
-        self.context: Optional[BrowserContext] = None
-        self.page: Optional[Page] = None
+        self.browser: Optional["Browser"] = None
+        self._pool_key: Optional[Tuple[bool, bool]] = None
+        self.context: Optional["BrowserContext"] = None
+        self.page: Optional["Page"] = None
+        self._cdp: Optional["CDPSession"] = None
+        # Unique captures keyed by blake2b digest; screenshots holds digests in capture order
+        self._shot_store: Dict[bytes, bytearray] = {}
         self.screenshots: List[bytes] = []
-        self.execution_logs: List[str] = []
+        # Optional sink that takes screenshot bytes out of memory; only refs are kept here
+        self.screenshot_sink: Optional[ScreenshotSink] = None
+        self._sink_refs: Dict[bytes, str] = {}
+        self._pending_writes: List[asyncio.Task] = []
+        self.screenshot_mode = DEFAULT_SCREENSHOT_MODE
+        self.human_like = False
+        self.execution_logs: Deque[str] = deque(maxlen=EXECUTION_LOG_LIMIT)
     
-    async def setup(self, headless: bool = None, stealth_mode: bool = True) -> bool:
+    async def setup(self, headless: bool = None, stealth_mode: bool = True,
+                    screenshot_mode: str = DEFAULT_SCREENSHOT_MODE, human_like: bool = False,
+                    screenshot_sink: Optional[ScreenshotSink] = None) -> bool:
         """Setup Playwright browser with optional stealth mode"""
         try:
             if headless is None:
                 headless = settings.PLAYWRIGHT_HEADLESS
             
-            self.playwright = await async_playwright().start()
-            
-            # Enhanced browser args for stealth (based on outlook.py patterns)
-            browser_args = ['--no-sandbox', '--disable-setuid-sandbox']
+            if screenshot_mode not in SCREENSHOT_MODES:
+                raise ValueError(f"Unknown screenshot mode: {screenshot_mode}")
+            self.screenshot_mode = screenshot_mode
+            self.human_like = human_like
+            self.screenshot_sink = screenshot_sink
             
-            if stealth_mode:
-                browser_args.extend([
-                    '--no-first-run',
-                    '--no-service-autorun', 
-                    '--no-default-browser-check',
-                    '--disable-dev-shm-usage',
-                    '--disable-gpu',
-                    '--disable-web-security',
-                    '--disable-features=VizDisplayCompositor',
-                    '--disable-blink-features=AutomationControlled',
-                    '--disable-extensions',
-                    '--disable-plugins',
-                    '--disable-default-apps',
-                    '--disable-background-timer-throttling',
-                    '--disable-backgrounding-occluded-windows',
-                    '--disable-renderer-backgrounding',
-                    '--disable-features=TranslateUI',
-                    '--disable-ipc-flooding-protection',
-                    '--disable-hang-monitor',
-                    '--disable-prompt-on-repost',
-                    '--disable-sync',
-                    '--disable-translate',
-                    '--metrics-recording-only',
-                    '--no-report-upload',
-                    '--safebrowsing-disable-auto-update',
-                    '--enable-automation=false',
-                    '--disable-client-side-phishing-detection'
-                ])
-            
-            # Launch browser
-            self.browser = await self.playwright.chromium.launch(
-                headless=headless,
-                args=browser_args
-            )
+            # Warm browser from the shared pool; each run only gets a fresh context
+            self.browser = await playwright_pool.acquire(headless, stealth_mode)
+            self._pool_key = (headless, stealth_mode)
             
             # Create context with stealth settings
-            context_options = {
-                'viewport': {'width': 1366, 'height': 768},
-                'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            }
-            
-            if stealth_mode:
-                context_options.update({
-                    'locale': 'en-US',
-                    'timezone_id': 'America/New_York',
-                    'permissions': ['geolocation', 'notifications'],
-                    'extra_http_headers': {
-                        'Accept-Language': 'en-US,en;q=0.9',
-                        'Accept-Encoding': 'gzip, deflate, br',
-                        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8',
-                        'Upgrade-Insecure-Requests': '1',
-                        'Sec-Fetch-Site': 'none',
-                        'Sec-Fetch-Mode': 'navigate',
-                        'Sec-Fetch-User': '?1',
-                        'Sec-Fetch-Dest': 'document'
-                    }
-                })
+            context_options = {**_DEFAULT_CONTEXT_OPTIONS, **(_STEALTH_CONTEXT_OPTIONS if stealth_mode else {})}
             
             self.context = await self.browser.new_context(**context_options)
             
+            # Stealth script installed once per context so every page inherits it
+            if stealth_mode:
+                await self.context.add_init_script(_STEALTH_JS)
+            
             # Create page
             self.page = await self.context.new_page()
             
             # Increase timeout
             self.page.set_default_timeout(60000)
             
-            # Apply stealth script if enabled
-            if stealth_mode:
-                await self.page.add_init_script("""
-                    // Remove webdriver property
-                    Object.defineProperty(navigator, 'webdriver', {
-                        get: () => undefined,
-                        set: () => {},
-                        configurable: true,
-                        enumerable: false
-                    });
-
-                    // Override chrome property with realistic values
-                    window.chrome = {
-                        runtime: { onConnect: undefined, onMessage: undefined },
-                        loadTimes: function() {
-                            return {
-                                requestTime: Date.now() / 1000 - Math.random() * 1000,
-                                startLoadTime: Date.now() / 1000 - Math.random() * 1000,
-                                commitLoadTime: Date.now() / 1000 - Math.random() * 1000,
-                                finishDocumentLoadTime: Date.now() / 1000 - Math.random() * 1000,
-                                finishLoadTime: Date.now() / 1000 - Math.random() * 1000,
-                                firstPaintTime: Date.now() / 1000 - Math.random() * 1000,
-                                firstPaintAfterLoadTime: 0,
-                                navigationType: 'Other',
-                                wasFetchedViaSpdy: false,
-                                wasNpnNegotiated: false,
-                                npnNegotiatedProtocol: 'unknown',
-                                wasAlternateProtocolAvailable: false,
-                                connectionInfo: 'unknown'
-                            };
-                        }
-                    };
-
-                    // Mock plugins
-                    Object.defineProperty(navigator, 'plugins', {
-                        get: () => [
-                            { 0: { type: "application/x-google-chrome-pdf", suffixes: "pdf", description: "Portable Document Format", __proto__: MimeType.prototype }, description: "Portable Document Format", filename: "internal-pdf-viewer", length: 1, name: "Chrome PDF Plugin" },
-                            { 0: { type: "application/pdf", suffixes: "pdf", description: "", __proto__: MimeType.prototype }, description: "", filename: "mhjfbmdgcfjbbpaeojofohoefgiehjai", length: 1, name: "Chrome PDF Viewer" }
-                        ],
-                        configurable: true,
-                        enumerable: false
-                    });
-
-                    // Mock languages
-                    Object.defineProperty(navigator, 'languages', {
-                        get: () => ['en-US', 'en'],
-                        configurable: true,
-                        enumerable: false
-                    });
-
-                    // Override permissions query
-                    const originalQuery = window.navigator.permissions.query;
-                    window.navigator.permissions.query = (parameters) => (
-                        parameters.name === 'notifications' ?
-                            Promise.resolve({ state: Notification.permission }) :
-                            originalQuery(parameters)
-                    );
-
-                    // Add connection info
-                    Object.defineProperty(navigator, 'connection', {
-                        get: () => ({ effectiveType: '4g', rtt: 50, downlink: 10, saveData: false }),
-                        configurable: true,
-                        enumerable: false
-                    });
-
-                    // Mock hardware
-                    Object.defineProperty(navigator, 'hardwareConcurrency', { get: () => 4, configurable: true, enumerable: false });
-                    Object.defineProperty(navigator, 'deviceMemory', { get: () => 8, configurable: true, enumerable: false });
-
-                    // Remove automation traces
-                    delete navigator.__proto__.webdriver;
-                """)
+            # Direct CDP channel for screenshots, skipping page.screenshot's wrapper layers
+            try:
+                self._cdp = await self.context.new_cdp_session(self.page)
+            except Exception as e:
+                self._cdp = None
+                self._log(f"CDP session unavailable, using page.screenshot: {str(e)}")
             
             # Setup page event handlers
             self.page.on("dialog", self._handle_dialog)
@@ -180,50 +311,61 @@ class PlaywrightDriver:
             self._log(f"Browser setup failed: {str(e)}")
             return False
     
-    async def execute_script(self, script: str) -> Dict[str, Any]:
-        """Execute automation script"""
+    async def execute_script(self, script: str, capture_policy: CapturePolicy = "on_error",
+                             capture_every: int = 5) -> Dict[str, Any]:
+        """Execute automation script, capturing screenshots per capture_policy"""
         try:
             if not self.page:
                 raise Exception("Browser not initialized")
             
             self._log("Starting script execution")
+            self._reset_screenshots()
             
             # Parse script commands
             commands = self._parse_script(script)
-            results = []
+            # Slot per command, filled by index
+            results: List[Optional[Dict[str, Any]]] = [None] * len(commands)
+            success_count = 0
+            fail_count = 0
             
             for i, command in enumerate(commands):
                 try:
                     result = await self._execute_command(command)
-                    results.append({
+                    results[i] = {
                         "step": i + 1,
                         "command": command,
                         "success": True,
                         "result": result
-                    })
-                    
-                    # Take screenshot after each step
-                    screenshot = await self._take_screenshot()
-                    self.screenshots.append(screenshot)
+                    }
+                    success_count += 1
                     
-                    # Add small delay between actions
-                    await asyncio.sleep(0.5)
+                    if should_capture(i + 1, capture_policy, every_n=capture_every):
+                        await self._take_screenshot()
                     
                 except Exception as e:
                     self._log(f"Command failed: {str(e)}")
-                    results.append({
+                    results[i] = {
                         "step": i + 1,
                         "command": command,
                         "success": False,
                         "error": str(e)
-                    })
+                    }
+                    fail_count += 1
+                    if should_capture(i + 1, capture_policy, failed=True, every_n=capture_every):
+                        await self._take_screenshot()
+                    # Drop the unused slots after the failing step
+                    del results[i + 1:]
                     break
             
+            if capture_policy == "final" and results:
+                await self._take_screenshot()
+            await self._flush_screenshots()
+            
             return {
-                "success": all(r["success"] for r in results),
+                "success": fail_count == 0,
                 "results": results,
-                "screenshots": self.screenshots,
-                "logs": self.execution_logs
+                "screenshots": self._collect_screenshots(),
+                "logs": list(self.execution_logs)
             }
         
         except Exception as e:
@@ -231,42 +373,12 @@ class PlaywrightDriver:
             return {
                 "success": False,
                 "error": str(e),
-                "logs": self.execution_logs
+                "logs": list(self.execution_logs)
             }
     
-    def _parse_script(self, script: str) -> List[Dict[str, Any]]:
-        """Parse automation script into commands"""
-        commands = []
-        lines = script.strip().split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith('#'):
-                continue
-            
-            # Parse different command types
-            if line.startswith('navigate'):
-                url = line.split('navigate')[1].strip().strip('"\'')
-                commands.append({"action": "navigate", "url": url})
-            
-            elif line.startswith('click'):
-                selector = line.split('click')[1].strip().strip('"\'')
-                commands.append({"action": "click", "selector": selector})
-            
-            elif line.startswith('fill'):
-                parts = line.split('fill')[1].strip().split(' ', 1)
-                selector = parts[0].strip('"\'')
-                value = parts[1].strip('"\'') if len(parts) > 1 else ""
-                commands.append({"action": "fill", "selector": selector, "value": value})
-            
-            elif line.startswith('wait'):
-                timeout = int(line.split('wait')[1].strip()) if line.split('wait')[1].strip().isdigit() else 3000
-                commands.append({"action": "wait", "timeout": timeout})
-            
-            elif line.startswith('screenshot'):
-                commands.append({"action": "screenshot"})
-        
-        return commands
+    def _parse_script(self, script: str) -> Tuple[Dict[str, Any], ...]:
+        """Parse automation script into commands (cached per script, treat as read-only)"""
+        return parse_playwright_script(script)
     
     async def _execute_command(self, command: Dict[str, Any]) -> Any:
         """Execute individual command with enhanced element finding"""
@@ -281,22 +393,27 @@ class PlaywrightDriver:
             element = await self._find_element_robust(command["selector"])
             if element:
                 await element.scroll_into_view_if_needed()
-                await asyncio.sleep(0.5)  # Wait after scroll
-                await element.click()
+                await element.click()  # Playwright waits for the element to be stable before clicking
+                await self._wait_for_network_idle()
                 self._log(f"Clicked: {command['selector']}")
                 return {"clicked": True}
             else:
                 raise Exception(f"Element not found: {command['selector']}")
         
         elif action == "fill":
-            element = await self._find_element_robust(command["selector"])
+            element = await self._find_element_robust(command["selector"], editable=True)
             if element:
                 await element.scroll_into_view_if_needed()
-                await element.click()
-                await asyncio.sleep(0.3)
-                await element.fill("")
-                await asyncio.sleep(0.2)
-                await element.type(command["value"], delay=50)  # Type with delay
+                if command.get("human_like", self.human_like):
+                    # Click + per-key typing looks like a real user (anti-bot sites) but costs
+                    # several round-trips plus HUMAN_TYPING_DELAY_MS per character
+                    await element.click()
+                    await element.fill("")
+                    await element.type(command["value"], delay=HUMAN_TYPING_DELAY_MS)
+                else:
+                    # Single call that clears, sets the value and fires input/change events
+                    await element.fill(command["value"])
+                await self._wait_for_network_idle()
                 self._log(f"Filled {command['selector']} with: {command['value']}")
                 return {"filled": True}
             else:
@@ -315,32 +432,145 @@ class PlaywrightDriver:
         else:
             raise Exception(f"Unknown action: {action}")
     
-    async def _find_element_robust(self, selector: str):
-        """Find element with multiple strategies (based on outlook.py patterns)"""
-        strategies = [
-            selector,  # Original selector
-            f"[aria-label*='{selector}' i]",  # Aria label contains
-            f"[placeholder*='{selector}' i]",  # Placeholder contains
-            f":text('{selector}')",  # Text content
-            f"button:has-text('{selector}')",  # Button with text
-            f"input[name*='{selector}' i]",  # Input name contains
+    async def _wait_for_network_idle(self, timeout: int = NETWORK_IDLE_TIMEOUT_MS):
+        """Wait until the page's network settles, bounded so chatty pages don't stall the run"""
+        from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+        
+        try:
+            await self.page.wait_for_load_state("networkidle", timeout=timeout)
+        except PlaywrightTimeoutError:
+            pass
+    
+    async def _find_element_robust(self, selector: str, editable: bool = False, timeout: int = 5000):
+        """Find element by the highest-priority matching strategy (based on outlook.py patterns)"""
+        from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+        
+        page = self.page
+        # CSS string escape, so quotes in the text can't break the attribute selector
+        quoted = selector.replace('\\', '\\\\').replace("'", "\\'")
+        candidates = [
+            page.get_by_label(selector),  # Aria label / label text
+            page.get_by_placeholder(selector),  # Placeholder contains
         ]
+        # Text and button matches resolve to labels and buttons, which fill can't type into
+        if not editable:
+            candidates.append(page.get_by_text(selector, exact=False))  # Text content
+            candidates.append(page.get_by_role("button", name=selector))  # Button with text
+        candidates.append(page.locator(f"input[name*='{quoted}' i]"))  # Input name contains
+        candidates = [candidate.locator("visible=true") for candidate in candidates]
         
-        for strategy in strategies:
-            try:
-                element = await self.page.wait_for_selector(strategy, timeout=5000, state="visible")
-                if element:
-                    return element
-            except:
-                continue
+        # The raw selector is checked on its own: text like "Email:" or "1/2" is not valid CSS
+        # and would make the whole fused locator throw, so it only joins once it parses
+        if STRUCTURED_SELECTOR.search(selector) or BARE_SELECTOR.match(selector):
+            raw = await self._raw_selector_candidate(selector)
+            if raw is not None:
+                if STRUCTURED_SELECTOR.search(selector):
+                    candidates.insert(0, raw)
+                else:
+                    candidates.append(raw)
+        
+        locator = candidates[0]
+        for candidate in candidates[1:]:
+            locator = locator.or_(candidate)
         
+        # The fused locator is resolved on every tick, so one wait covers all strategies
+        try:
+            await locator.first.wait_for(state="visible", timeout=timeout)
+        except PlaywrightTimeoutError:
+            return None
+        
+        # or_() matches in document order; pick by strategy priority instead
+        for candidate in candidates:
+            if await candidate.count():
+                return candidate.first
         return None
     
-    async def _take_screenshot(self) -> bytes:
-        """Take page screenshot"""
-        if self.page:
-            return await self.page.screenshot(type="png", full_page=True)
-        return b""
+    async def _raw_selector_candidate(self, selector: str) -> Optional["Locator"]:
+        """Selector used verbatim (visible matches only), or None when it isn't valid selector syntax"""
+        from playwright.async_api import Error as PlaywrightError
+        
+        candidate = self.page.locator(selector).locator("visible=true")
+        try:
+            await candidate.count()
+        except PlaywrightError:
+            self._log(f"Not a usable selector, matching as text only: {selector}")
+            return None
+        return candidate
+    
+    async def _take_screenshot(self, store: bool = True) -> bytes:
+        """Take page screenshot using the configured screenshot mode"""
+        options = SCREENSHOT_MODES[self.screenshot_mode]
+        if not self.page or options is None:
+            return b""
+        data = None
+        cdp_params = _CDP_SCREENSHOT_PARAMS.get(self.screenshot_mode)
+        if self._cdp is not None and cdp_params is not None:
+            try:
+                result = await self._cdp.send("Page.captureScreenshot", cdp_params)
+                data = base64.b64decode(result["data"])
+            except Exception as e:
+                self._cdp = None
+                self._log(f"CDP screenshot failed, falling back to page.screenshot: {str(e)}")
+        if data is None:
+            data = await self.page.screenshot(**options)
+        if not store:
+            return data
+        if self.screenshot_sink is not None:
+            return self._sink_screenshot(data, options["type"])
+        self._store_screenshot(data)
+        return data
+    
+    def _store_screenshot(self, data: bytes) -> bytearray:
+        """Store screenshot once per unique content, recycling the oldest buffer when full"""
+        digest = hashlib.blake2b(data, digest_size=8).digest()
+        buf = self._shot_store.get(digest)
+        if buf is None:
+            if len(self._shot_store) >= SCREENSHOT_POOL_SIZE:
+                buf = self._shot_store.pop(next(iter(self._shot_store)))
+                buf[:] = data
+            else:
+                buf = bytearray(data)
+            self._shot_store[digest] = buf
+        self.screenshots.append(digest)
+        return buf
+    
+    def _sink_screenshot(self, data: bytes, extension: str) -> bytes:
+        """Hand a unique screenshot to the sink, keeping only its reference"""
+        digest = hashlib.blake2b(data, digest_size=8).digest()
+        if digest not in self._sink_refs:
+            name = f"{len(self._sink_refs):04d}_{digest.hex()}.{extension}"
+            self._sink_refs[digest] = self.screenshot_sink.ref(name)
+            # Write overlaps the next command; pending writes are awaited before results are returned
+            self._pending_writes.append(asyncio.create_task(self.screenshot_sink.write(name, data)))
+        self.screenshots.append(digest)
+        return data
+    
+    async def _flush_screenshots(self):
+        """Wait for in-flight sink writes"""
+        if not self._pending_writes:
+            return
+        pending, self._pending_writes = self._pending_writes, []
+        for outcome in await asyncio.gather(*pending, return_exceptions=True):
+            if isinstance(outcome, Exception):
+                self._log(f"Screenshot write failed: {str(outcome)}")
+    
+    def get_screenshot(self, index: int) -> bytes:
+        """Resolve an in-memory screenshot by position (empty if recycled or sent to a sink)"""
+        return bytes(self._shot_store.get(self.screenshots[index], b""))
+    
+    def _collect_screenshots(self) -> List[Union[bytes, str]]:
+        """Screenshots in capture order (sink references when a sink is set)"""
+        if self.screenshot_sink is not None:
+            return [self._sink_refs[digest] for digest in self.screenshots]
+        # Copies, since pooled buffers are recycled by later captures
+        store = self._shot_store
+        return [bytes(store[digest]) for digest in self.screenshots if digest in store]
+    
+    def _reset_screenshots(self):
+        """Forget the previous run's captures so results only carry this run's screenshots"""
+        self._shot_store.clear()
+        self.screenshots.clear()
+        self._sink_refs.clear()
     
     async def _handle_dialog(self, dialog):
         """Handle browser dialogs"""
@@ -354,19 +584,24 @@ class PlaywrightDriver:
     def _log(self, message: str):
         """Add log message"""
         self.execution_logs.append(message)
-        print(f"[Playwright] {message}")
+        logger.debug("[Playwright] %s", message)
     
     async def cleanup(self):
         """Cleanup browser resources"""
         try:
+            await self._flush_screenshots()
+            if self._cdp:
+                await self._cdp.detach()
+                self._cdp = None
             if self.page:
                 await self.page.close()
             if self.context:
                 await self.context.close()
-            if self.browser:
-                await self.browser.close()
-            if self.playwright:
-                await self.playwright.stop()
+            # Closing the context resets state; the browser stays warm for the next run
+            if self.browser and self._pool_key:
+                await playwright_pool.release(self.browser, *self._pool_key)
+            self.page = self.context = self.browser = None
+            self._pool_key = None
             
             self._log("Browser cleanup completed")
         except Exception as e:
@@ -381,7 +616,7 @@ class PlaywrightDriver:
             return {
                 "url": self.page.url,
                 "title": await self.page.title(),
-                "screenshot": await self._take_screenshot()
+                "screenshot": await self._take_screenshot(store=False)
             }
         except Exception as e:
             self._log(f"Error getting page info: {str(e)}")
@@ -0,0 +1,49 @@
+"""
+Pluggable screenshot destinations for the automation drivers
+"""
+import asyncio
+import tempfile
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Optional
+
+
+class ScreenshotSink(ABC):
+    """Destination that takes screenshot blobs out of driver memory"""
+
+    def ref(self, name: str) -> str:
+        """Reference (path or URL) a blob written under name is reachable at"""
+        return name
+
+    async def write(self, name: str, data: bytes) -> str:
+        """Persist screenshot off the event loop and return its reference"""
+        return await asyncio.to_thread(self.write_sync, name, data)
+
+    @abstractmethod
+    def write_sync(self, name: str, data: bytes) -> str:
+        """Persist screenshot and return its reference"""
+
+
+class NullScreenshotSink(ScreenshotSink):
+    """Discards screenshots while still handing out references"""
+
+    def write_sync(self, name: str, data: bytes) -> str:
+        return self.ref(name)
+
+
+class FileScreenshotSink(ScreenshotSink):
+    """Writes screenshots into a per-run directory"""
+
+    def __init__(self, directory: Optional[str] = None, run_id: Optional[str] = None):
+        run_id = run_id or uuid.uuid4().hex[:12]
+        self.directory = Path(directory or tempfile.gettempdir()) / f"screenshots_{run_id}"
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def ref(self, name: str) -> str:
+        return str(self.directory / name)
+
+    def write_sync(self, name: str, data: bytes) -> str:
+        path = self.directory / name
+        path.write_bytes(data)
+        return str(path)
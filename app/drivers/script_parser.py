@@ -0,0 +1,135 @@
+"""
+Shared automation script parser and screenshot capture policy for Playwright and Appium drivers
+"""
+import re
+from functools import lru_cache
+from typing import Dict, Any, Callable, Literal, Tuple
+
+# Parsed scripts are cached by content; the same script is often run against many targets
+PARSE_CACHE_SIZE = 128
+
+# Script line patterns, compiled once at import
+_NUM_RE = re.compile(r'\d+')
+_QUOTED_RE = re.compile(r'(["\'])(.*?)\1')
+_SEND_KEYS_RE = re.compile(r'send_keys\(\s*(["\']?)(.*?)\1\s*\)')
+
+# One alternation per grammar; finditer makes a single pass and m.lastgroup is the token id.
+# Lines that match no alternative (comments, blanks, unknown statements) are skipped.
+_PLAYWRIGHT_SCANNER = re.compile(
+    r'^[ \t]*(?:'
+    r'(?P<navigate>navigate[^\n]*)'
+    r'|(?P<click>click[^\n]*)'
+    r'|(?P<fill>fill[^\n]*)'
+    r'|(?P<wait>wait[^\n]*)'
+    r'|(?P<screenshot>screenshot[^\n]*)'
+    r')',
+    re.M
+)
+
+_APPIUM_SCANNER = re.compile(
+    r'^[ \t]*(?!#)(?:'
+    r'(?P<click>(?=[^\n]*find_element)(?=[^\n]*click)[^\n]+)'
+    r'|(?P<input>(?=[^\n]*find_element)(?=[^\n]*send_keys)[^\n]+)'
+    r'|(?P<wait>(?=[^\n]*(?i:wait|sleep))[^\n]+)'
+    r'|(?P<screenshot>(?=[^\n]*(?i:screenshot))[^\n]+)'
+    r'|(?P<scroll>(?=[^\n]*(?i:scroll|swipe))[^\n]+)'
+    r')',
+    re.M
+)
+
+
+def _unquote(text: str) -> str:
+    """Strip surrounding whitespace and quotes"""
+    return text.strip().strip('"\'')
+
+
+def _playwright_fill(rest: str) -> Dict[str, Any]:
+    parts = rest.strip().split(' ', 1)
+    return {
+        "action": "fill",
+        "selector": parts[0].strip('"\''),
+        "value": parts[1].strip('"\'') if len(parts) > 1 else ""
+    }
+
+
+def _playwright_wait(rest: str) -> Dict[str, Any]:
+    rest = rest.strip()
+    return {"action": "wait", "timeout": int(rest) if rest.isdigit() else 3000}
+
+
+# Token id -> command builder for the remainder of the line after the keyword
+_PLAYWRIGHT_HANDLERS: Dict[str, Callable[[str], Dict[str, Any]]] = {
+    "navigate": lambda rest: {"action": "navigate", "url": _unquote(rest)},
+    "click": lambda rest: {"action": "click", "selector": _unquote(rest)},
+    "fill": _playwright_fill,
+    "wait": _playwright_wait,
+    "screenshot": lambda rest: {"action": "screenshot"},
+}
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_playwright_script(script: str) -> Tuple[Dict[str, Any], ...]:
+    """Parse Playwright command script (navigate/click/fill/wait/screenshot) into commands"""
+    commands = []
+    for match in _PLAYWRIGHT_SCANNER.finditer(script):
+        token = match.lastgroup
+        line = match.group(token).rstrip()
+        commands.append(_PLAYWRIGHT_HANDLERS[token](line[len(token):]))
+    return tuple(commands)
+
+
+def extract_selector(line: str) -> str:
+    """Extract selector from script line"""
+    # First quoted literal is the locator value for By.ID / By.XPATH / resource-id calls
+    match = _QUOTED_RE.search(line)
+    return match.group(2) if match else line.strip()
+
+
+def extract_send_keys_value(line: str) -> str:
+    """Extract value from send_keys call"""
+    match = _SEND_KEYS_RE.search(line)
+    return match.group(2) if match else ""
+
+
+def extract_timeout(line: str) -> int:
+    """Extract timeout value from wait/sleep call"""
+    match = _NUM_RE.search(line)
+    return int(match.group()) * 1000 if match else 3000  # Default 3 seconds
+
+
+_APPIUM_HANDLERS: Dict[str, Callable[[str], Dict[str, Any]]] = {
+    "click": lambda line: {"action": "click", "selector": extract_selector(line)},
+    "input": lambda line: {
+        "action": "input",
+        "selector": extract_selector(line),
+        "value": extract_send_keys_value(line)
+    },
+    "wait": lambda line: {"action": "wait", "timeout": extract_timeout(line)},
+    "screenshot": lambda line: {"action": "screenshot"},
+    "scroll": lambda line: {"action": "scroll"},
+}
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_appium_script(script: str) -> Tuple[Dict[str, Any], ...]:
+    """Parse Appium Python script (comp.py structure) into commands"""
+    commands = []
+    for match in _APPIUM_SCANNER.finditer(script):
+        token = match.lastgroup
+        commands.append(_APPIUM_HANDLERS[token](match.group(token).strip()))
+    return tuple(commands)
+
+
+# When execute_script takes screenshots: every step, failed steps only, every n-th step, or once at the end
+CapturePolicy = Literal["always", "on_error", "every_n", "final"]
+
+
+def should_capture(step: int, policy: str, failed: bool = False, every_n: int = 1) -> bool:
+    """Decide whether a screenshot is taken after the given 1-based step"""
+    if policy == "always":
+        return True
+    if policy == "on_error":
+        return failed
+    if policy == "every_n":
+        return step % max(every_n, 1) == 0
+    return False
@@ -4,12 +4,16 @@ Fixes all method calls to match actual agent implementations
 """
 
 import asyncio
-import json
 import logging
+import os
 import time
-from datetime import datetime
+import orjson
+from collections import deque
+from functools import partial
+from logging.handlers import QueueListener
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Coroutine, Deque, Set, Tuple
 
 # Import enhanced agents with correct classes
 from app.agents.enhanced_agent2 import EnhancedAgent2_CodeGenerator
@@ -17,18 +21,110 @@ from app.agents.enhanced_agent3 import EnhancedAgent3_IsolatedTesting
 from app.agents.agent1_blueprint import UpdatedAgent1_BlueprintGenerator
 from app.agents.agent4_results import UpdatedAgent4_FinalReporter
 
-# Import enhanced utilities with error handling
-try:
-    from app.utils.device_manager import DeviceManager
-    from app.utils.terminal_manager import TerminalManager
-    UTILS_AVAILABLE = True
-except ImportError:
-    UTILS_AVAILABLE = False
-    print("⚠️ Enhanced utils not available - using basic functionality")
-
 from app.database.database_manager import get_testing_db
+from app.utils.queue_logging import install_queue_logging, remove_queue_logging
 
 logger = logging.getLogger(__name__)
+# Phase banners and per-agent details log at DEBUG; set ORCH_LOG_LEVEL=INFO/DEBUG for more detail
+_orch_log_level = os.getenv("ORCH_LOG_LEVEL", "WARNING").upper()
+# logging._nameToLevel: getLevelNamesMapping() only exists from Python 3.11
+if _orch_log_level in logging._nameToLevel:
+    logger.setLevel(_orch_log_level)
+else:
+    logger.setLevel(logging.WARNING)
+    logger.warning("⚠️ Unknown ORCH_LOG_LEVEL %r, using WARNING", _orch_log_level)
+
+# `adb devices` results are reused for this long between pre-flight and status calls
+DEVICE_CACHE_TTL_SECONDS = 2.0
+
+# Per-phase results are appended here (one JSON object per line) as each phase finishes
+PHASES_LOG_NAME = "phases.ndjson"
+
+# Upper bound on failure-path cleanup so a stuck subprocess kill can't stall the response
+EMERGENCY_CLEANUP_TIMEOUT_SECONDS = 5.0
+
+# Log banners, built once at import
+_BANNER_START = "\\n🚀 ========== ENHANCED MULTI-AGENT WORKFLOW STARTED =========="
+_BANNER_START_RULE = "🚀 ============================================================="
+_BANNER_COMPLETE = "\\n🚀 ========== ENHANCED MULTI-AGENT WORKFLOW COMPLETED =========="
+_BANNER_COMPLETE_RULE = "🚀 ================================================================="
+_PHASE_BANNERS = {
+    1: ("\\n🔵 ========== PHASE 1: ENHANCED BLUEPRINT GENERATION ==========", "🔵 Agent 1: Processing document and generating enhanced blueprint..."),
+    2: ("\\n🟢 ========== PHASE 2: ENHANCED CODE GENERATION ==========", "🟢 Agent 2: Generating production-ready automation code..."),
+    3: ("\\n🟡 ========== PHASE 3: TERMINAL-ISOLATED TESTING ==========", "🟡 Agent 3: Setting up isolated testing environment..."),
+    4: ("\\n🔵 ========== PHASE 4: ENHANCED REPORTING ==========", "🔵 Agent 4: Generating comprehensive report..."),
+}
+
+# Workflows run concurrently up to this many; further submissions wait in FIFO order
+WORKFLOW_BATCH_SIZE = 8
+
+
+def _iso_now() -> str:
+    """Current UTC time as a timezone-aware ISO-8601 string"""
+    return datetime.now(timezone.utc).isoformat(timespec='milliseconds')
+
+
+def _write_summary(path: Path, data: Dict[str, Any]):
+    """Serialize workflow summary with orjson (runs in a worker thread)"""
+    path.write_bytes(orjson.dumps(data, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+
+
+def _append_phase(path: Path, phase_name: str, phase: Dict[str, Any]):
+    """Append one phase record to the NDJSON phase log (runs in a worker thread)"""
+    line = orjson.dumps(
+        {"phase": phase_name, **phase},
+        default=str,
+        option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS
+    )
+    with path.open("ab") as f:
+        f.write(line)
+
+
+class WorkflowScheduler:
+    """Interleaves submitted workflows on the event loop, at most batch_size in flight"""
+
+    def __init__(self, batch_size: int = WORKFLOW_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._pending: Deque[Tuple[Coroutine, asyncio.Future]] = deque()
+        self._active: Set[asyncio.Task] = set()
+
+    def submit(self, coro: Coroutine) -> asyncio.Future:
+        """Queue a workflow coroutine and return a future for its result"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((coro, future))
+        self._fill()
+        return future
+
+    def _fill(self):
+        """Start queued workflows while there is free capacity"""
+        while self._pending and len(self._active) < self.batch_size:
+            coro, future = self._pending.popleft()
+            if future.cancelled():
+                coro.close()
+                continue
+            task = asyncio.create_task(coro)
+            self._active.add(task)
+            task.add_done_callback(partial(self._finish, future))
+            # Cancelling the caller's future cancels the running workflow
+            future.add_done_callback(lambda f, task=task: task.cancel() if f.cancelled() else None)
+
+    def _finish(self, future: asyncio.Future, task: asyncio.Task):
+        """Hand the workflow outcome to its future and admit the next one"""
+        self._active.discard(task)
+        # Always retrieve the exception, even when nobody is waiting for the outcome any more
+        error = None if task.cancelled() else task.exception()
+        if future.done():
+            if error is not None:
+                logger.error("❌ Workflow failed after its caller stopped waiting: %r", error,
+                             exc_info=(type(error), error, error.__traceback__))
+        elif task.cancelled():
+            future.cancel()
+        elif error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(task.result())
+        self._fill()
+
 
 class EnhancedMultiAgentOrchestrator:
     """Enhanced Multi-Agent Orchestrator with Corrected Method Calls"""
@@ -36,6 +132,9 @@ class EnhancedMultiAgentOrchestrator:
     def __init__(self):
         self.version = "3.0.0-enhanced-fully-fixed"
         self.db_manager = None
+        self._log_listener: Optional[QueueListener] = None
+        self._devices_cache: Optional[tuple] = None
+        self.scheduler = WorkflowScheduler()
         
         # Initialize enhanced agents
         self.agent1 = UpdatedAgent1_BlueprintGenerator()
@@ -43,33 +142,95 @@ class EnhancedMultiAgentOrchestrator:
         self.agent3 = EnhancedAgent3_IsolatedTesting()
         self.agent4 = UpdatedAgent4_FinalReporter()
         
-        # Initialize enhanced utilities with fallbacks
-        if UTILS_AVAILABLE:
+        # Initialize enhanced utilities with fallbacks (imported lazily to keep module import light)
+        try:
+            from app.utils.device_manager import DeviceManager
             self.device_manager = DeviceManager()
-            self.terminal_manager = TerminalManager()
-        else:
+        except ImportError:
             self.device_manager = None
+            logger.warning("⚠️ Device manager not available - using basic functionality")
+        try:
+            from app.utils.terminal_manager import TerminalManager
+            self.terminal_manager = TerminalManager()
+        except ImportError:
             self.terminal_manager = None
+            logger.warning("⚠️ Terminal manager not available - using basic functionality")
+        
+        # Optional capabilities, resolved once instead of per status/cleanup call
+        self._has_tm_status = hasattr(self.terminal_manager, 'get_process_status')
+        self._has_tm_cleanup = hasattr(self.terminal_manager, 'cleanup_processes')
+        self._has_device_probe = hasattr(self.device_manager, 'get_connected_devices')
+        self._has_agent3_status = hasattr(self.agent3, 'get_testing_status')
+        self._has_agent3_cleanup = hasattr(self.agent3, 'cleanup_testing_processes')
+        
+        # Platform -> pre-flight coroutine; platforms without an entry skip pre-flight
+        self._preflight_impl = {'mobile': self._mobile_preflight} if self.device_manager else {}
 
     async def initialize(self):
         """Initialize enhanced orchestrator system"""
+        self._start_log_listener()
         logger.info("🚀 Initializing Enhanced Multi-Agent Orchestrator System...")
-        logger.info(f"🚀 Version: {self.version}")
+        logger.info("🚀 Version: %s", self.version)
         logger.info("🚀 Features: Terminal Isolation, Dynamic Device Detection, Appium Management, Enhanced Code Generation")
         
         # Initialize database
         self.db_manager = await get_testing_db()
         logger.info("🗄️ Enhanced database initialized")
         
-        # Initialize all agents
-        await self.agent1.initialize()
-        await self.agent2.initialize()
-        await self.agent3.initialize()
-        await self.agent4.initialize()
+        # Initialize all agents concurrently (database is ready above)
+        init_results = await asyncio.gather(
+            self.agent1.initialize(),
+            self.agent2.initialize(),
+            self.agent3.initialize(),
+            self.agent4.initialize(),
+            return_exceptions=True
+        )
+        for result in init_results:
+            if isinstance(result, BaseException):
+                raise result
         
         logger.info("✅ Enhanced Multi-Agent Orchestrator System initialized")
         logger.info("📋 Ready for advanced automation tasks with isolated testing")
 
+    def _cached_devices(self) -> List[Dict[str, Any]]:
+        """Connected devices, re-probed via adb at most once per DEVICE_CACHE_TTL_SECONDS"""
+        now = time.monotonic()
+        if self._devices_cache and now - self._devices_cache[0] < DEVICE_CACHE_TTL_SECONDS:
+            return self._devices_cache[1]
+        devices = self.device_manager.get_connected_devices()
+        self._devices_cache = (now, devices)
+        return devices
+
+    async def _mobile_preflight(self):
+        """Probe ADB, connected devices and the Appium server before mobile testing"""
+        logger.debug("🟡 Agent 3: Performing mobile environment pre-flight checks...")
+        
+        # ADB, device and Appium probes shell out; run them side by side off the loop
+        adb_available, devices, appium_status = await asyncio.gather(
+            asyncio.to_thread(self.device_manager.check_adb_available),
+            asyncio.to_thread(self._cached_devices),
+            asyncio.to_thread(self.terminal_manager.get_appium_server_status)
+            if self.terminal_manager else asyncio.sleep(0)
+        )
+        
+        if not adb_available:
+            logger.warning("⚠️ ADB not available - mobile testing may fail")
+        
+        if not devices:
+            logger.warning("⚠️ No Android devices connected - mobile testing may fail")
+        else:
+            logger.debug("📱 Found %d connected device(s)", len(devices))
+            for device in devices:
+                logger.debug("  • %s (%s)", device['device_name'], device['device_id'])
+        
+        if appium_status:
+            logger.debug("🔧 Appium server status: %s", appium_status['status'])
+
+    def _start_log_listener(self):
+        """Route logging through the background listener (no-op if already queued)"""
+        if self._log_listener is None:
+            self._log_listener = install_queue_logging()
+
     async def execute_enhanced_workflow(
         self,
         instruction: str,
@@ -79,14 +240,19 @@ class EnhancedMultiAgentOrchestrator:
         additional_data: Dict[str, Any] = None
     ) -> Dict[str, Any]:
         """Execute enhanced multi-agent workflow with terminal isolation"""
+        platform = platform.lower()
+        self._start_log_listener()
         workflow_start_time = time.time()
-        logger.info("\\n🚀 ========== ENHANCED MULTI-AGENT WORKFLOW STARTED ==========")
-        logger.info(f"🚀 Version: {self.version}")
-        logger.info(f"🚀 Instruction: {instruction}")
-        logger.info(f"🚀 Platform: {platform}")
-        logger.info(f"🚀 Document Size: {len(document_data) if document_data else 0} bytes")
-        logger.info(f"🚀 Screenshots: {len(screenshots) if screenshots else 0}")
-        logger.info("🚀 =============================================================")
+        workflow_t0 = time.perf_counter()  # monotonic base for all durations
+        additional_data = additional_data or {}
+        screenshots = screenshots or []
+        logger.debug(_BANNER_START)
+        logger.debug("🚀 Version: %s", self.version)
+        logger.debug("🚀 Instruction: %s", instruction)
+        logger.debug("🚀 Platform: %s", platform)
+        logger.debug("🚀 Document Size: %d bytes", len(document_data) if document_data else 0)
+        logger.debug("🚀 Screenshots: %d", len(screenshots))
+        logger.debug(_BANNER_START_RULE)
         
         workflow_results = {
             "version": self.version,
@@ -95,20 +261,20 @@ class EnhancedMultiAgentOrchestrator:
             "start_time": workflow_start_time,
             "phases": {}
         }
+        agent4_task: Optional[asyncio.Task] = None
         
         try:
             # ========== PHASE 1: ENHANCED BLUEPRINT GENERATION ==========
-            logger.info("\\n🔵 ========== PHASE 1: ENHANCED BLUEPRINT GENERATION ==========")
-            logger.info("🔵 Agent 1: Processing document and generating enhanced blueprint...")
-            phase1_start = time.time()
+            logger.debug("%s\n%s", *_PHASE_BANNERS[1])
+            phase1_start = time.perf_counter()
             
             # CORRECTED: Use actual Agent 1 method name and parameters
             agent1_results = await self.agent1.process_and_generate_blueprint(
                 document_content=document_data,
-                screenshots=screenshots or [],
+                screenshots=screenshots,
                 instruction=instruction,
                 platform=platform,
-                additional_data=additional_data or {}
+                additional_data=additional_data
             )
             
             if not agent1_results.get("success"):
@@ -116,31 +282,40 @@ class EnhancedMultiAgentOrchestrator:
             
             workflow_results["phases"]["phase1"] = {
                 "agent": "agent1_blueprint",
-                "duration": time.time() - phase1_start,
+                "duration": time.perf_counter() - phase1_start,
                 "results": agent1_results
             }
-            
-            logger.info("🔵 Agent 1 Results:")
-            logger.info(f"🔵   Sequential Task ID: {agent1_results['seq_id']}")
-            logger.info(f"🔵   Base Path: {agent1_results['base_path']}")
-            logger.info(f"🔵   Blueprint Path: {agent1_results['blueprint_path']}")
-            logger.info(f"🔵   Text Extracted: {agent1_results['text_extracted']} chars")
-            logger.info(f"🔵   UI Elements: {agent1_results['ui_elements']}")
-            logger.info(f"🔵   Automation Steps: {agent1_results['automation_steps']}")
-            logger.info(f"🔵   Blueprint Confidence: {agent1_results['blueprint_confidence']}")
+            base_path = Path(agent1_results['base_path'])
+            blueprint_path = Path(agent1_results['blueprint_path'])
+            phases_log = base_path / PHASES_LOG_NAME
+            await asyncio.to_thread(_append_phase, phases_log, "phase1", workflow_results["phases"]["phase1"])
+            
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "%s\n%s",
+                    "🔵 Agent 1 Results:",
+                    "\n".join([
+                        f"🔵   Sequential Task ID: {agent1_results['seq_id']}",
+                        f"🔵   Base Path: {agent1_results['base_path']}",
+                        f"🔵   Blueprint Path: {agent1_results['blueprint_path']}",
+                        f"🔵   Text Extracted: {agent1_results['text_extracted']} chars",
+                        f"🔵   UI Elements: {agent1_results['ui_elements']}",
+                        f"🔵   Automation Steps: {agent1_results['automation_steps']}",
+                        f"🔵   Blueprint Confidence: {agent1_results['blueprint_confidence']}"
+                    ])
+                )
             
             # ========== PHASE 2: ENHANCED CODE GENERATION ==========
-            logger.info("\\n🟢 ========== PHASE 2: ENHANCED CODE GENERATION ==========")
-            logger.info("🟢 Agent 2: Generating production-ready automation code...")
-            phase2_start = time.time()
+            logger.debug("%s\n%s", *_PHASE_BANNERS[2])
+            phase2_start = time.perf_counter()
             
             # CORRECTED: Use actual Agent 2 method name and parameters
             agent2_results = await self.agent2.generate_production_code(
                 task_id=agent1_results['seq_id'],
-                blueprint_path=Path(agent1_results['blueprint_path']),
+                blueprint_path=blueprint_path,
                 instruction=instruction,
                 platform=platform,
-                additional_data=additional_data or {}
+                additional_data=additional_data
             )
             
             if not agent2_results.get("success"):
@@ -151,99 +326,110 @@ class EnhancedMultiAgentOrchestrator:
             
             workflow_results["phases"]["phase2"] = {
                 "agent": "enhanced_agent2_code",
-                "duration": time.time() - phase2_start,
+                "duration": time.perf_counter() - phase2_start,
                 "results": agent2_results
             }
-            
-            logger.info("🟢 Agent 2 Results:")
-            logger.info(f"🟢   Agent2 Path: {agent2_results['agent2_path']}")
-            logger.info(f"🟢   Script Generated: {agent2_results['script_size']} characters")
-            logger.info(f"🟢   Requirements: {agent2_results['requirements_path']}")
-            logger.info(f"🟢   OCR Logs Prepared: {agent2_results['ocr_logs_prepared']}")
-            logger.info(f"🟢   Workflow Steps: {agent2_results['workflow_steps']}")
-            logger.info(f"🟢   Device Config Created: {agent2_results.get('device_config_created', False)}")
-            logger.info(f"🟢   Ready for Isolated Testing: ✅")
+            await asyncio.to_thread(_append_phase, phases_log, "phase2", workflow_results["phases"]["phase2"])
+            
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "%s\n%s",
+                    "🟢 Agent 2 Results:",
+                    "\n".join([
+                        f"🟢   Agent2 Path: {agent2_results['agent2_path']}",
+                        f"🟢   Script Generated: {agent2_results['script_size']} characters",
+                        f"🟢   Requirements: {agent2_results['requirements_path']}",
+                        f"🟢   OCR Logs Prepared: {agent2_results['ocr_logs_prepared']}",
+                        f"🟢   Workflow Steps: {agent2_results['workflow_steps']}",
+                        f"🟢   Device Config Created: {agent2_results.get('device_config_created', False)}",
+                        f"🟢   Ready for Isolated Testing: ✅"
+                    ])
+                )
             
             # ========== PHASE 3: TERMINAL-ISOLATED TESTING ==========
-            logger.info("\\n🟡 ========== PHASE 3: TERMINAL-ISOLATED TESTING ==========")
-            logger.info("🟡 Agent 3: Setting up isolated testing environment...")
+            logger.debug("%s\n%s", *_PHASE_BANNERS[3])
             
-            # Pre-flight checks for mobile platform
-            if platform.lower() == 'mobile' and self.device_manager:
-                logger.info("🟡 Agent 3: Performing mobile environment pre-flight checks...")
-                
-                # Check ADB availability
-                if not self.device_manager.check_adb_available():
-                    logger.warning("⚠️ ADB not available - mobile testing may fail")
-                
-                # Check for connected devices
-                devices = self.device_manager.get_connected_devices()
-                if not devices:
-                    logger.warning("⚠️ No Android devices connected - mobile testing may fail")
-                else:
-                    logger.info(f"📱 Found {len(devices)} connected device(s)")
-                    for device in devices:
-                        logger.info(f"  • {device['device_name']} ({device['device_id']})")
-                
-                # Check Appium server status
-                if self.terminal_manager:
-                    appium_status = self.terminal_manager.get_appium_server_status()
-                    logger.info(f"🔧 Appium server status: {appium_status['status']}")
+            # Platform-specific pre-flight (selected once from the dispatch table)
+            preflight = self._preflight_impl.get(platform)
+            if preflight is not None:
+                await preflight()
+            
+            # Agent 4 only needs the seq_id unless it reports on Agent 3 output;
+            # in that case it overlaps the (long) isolated testing phase
+            if not getattr(self.agent4, "requires_agent3_output", True):
+                agent4_task = asyncio.create_task(
+                    self.agent4.generate_final_report(seq_id=agent1_results['seq_id'])
+                )
             
-            phase3_start = time.time()
+            phase3_start = time.perf_counter()
             
             # CORRECTED: Use actual Agent 3 method name and parameters
             agent3_results = await self.agent3.execute_isolated_testing(
                 task_id=agent1_results['seq_id'],
-                base_path=Path(agent1_results['base_path']),
+                base_path=base_path,
                 agent2_results=agent2_results,
                 platform=platform,
-                additional_data=additional_data or {}
+                additional_data=additional_data
             )
             
             workflow_results["phases"]["phase3"] = {
                 "agent": "enhanced_agent3_isolated_testing",
-                "duration": time.time() - phase3_start,
+                "duration": time.perf_counter() - phase3_start,
                 "results": agent3_results
             }
-            
-            logger.info("🟡 Agent 3 Results:")
-            logger.info(f"🟡   Testing Path: {agent3_results.get('testing_path', 'N/A')}")
-            logger.info(f"🟡   Virtual Environment: {agent3_results.get('virtual_environment', '❌')}")
-            logger.info(f"🟡   Dependencies Installed: {'✅' if agent3_results.get('dependencies_installed') else '❌'}")
-            logger.info(f"🟡   Mobile Environment: {'✅' if agent3_results.get('mobile_environment') else '❌'}")
-            logger.info(f"🟡   Terminal Execution: {'✅' if agent3_results.get('terminal_execution') else '❌'}")
-            logger.info(f"🟡   Processes Launched: {agent3_results.get('processes_launched', 0)}")
-            logger.info(f"🟡   Test Results: {'✅ Available' if agent3_results.get('test_results') else '❌ Not Available'}")
+            await asyncio.to_thread(_append_phase, phases_log, "phase3", workflow_results["phases"]["phase3"])
+            
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "%s\n%s",
+                    "🟡 Agent 3 Results:",
+                    "\n".join([
+                        f"🟡   Testing Path: {agent3_results.get('testing_path', 'N/A')}",
+                        f"🟡   Virtual Environment: {agent3_results.get('virtual_environment', '❌')}",
+                        f"🟡   Dependencies Installed: {'✅' if agent3_results.get('dependencies_installed') else '❌'}",
+                        f"🟡   Mobile Environment: {'✅' if agent3_results.get('mobile_environment') else '❌'}",
+                        f"🟡   Terminal Execution: {'✅' if agent3_results.get('terminal_execution') else '❌'}",
+                        f"🟡   Processes Launched: {agent3_results.get('processes_launched', 0)}",
+                        f"🟡   Test Results: {'✅ Available' if agent3_results.get('test_results') else '❌ Not Available'}"
+                    ])
+                )
             
             # ========== PHASE 4: ENHANCED REPORTING ==========
-            logger.info("\\n🔵 ========== PHASE 4: ENHANCED REPORTING ==========")
-            logger.info("🔵 Agent 4: Generating comprehensive report...")
-            phase4_start = time.time()
+            logger.debug("%s\n%s", *_PHASE_BANNERS[4])
+            phase4_start = time.perf_counter()
             
             # CORRECTED: Use actual Agent 4 method name and parameters
-            agent4_results = await self.agent4.generate_final_report(
-                seq_id=agent1_results['seq_id']
-            )
+            if agent4_task is not None:
+                agent4_results = await agent4_task
+            else:
+                agent4_results = await self.agent4.generate_final_report(
+                    seq_id=agent1_results['seq_id']
+                )
             
             workflow_results["phases"]["phase4"] = {
                 "agent": "agent4_enhanced_results",
-                "duration": time.time() - phase4_start,
+                "duration": time.perf_counter() - phase4_start,
                 "results": agent4_results
             }
-            
-            if agent4_results.get("success"):
-                logger.info("🔵 Agent 4 Results:")
-                logger.info(f"🔵   Agent4 Path: {agent4_results.get('agent4_path', 'N/A')}")
-                logger.info(f"🔵   Final Report: {agent4_results.get('final_report', {}).get('text_report', 'N/A')}")
-                logger.info(f"🔵   CSV Export: {agent4_results.get('csv_export', {}).get('csv_path', 'N/A')}")
-                logger.info(f"🔵   Conversation Log: {agent4_results.get('conversation_log', {}).get('log_path', 'N/A')}")
-                logger.info(f"🔵   Files Generated: {len(agent4_results.get('files_generated', []))}")
-            else:
-                logger.warning(f"🔵 Agent 4 completed with issues: {agent4_results.get('error', 'Unknown error')}")
+            await asyncio.to_thread(_append_phase, phases_log, "phase4", workflow_results["phases"]["phase4"])
+            
+            if not agent4_results.get("success"):
+                logger.warning("🔵 Agent 4 completed with issues: %s", agent4_results.get('error', 'Unknown error'))
+            elif logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "%s\n%s",
+                    "🔵 Agent 4 Results:",
+                    "\n".join([
+                        f"🔵   Agent4 Path: {agent4_results.get('agent4_path', 'N/A')}",
+                        f"🔵   Final Report: {agent4_results.get('final_report', {}).get('text_report', 'N/A')}",
+                        f"🔵   CSV Export: {agent4_results.get('csv_export', {}).get('csv_path', 'N/A')}",
+                        f"🔵   Conversation Log: {agent4_results.get('conversation_log', {}).get('log_path', 'N/A')}",
+                        f"🔵   Files Generated: {len(agent4_results.get('files_generated', []))}"
+                    ])
+                )
             
             # Calculate final metrics
-            total_duration = time.time() - workflow_start_time
+            total_duration = time.perf_counter() - workflow_t0
             overall_success = all([
                 agent1_results.get("success"),
                 agent2_results.get("success"),
@@ -258,41 +444,56 @@ class EnhancedMultiAgentOrchestrator:
                 "base_path": agent1_results['base_path']
             })
             
-            # Save workflow summary
-            summary_path = Path(agent1_results['base_path']) / "enhanced_workflow_summary.json"
-            with open(summary_path, 'w', encoding='utf-8') as f:
-                json.dump(workflow_results, f, indent=2, ensure_ascii=False, default=str)
-            
-            logger.info(f"🚀 Enhanced workflow summary saved: {summary_path}")
-            
-            logger.info("\\n🚀 ========== ENHANCED MULTI-AGENT WORKFLOW COMPLETED ==========")
-            logger.info(f"🚀 Overall Result: {'✅ SUCCESS' if overall_success else '⚠️ COMPLETED WITH ISSUES'}")
-            logger.info(f"🚀 Sequential Task ID: {agent1_results['seq_id']}")
-            logger.info(f"🚀 Final Confidence: {agent1_results.get('blueprint_confidence', 0.0):.3f}")
-            logger.info(f"🚀 Total Execution Time: {total_duration:.1f} seconds")
-            logger.info(f"🚀 Terminal Processes: {agent3_results.get('processes_launched', 0)}")
-            logger.info(f"🚀 Base Path: {agent1_results['base_path']}")
-            logger.info(f"🚀 Testing Environment: {'✅ ISOLATED' if agent3_results.get('success') else '❌ ISSUES'}")
-            logger.info(f"🚀 Final Report: {'✅ GENERATED' if agent4_results.get('success') else '❌ FAILED'}")
-            logger.info("🚀 =================================================================")
+            # Save workflow summary (phase details are already in the NDJSON phase log)
+            summary_path = base_path / "enhanced_workflow_summary.json"
+            summary = {k: v for k, v in workflow_results.items() if k != "phases"}
+            summary["phases_log"] = str(phases_log)
+            await asyncio.to_thread(_write_summary, summary_path, summary)
+            
+            logger.info("🚀 Enhanced workflow summary saved: %s", summary_path)
+            
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "%s\n%s",
+                    _BANNER_COMPLETE,
+                    "\n".join([
+                        f"🚀 Overall Result: {'✅ SUCCESS' if overall_success else '⚠️ COMPLETED WITH ISSUES'}",
+                        f"🚀 Sequential Task ID: {agent1_results['seq_id']}",
+                        f"🚀 Final Confidence: {agent1_results.get('blueprint_confidence', 0.0):.3f}",
+                        f"🚀 Total Execution Time: {total_duration:.1f} seconds",
+                        f"🚀 Terminal Processes: {agent3_results.get('processes_launched', 0)}",
+                        f"🚀 Base Path: {agent1_results['base_path']}",
+                        f"🚀 Testing Environment: {'✅ ISOLATED' if agent3_results.get('success') else '❌ ISSUES'}",
+                        f"🚀 Final Report: {'✅ GENERATED' if agent4_results.get('success') else '❌ FAILED'}",
+                        _BANNER_COMPLETE_RULE
+                    ])
+                )
             
             return workflow_results
             
         except Exception as e:
-            logger.error(f"❌ Enhanced workflow failed: {str(e)}")
+            logger.error("❌ Enhanced workflow failed: %s", e)
+            
+            if agent4_task is not None and not agent4_task.done():
+                agent4_task.cancel()
             
             # Cleanup on failure
             try:
-                if hasattr(self.agent3, 'cleanup_testing_processes'):
-                    await self.agent3.cleanup_testing_processes()
+                if self._has_agent3_cleanup:
+                    await asyncio.wait_for(
+                        self.agent3.cleanup_testing_processes(),
+                        timeout=EMERGENCY_CLEANUP_TIMEOUT_SECONDS
+                    )
                 logger.info("✅ Emergency cleanup completed")
+            except asyncio.TimeoutError:
+                logger.warning("⚠️ Emergency cleanup timed out after %ss", EMERGENCY_CLEANUP_TIMEOUT_SECONDS)
             except Exception as cleanup_error:
-                logger.warning(f"⚠️ Cleanup had issues: {str(cleanup_error)}")
+                logger.warning("⚠️ Cleanup had issues: %s", cleanup_error)
             
             workflow_results.update({
                 "overall_success": False,
                 "error": str(e),
-                "total_duration": time.time() - workflow_start_time,
+                "total_duration": time.perf_counter() - workflow_t0,
                 "cleanup_performed": True
             })
             
@@ -304,22 +505,24 @@ class EnhancedMultiAgentOrchestrator:
             status = {
                 "task_id": task_id,
                 "orchestrator_version": self.version,
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": _iso_now()
             }
             
-            # Get terminal manager status
-            if self.terminal_manager and hasattr(self.terminal_manager, 'get_process_status'):
-                status["terminal_processes"] = self.terminal_manager.get_process_status()
-                status["appium_server"] = self.terminal_manager.check_appium_running()
+            # Get terminal manager status (probes shell out, so keep them off the loop)
+            if self._has_tm_status:
+                status["terminal_processes"], status["appium_server"] = await asyncio.gather(
+                    asyncio.to_thread(self.terminal_manager.get_process_status),
+                    asyncio.to_thread(self.terminal_manager.check_appium_running)
+                )
             
             # Get Agent 3 status
-            if hasattr(self.agent3, 'get_testing_status'):
+            if self._has_agent3_status:
                 agent3_status = await self.agent3.get_testing_status(task_id)
                 status["agent3"] = agent3_status
             
             # Get device information
-            if self.device_manager and hasattr(self.device_manager, 'get_connected_devices'):
-                devices = self.device_manager.get_connected_devices()
+            if self._has_device_probe:
+                devices = await asyncio.to_thread(self._cached_devices)
                 status["connected_devices"] = len(devices)
                 if devices:
                     status["devices"] = [
@@ -337,36 +540,47 @@ class EnhancedMultiAgentOrchestrator:
             return {
                 "error": str(e),
                 "task_id": task_id,
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": _iso_now()
             }
 
     async def cleanup_workflow(self, task_id: int):
         """Clean up workflow resources and processes"""
         try:
-            logger.info(f"🧹 Cleaning up workflow resources for task {task_id}")
+            logger.info("🧹 Cleaning up workflow resources for task %s", task_id)
+            self._devices_cache = None
             
             # Cleanup Agent 3 processes
-            if hasattr(self.agent3, 'cleanup_testing_processes'):
+            if self._has_agent3_cleanup:
                 await self.agent3.cleanup_testing_processes()
                 
             # Cleanup terminal manager
-            if self.terminal_manager and hasattr(self.terminal_manager, 'cleanup_processes'):
-                self.terminal_manager.cleanup_processes()
+            if self._has_tm_cleanup:
+                await asyncio.to_thread(self.terminal_manager.cleanup_processes)
             
             logger.info("✅ Workflow cleanup completed")
             
         except Exception as e:
-            logger.error(f"❌ Workflow cleanup failed: {str(e)}")
+            logger.error("❌ Workflow cleanup failed: %s", e)
+        
+        # Flush pending log records and restore direct handlers
+        if self._log_listener is not None:
+            remove_queue_logging(self._log_listener)
+            self._log_listener = None
 
 # Global orchestrator instance for main application
 _enhanced_orchestrator: Optional[EnhancedMultiAgentOrchestrator] = None
+_init_lock = asyncio.Lock()
 
 async def get_enhanced_orchestrator() -> EnhancedMultiAgentOrchestrator:
     """Get or create enhanced orchestrator instance"""
     global _enhanced_orchestrator
     if _enhanced_orchestrator is None:
-        _enhanced_orchestrator = EnhancedMultiAgentOrchestrator()
-        await _enhanced_orchestrator.initialize()
+        async with _init_lock:
+            # Re-check: another request may have finished initialization while we waited
+            if _enhanced_orchestrator is None:
+                orchestrator = EnhancedMultiAgentOrchestrator()
+                await orchestrator.initialize()
+                _enhanced_orchestrator = orchestrator
     return _enhanced_orchestrator
 
 if __name__ == "__main__":
@@ -381,7 +595,7 @@ if __name__ == "__main__":
         
         # Test device detection
         if orchestrator.device_manager:
-            devices = orchestrator.device_manager.get_connected_devices()
+            devices = await asyncio.to_thread(orchestrator.device_manager.get_connected_devices)
             print(f"📱 Connected devices: {len(devices)}")
         
         # Test terminal manager
@@ -389,7 +603,7 @@ if __name__ == "__main__":
             print(f"🖥️ Platform: {orchestrator.terminal_manager.system}")
             
             # Test Appium server check
-            appium_status = orchestrator.terminal_manager.get_appium_server_status()
+            appium_status = await asyncio.to_thread(orchestrator.terminal_manager.get_appium_server_status)
             print(f"🔧 Appium server: {appium_status['status']}")
         
         await orchestrator.cleanup_workflow(0)
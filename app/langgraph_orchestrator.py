@@ -5,18 +5,28 @@ State-driven workflow with proper agent communication and testing environment
 import asyncio
 import json
 import logging
+import operator
+import shutil
 import time
 import os
-from datetime import datetime
+import uuid
+import orjson
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Any, Optional, TypedDict, Annotated
+from types import MappingProxyType
+from typing import Dict, List, Any, Optional, Tuple, TypedDict, Annotated
 from typing_extensions import Literal
-from langgraph.checkpoint.sqlite import SqliteSaver
+
+try:
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+    from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+except ImportError:
+    AsyncSqliteSaver = None
+    JsonPlusSerializer = None
 
 # LangGraph imports for state management and workflow
 try:
     from langgraph.graph import StateGraph, START, END
-    from langgraph.graph.message import add_messages
     from langgraph.prebuilt import ToolExecutor, tools_condition
     LANGGRAPH_AVAILABLE = True
 except ImportError:
@@ -31,7 +41,7 @@ from app.agents.agent1_blueprint import UpdatedAgent1_BlueprintGenerator
 from app.agents.agent4_results import UpdatedAgent4_FinalReporter
 
 # Import existing automation tools
-from app.drivers.playwright_driver import playwright_driver
+from app.drivers.playwright_driver import playwright_driver, playwright_pool
 from app.drivers.appium_driver import appium_driver
 from app.tools.web_tools import web_tools
 from app.tools.mobile_tools import mobile_tools
@@ -39,6 +49,122 @@ from app.utils.ocr_utils import ocr_processor
 
 logger = logging.getLogger(__name__)
 
+# Checkpoint database shared by every workflow for the orchestrator's lifetime
+CHECKPOINT_DB_PATH = "checkpoints.sqlite"
+
+# Applied once to the checkpoint connection: WAL so readers don't block the writer,
+# NORMAL sync (one fsync per checkpoint instead of per commit), and a busy wait for overlapping workflows
+_CHECKPOINT_PRAGMAS = """
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+PRAGMA busy_timeout=5000;
+PRAGMA temp_store=MEMORY;
+PRAGMA cache_size=-20000;
+"""
+
+# Agent 2 calls made inside the code node before it gives up on a script that is not ready
+MAX_CODE_ATTEMPTS = 3
+
+# Testing passes allowed to loop back (through Agent 2 or a retest) before the workflow stops retrying
+MAX_WORKFLOW_RETRIES = 3
+
+# Agent 3 -> Agent 2 feedback rounds before testing stops asking for code changes
+MAX_AGENT2_COLLABORATIONS = 3
+
+# Results that must all report success for the workflow to succeed
+_AGENT_RESULT_KEYS = ("agent1_result", "agent2_result", "agent3_result", "agent4_result")
+
+# Task progress flag -> agent result that sets it when successful
+_PROGRESS_FLAGS = {
+    "blueprint_generated": "agent1_result",
+    "code_generated": "agent2_result",
+    "testing_completed": "agent3_result",
+    "final_report_generated": "agent4_result",
+}
+
+# Per-run binary inputs are spilled here so state carries only file references
+INPUTS_DIR = Path("langgraph_inputs")
+
+# Truncate the checkpoint WAL in the background after this many workflows to bound its size
+_WAL_TRUNCATE_EVERY = 50
+
+# Run the event loop on libuv when available; the stdlib loop is the fallback (e.g. Windows)
+try:
+    import uvloop
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+except ImportError:
+    logger.debug("uvloop not installed - using default asyncio event loop")
+
+def _write_inputs(run_dir: Path, document_content: Optional[bytes],
+                  screenshots: List[bytes]) -> Tuple[Optional[str], List[str]]:
+    """Write workflow input blobs to run_dir and return their paths (runs in a worker thread)"""
+    run_dir.mkdir(parents=True, exist_ok=True)
+    document_ref = None
+    if document_content is not None:
+        document_path = run_dir / "document.bin"
+        document_path.write_bytes(document_content)
+        document_ref = str(document_path)
+    screenshot_refs = []
+    for index, screenshot in enumerate(screenshots):
+        screenshot_path = run_dir / f"screenshot_{index}.png"
+        screenshot_path.write_bytes(screenshot)
+        screenshot_refs.append(str(screenshot_path))
+    return document_ref, screenshot_refs
+
+
+def _read_screenshots(screenshot_refs: List[str]) -> List[bytes]:
+    """Load screenshot blobs back from their paths (runs in a worker thread)"""
+    return [Path(ref).read_bytes() for ref in screenshot_refs]
+
+
+def _record_error(updates: Dict[str, Any], agent: str, error_msg: str, timestamp: str) -> None:
+    """Log a node failure and record it in the node's partial state update"""
+    logger.error("🔴 [LangGraph] %s", error_msg)
+    updates["error_messages"] = [error_msg]
+    updates["messages"] = [{
+        "role": "error",
+        "content": error_msg,
+        "agent": agent,
+        "timestamp": timestamp
+    }]
+
+
+if JsonPlusSerializer is not None:
+    class OrjsonCheckpointSerializer(JsonPlusSerializer):
+        """Checkpoint serde that encodes plain state with orjson, deferring anything else to JsonPlus"""
+        
+        def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+            try:
+                return "orjson", orjson.dumps(obj, option=orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY)
+            except TypeError:
+                # bytes, non-str keys, LangChain objects, ... keep the JsonPlus encoding
+                return super().dumps_typed(obj)
+        
+        def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+            type_, payload = data
+            if type_ == "orjson":
+                return orjson.loads(payload)
+            return super().loads_typed(data)
+
+
+# Scalar state defaults shared by every run; execute_complete_workflow merges in per-run values
+_DEFAULT_STATE = MappingProxyType({
+    "seq_id": None,
+    "base_path": None,
+    "agent1_result": None,
+    "agent2_result": None,
+    "agent3_result": None,
+    "agent4_result": None,
+    "current_phase": "starting",
+    "overall_success": False,
+    "retry_count": 0,
+    "final_confidence": 0.0,
+    "performance_grade": "Unknown",
+    "testing_env_ready": False,
+    "virtual_env_path": None,
+})
+
+
 # LangGraph State Schema
 class AutomationState(TypedDict):
     """State schema for the automation workflow"""
@@ -48,9 +174,9 @@ class AutomationState(TypedDict):
     platform: str
     base_path: Optional[str]
     
-    # Document and media inputs
-    document_content: bytes
-    screenshots: List[bytes]
+    # Document and media inputs (file references; the bytes stay out of checkpoints)
+    document_ref: Optional[str]
+    screenshot_refs: List[str]
     additional_data: Optional[Dict[str, Any]]
     
     # Agent results and communication
@@ -59,17 +185,18 @@ class AutomationState(TypedDict):
     agent3_result: Optional[Dict[str, Any]]
     agent4_result: Optional[Dict[str, Any]]
     
-    # Inter-agent messages for communication
-    messages: Annotated[List[Dict[str, Any]], add_messages]
+    # Inter-agent messages for communication (plain dicts, appended by node deltas)
+    messages: Annotated[List[Dict[str, Any]], operator.add]
     
     # Workflow status and control
     current_phase: str
     overall_success: bool
-    error_messages: List[str]
+    error_messages: Annotated[List[str], operator.add]
+    retry_count: Annotated[int, operator.add]
     
     # Performance metrics
     start_time: float
-    phase_timings: Dict[str, float]
+    phase_timings: Annotated[Dict[str, float], operator.or_]
     final_confidence: float
     performance_grade: str
     
@@ -84,11 +211,20 @@ class LangGraphMultiAgentOrchestrator:
     Uses nodes and edges for agent coordination with testing environment integration
     """
     
+    # Upper bound on each agent call (seconds) so a stalled agent cannot hang the run
+    AGENT1_TIMEOUT_S = 300
+    AGENT2_TIMEOUT_S = 300
+    AGENT3_TIMEOUT_S = 900
+    AGENT4_TIMEOUT_S = 120
+    
     def __init__(self):
         self.orchestrator_version = "3.0.0-langgraph"
         self.db_manager = None
         self.graph = None
+        self.compiled_graph = None
         self.checkpointer = None
+        self._checkpointer_cm = None
+        self._workflows_since_truncate = 0
         
         # Initialize all agents
         self.agent1 = UpdatedAgent1_BlueprintGenerator()
@@ -103,39 +239,76 @@ class LangGraphMultiAgentOrchestrator:
         self.mobile_tools = mobile_tools
         self.ocr_processor = ocr_processor
         
+        # Handed to Agent 2 by reference on every run; never stored in graph state
+        self._automation_tools = {
+            "playwright_driver": self.playwright_driver,
+            "appium_driver": self.appium_driver,
+            "web_tools": self.web_tools,
+            "mobile_tools": self.mobile_tools,
+            "ocr_processor": self.ocr_processor
+        }
+        
         self.initialized = False
+        self._init_lock = asyncio.Lock()
     
     async def initialize(self):
         """Initialize database, agents, and LangGraph workflow"""
         if self.initialized:
             return
-        
+        async with self._init_lock:
+            # Re-check: a concurrent caller may have finished initialization while we waited
+            if not self.initialized:
+                try:
+                    await self._initialize()
+                except BaseException:
+                    # Don't leave a half-open checkpointer behind for the next attempt
+                    await self._close_checkpointer()
+                    raise
+    
+    async def _initialize(self):
+        """One-time initialization body (runs under _init_lock)"""
         logger.info("🚀 Initializing LangGraph Multi-Agent Orchestrator System...")
-        logger.info(f"🚀 Version: {self.orchestrator_version}")
+        logger.info("🚀 Version: %s", self.orchestrator_version)
         logger.info("🚀 Features: LangGraph State Management, Agent Communication, Testing Environment")
         
         if not LANGGRAPH_AVAILABLE:
             raise RuntimeError("LangGraph is required but not installed")
         
-        # Initialize database
-        self.db_manager = await get_testing_db()
-        
-        # Initialize all agents
-        await self.agent1.initialize()
-        await self.agent2.initialize()
-        await self.agent3.initialize()
-        await self.agent4.initialize()
+        # Initialize database and all agents concurrently (independent I/O-bound warmups)
+        init_names = ("database", "agent1", "agent2", "agent3", "agent4")
+        init_results = await asyncio.gather(
+            get_testing_db(),
+            self.agent1.initialize(),
+            self.agent2.initialize(),
+            self.agent3.initialize(),
+            self.agent4.initialize(),
+            return_exceptions=True
+        )
+        failures = [
+            (name, result) for name, result in zip(init_names, init_results)
+            if isinstance(result, BaseException)
+        ]
+        for name, error in failures:
+            logger.error("🔴 [LangGraph] %s initialization failed: %s", name, error)
+        if failures:
+            raise failures[0][1]
+        self.db_manager = init_results[0]
         
         # Create LangGraph workflow
         self.graph = self._build_langgraph_workflow()
         
-        # Set up checkpointer for state persistence
-        if SqliteSaver:
-            with SqliteSaver.from_conn_string("checkpoints.sqlite") as checkpointer:
-                self.checkpointer = checkpointer
+        # Set up checkpointer for state persistence; the connection stays open until aclose()
+        if AsyncSqliteSaver is not None:
+            self._checkpointer_cm = AsyncSqliteSaver.from_conn_string(CHECKPOINT_DB_PATH)
+            self.checkpointer = await self._checkpointer_cm.__aenter__()
+            await self.checkpointer.conn.executescript(_CHECKPOINT_PRAGMAS)
+            self.checkpointer.serde = OrjsonCheckpointSerializer()
         else:
             self.checkpointer = None
-            logger.warning("Using in-memory checkpointing")
+            logger.warning("SQLite checkpointer not available - running without checkpoints")
+        
+        # Compile once; every workflow reuses the compiled graph
+        self.compiled_graph = self.graph.compile(checkpointer=self.checkpointer)
         
         self.initialized = True
         logger.info("✅ LangGraph Multi-Agent Orchestrator System initialized")
@@ -169,7 +342,6 @@ class LangGraphMultiAgentOrchestrator:
             self._should_proceed_to_testing,
             {
                 "testing": "testing_agent",
-                "retry_code": "code_agent",  # Loop back for improvements
                 "error": END
             }
         )
@@ -193,314 +365,351 @@ class LangGraphMultiAgentOrchestrator:
         return workflow
     
     # LangGraph Node Functions
+    # Nodes return partial updates; LangGraph merges them through the channel reducers
     
-    async def _initialize_task_node(self, state: AutomationState) -> AutomationState:
+    async def _initialize_task_node(self, state: AutomationState) -> Dict[str, Any]:
         """Initialize the automation task"""
         logger.info("🔵 [LangGraph] Initializing automation task...")
         
-        state["current_phase"] = "initialization"
-        state["start_time"] = time.time()
-        state["phase_timings"] = {}
-        state["error_messages"] = []
-        state["overall_success"] = False
-        state["testing_env_ready"] = False
-        state["automation_tools_status"] = {
-            "playwright": False,
-            "appium": False,
-            "ocr": False
+        now_iso = datetime.now(timezone.utc).isoformat()  # one timestamp for every message this node emits
+        
+        updates = {
+            "current_phase": "initialization",
+            "start_time": time.time(),
+            "overall_success": False,
+            "testing_env_ready": False,
+            "automation_tools_status": {
+                "playwright": False,
+                "appium": False,
+                "ocr": False
+            },
+            "messages": [{
+                "role": "system",
+                "content": f"Starting automation workflow for: {state['instruction']}",
+                "agent": "orchestrator",
+                "timestamp": now_iso
+            }]
         }
         
-        # Add initial message
-        state["messages"].append({
-            "role": "system",
-            "content": f"Starting automation workflow for: {state['instruction']}",
-            "agent": "orchestrator",
-            "timestamp": datetime.utcnow().isoformat()
-        })
-        
         logger.info("🔵 [LangGraph] ✅ Task initialized successfully")
-        return state
+        return updates
     
-    async def _blueprint_node(self, state: AutomationState) -> AutomationState:
+    async def _blueprint_node(self, state: AutomationState) -> Dict[str, Any]:
         """Agent 1: Blueprint Generation Node"""
         logger.info("🔵 [LangGraph] Executing Blueprint Agent...")
         
-        phase_start = time.time()
-        state["current_phase"] = "blueprint_generation"
+        phase_start = time.perf_counter()
+        now_iso = datetime.now(timezone.utc).isoformat()
+        updates: Dict[str, Any] = {"current_phase": "blueprint_generation"}
         
         try:
+            # Screenshots are read back only here; the document goes over as its path for Agent 1 to mmap
+            screenshots = await asyncio.to_thread(_read_screenshots, state.get("screenshot_refs", []))
+            
             # Call Agent 1
-            agent1_result = await self.agent1.process_and_generate_blueprint(
-                document_content=state["document_content"],
-                screenshots=state["screenshots"],
-                instruction=state["instruction"],
-                platform=state["platform"],
-                additional_data=state.get("additional_data")
+            agent1_result = await asyncio.wait_for(
+                self.agent1.process_and_generate_blueprint(
+                    document_content=state.get("document_ref"),
+                    screenshots=screenshots,
+                    instruction=state["instruction"],
+                    platform=state["platform"],
+                    additional_data=state.get("additional_data")
+                ),
+                timeout=self.AGENT1_TIMEOUT_S
             )
-            
+        except asyncio.TimeoutError:
+            _record_error(updates, "agent1", f"Blueprint generation failed: Agent 1 timed out after {self.AGENT1_TIMEOUT_S}s", now_iso)
+        except Exception as e:
+            _record_error(updates, "agent1", f"Blueprint generation failed: {str(e)}", now_iso)
+        else:
             if agent1_result["success"]:
-                state["agent1_result"] = agent1_result
-                state["seq_id"] = agent1_result["seq_id"]
-                state["base_path"] = agent1_result["base_path"]
+                updates["agent1_result"] = agent1_result
+                updates["seq_id"] = agent1_result["seq_id"]
+                updates["base_path"] = agent1_result["base_path"]
                 
                 # Add success message
-                state["messages"].append({
+                updates["messages"] = [{
                     "role": "agent",
                     "content": f"Blueprint generated successfully. Sequential ID: {agent1_result['seq_id']}",
                     "agent": "agent1",
-                    "timestamp": datetime.utcnow().isoformat(),
+                    "timestamp": now_iso,
                     "data": {
                         "ui_elements": agent1_result.get("ui_elements", 0),
                         "automation_steps": agent1_result.get("automation_steps", 0),
                         "confidence": agent1_result.get("blueprint_confidence", 0.0)
                     }
-                })
+                }]
                 
-                logger.info(f"🔵 [LangGraph] ✅ Blueprint Agent completed - Task ID: {agent1_result['seq_id']}")
+                logger.info("🔵 [LangGraph] ✅ Blueprint Agent completed - Task ID: %s", agent1_result['seq_id'])
             else:
-                raise Exception(f"Agent 1 failed: {agent1_result.get('error', 'Unknown error')}")
-                
-        except Exception as e:
-            error_msg = f"Blueprint generation failed: {str(e)}"
-            logger.error(f"🔴 [LangGraph] {error_msg}")
-            
-            state["error_messages"].append(error_msg)
-            state["messages"].append({
-                "role": "error",
-                "content": error_msg,
-                "agent": "agent1",
-                "timestamp": datetime.utcnow().isoformat()
-            })
-        
-        state["phase_timings"]["blueprint"] = time.time() - phase_start
-        return state
+                _record_error(
+                    updates, "agent1",
+                    f"Blueprint generation failed: Agent 1 failed: {agent1_result.get('error', 'Unknown error')}",
+                    now_iso
+                )
+        
+        updates["phase_timings"] = {"blueprint": time.perf_counter() - phase_start}
+        return updates
     
-    async def _code_generation_node(self, state: AutomationState) -> AutomationState:
+    async def _code_generation_node(self, state: AutomationState) -> Dict[str, Any]:
         """Agent 2: Code Generation Node with automation tools integration"""
         logger.info("🟢 [LangGraph] Executing Code Generation Agent...")
         
-        phase_start = time.time()
-        state["current_phase"] = "code_generation"
+        phase_start = time.perf_counter()
+        now_iso = datetime.now(timezone.utc).isoformat()
+        updates: Dict[str, Any] = {"current_phase": "code_generation"}
+        
+        if not state.get("seq_id"):
+            _record_error(updates, "agent2", "Code generation failed: No sequential task ID available from blueprint agent", now_iso)
+            updates["phase_timings"] = {"code_generation": time.perf_counter() - phase_start}
+            return updates
+        
+        # Regenerate in place until the script is ready; only the last attempt is checkpointed
+        agent2_result: Dict[str, Any] = {}
+        error_msg = None
+        for attempt in range(1, MAX_CODE_ATTEMPTS + 1):
+            try:
+                # Call Agent 2 with existing automation tools
+                agent2_result = await asyncio.wait_for(
+                    self.agent2.generate_code_and_setup(
+                        seq_id=state["seq_id"],
+                        automation_tools=self._automation_tools
+                    ),
+                    timeout=self.AGENT2_TIMEOUT_S
+                )
+            except asyncio.TimeoutError:
+                error_msg = f"Code generation failed: Agent 2 timed out after {self.AGENT2_TIMEOUT_S}s"
+            except Exception as e:
+                error_msg = f"Code generation failed: {str(e)}"
+            else:
+                if not agent2_result["success"]:
+                    error_msg = f"Code generation failed: Agent 2 failed: {agent2_result.get('error', 'Unknown error')}"
+                else:
+                    error_msg = None
+                    if agent2_result.get("ready_for_testing", False):
+                        break
+            
+            if attempt < MAX_CODE_ATTEMPTS:
+                logger.warning("🟡 [LangGraph] Code generation attempt %s/%s %s - retrying",
+                               attempt, MAX_CODE_ATTEMPTS, error_msg or "not ready for testing")
         
-        try:
-            if not state.get("seq_id"):
-                raise Exception("No sequential task ID available from blueprint agent")
+        if error_msg:
+            _record_error(updates, "agent2", error_msg, now_iso)
+        else:
+            updates["agent2_result"] = agent2_result
             
-            # Call Agent 2 with existing automation tools
-            agent2_result = await self.agent2.generate_code_and_setup(
-                seq_id=state["seq_id"],
-                automation_tools={
-                    "playwright_driver": self.playwright_driver,
-                    "appium_driver": self.appium_driver,
-                    "web_tools": self.web_tools,
-                    "mobile_tools": self.mobile_tools,
-                    "ocr_processor": self.ocr_processor
+            # Add success message with tool integration status
+            updates["messages"] = [{
+                "role": "agent",
+                "content": f"Code generated with automation tools integration. Script size: {agent2_result.get('script_size', 0)} chars",
+                "agent": "agent2", 
+                "timestamp": now_iso,
+                "data": {
+                    "ready_for_testing": agent2_result.get("ready_for_testing", False),
+                    "tools_integrated": True,
+                    "requirements_generated": agent2_result.get("requirements_path") is not None,
+                    "attempts": attempt
                 }
-            )
+            }]
             
-            if agent2_result["success"]:
-                state["agent2_result"] = agent2_result
-                
-                # Add success message with tool integration status
-                state["messages"].append({
-                    "role": "agent",
-                    "content": f"Code generated with automation tools integration. Script size: {agent2_result.get('script_size', 0)} chars",
-                    "agent": "agent2", 
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "data": {
-                        "ready_for_testing": agent2_result.get("ready_for_testing", False),
-                        "tools_integrated": True,
-                        "requirements_generated": agent2_result.get("requirements_path") is not None
-                    }
-                })
-                
-                logger.info("🟢 [LangGraph] ✅ Code Generation Agent completed with tool integration")
-            else:
-                raise Exception(f"Agent 2 failed: {agent2_result.get('error', 'Unknown error')}")
-                
-        except Exception as e:
-            error_msg = f"Code generation failed: {str(e)}"
-            logger.error(f"🔴 [LangGraph] {error_msg}")
-            
-            state["error_messages"].append(error_msg)
-            state["messages"].append({
-                "role": "error",
-                "content": error_msg,
-                "agent": "agent2",
-                "timestamp": datetime.utcnow().isoformat()
-            })
-        
-        state["phase_timings"]["code_generation"] = time.time() - phase_start
-        return state
+            logger.info("🟢 [LangGraph] ✅ Code Generation Agent completed with tool integration")
+        
+        updates["phase_timings"] = {"code_generation": time.perf_counter() - phase_start}
+        return updates
     
-    async def _testing_environment_node(self, state: AutomationState) -> AutomationState:
+    async def _testing_environment_node(self, state: AutomationState) -> Dict[str, Any]:
         """Agent 3: Testing Environment Node with Agent 2 collaboration"""
         logger.info("🟡 [LangGraph] Executing Testing Environment Agent...")
         
-        phase_start = time.time()
-        state["current_phase"] = "testing_environment"
+        phase_start = time.perf_counter()
+        now_iso = datetime.now(timezone.utc).isoformat()
+        updates: Dict[str, Any] = {"current_phase": "testing_environment"}
+        
+        if not state.get("seq_id"):
+            _record_error(updates, "agent3", "Testing environment setup failed: No sequential task ID available", now_iso)
+            updates["retry_count"] = 1
+            updates["phase_timings"] = {"testing": time.perf_counter() - phase_start}
+            return updates
         
         try:
-            if not state.get("seq_id"):
-                raise Exception("No sequential task ID available")
-            
             # Call Agent 3 with platform tools status
-            agent3_result = await self.agent3.setup_and_execute_tests(
-                seq_id=state["seq_id"],
-                platform_tools={
-                    "web": {"playwright": True, "tools": True},
-                    "mobile": {"appium": True, "tools": True},
-                    "ocr": {"available": True}
-                }
+            agent3_result = await asyncio.wait_for(
+                self.agent3.setup_and_execute_tests(
+                    seq_id=state["seq_id"],
+                    platform_tools={
+                        "web": {"playwright": True, "tools": True},
+                        "mobile": {"appium": True, "tools": True},
+                        "ocr": {"available": True}
+                    }
+                ),
+                timeout=self.AGENT3_TIMEOUT_S
             )
-            
-            state["agent3_result"] = agent3_result
-            
-            # Update testing environment status
-            if agent3_result.get("success"):
-                state["testing_env_ready"] = True
-                state["virtual_env_path"] = agent3_result.get("testing_path")
-                state["automation_tools_status"] = {
-                    "playwright": agent3_result.get("venv_setup", {}).get("success", False),
-                    "appium": agent3_result.get("dependencies_installed", {}).get("success", False),
-                    "ocr": True  # OCR is always available
-                }
-            
-            # Add collaboration message
-            collaborations = agent3_result.get("agent2_collaborations", 0)
-            state["messages"].append({
-                "role": "agent",
-                "content": f"Testing completed. Collaborations with Agent 2: {collaborations}. Success: {agent3_result.get('overall_test_success', False)}",
-                "agent": "agent3",
-                "timestamp": datetime.utcnow().isoformat(),
-                "data": {
-                    "test_attempts": agent3_result.get("total_attempts", 0),
-                    "agent2_collaborations": collaborations,
-                    "testing_environment_ready": state["testing_env_ready"]
-                }
-            })
-            
-            logger.info(f"🟡 [LangGraph] ✅ Testing Environment Agent completed - Collaborations: {collaborations}")
-                
+        except asyncio.TimeoutError:
+            _record_error(updates, "agent3", f"Testing environment setup failed: Agent 3 timed out after {self.AGENT3_TIMEOUT_S}s", now_iso)
+            updates["retry_count"] = 1
+            updates["phase_timings"] = {"testing": time.perf_counter() - phase_start}
+            return updates
         except Exception as e:
-            error_msg = f"Testing environment setup failed: {str(e)}"
-            logger.error(f"🔴 [LangGraph] {error_msg}")
-            
-            state["error_messages"].append(error_msg)
-            state["messages"].append({
-                "role": "error",
-                "content": error_msg,
-                "agent": "agent3",
-                "timestamp": datetime.utcnow().isoformat()
-            })
-        
-        state["phase_timings"]["testing"] = time.time() - phase_start
-        return state
+            _record_error(updates, "agent3", f"Testing environment setup failed: {str(e)}", now_iso)
+            updates["retry_count"] = 1
+            updates["phase_timings"] = {"testing": time.perf_counter() - phase_start}
+            return updates
+        
+        updates["agent3_result"] = agent3_result
+        
+        # Update testing environment status
+        testing_env_ready = state.get("testing_env_ready", False)
+        if agent3_result.get("success"):
+            testing_env_ready = True
+            updates["testing_env_ready"] = True
+            updates["virtual_env_path"] = agent3_result.get("testing_path")
+            updates["automation_tools_status"] = {
+                "playwright": agent3_result.get("venv_setup", {}).get("success", False),
+                "appium": agent3_result.get("dependencies_installed", {}).get("success", False),
+                "ocr": True  # OCR is always available
+            }
+        
+        # Add collaboration message
+        collaborations = agent3_result.get("agent2_collaborations", 0)
+        updates["messages"] = [{
+            "role": "agent",
+            "content": f"Testing completed. Collaborations with Agent 2: {collaborations}. Success: {agent3_result.get('overall_test_success', False)}",
+            "agent": "agent3",
+            "timestamp": now_iso,
+            "data": {
+                "test_attempts": agent3_result.get("total_attempts", 0),
+                "agent2_collaborations": collaborations,
+                "testing_environment_ready": testing_env_ready
+            }
+        }]
+        
+        logger.info("🟡 [LangGraph] ✅ Testing Environment Agent completed - Collaborations: %s", collaborations)
+        if not agent3_result.get("overall_test_success", False):
+            updates["retry_count"] = 1
+        
+        updates["phase_timings"] = {"testing": time.perf_counter() - phase_start}
+        return updates
     
-    async def _final_reporting_node(self, state: AutomationState) -> AutomationState:
+    async def _final_reporting_node(self, state: AutomationState) -> Dict[str, Any]:
         """Agent 4: Final Reporting Node"""
         logger.info("🔵 [LangGraph] Executing Final Reporting Agent...")
         
-        phase_start = time.time()
-        state["current_phase"] = "final_reporting"
+        phase_start = time.perf_counter()
+        now_iso = datetime.now(timezone.utc).isoformat()
+        updates: Dict[str, Any] = {"current_phase": "final_reporting"}
+        
+        if not state.get("seq_id"):
+            _record_error(updates, "agent4", "Final reporting failed: No sequential task ID available", now_iso)
+            updates["phase_timings"] = {"final_reporting": time.perf_counter() - phase_start}
+            return updates
         
         try:
-            if not state.get("seq_id"):
-                raise Exception("No sequential task ID available")
-            
             # Call Agent 4
-            agent4_result = await self.agent4.generate_final_report(state["seq_id"])
-            
+            agent4_result = await asyncio.wait_for(
+                self.agent4.generate_final_report(state["seq_id"]),
+                timeout=self.AGENT4_TIMEOUT_S
+            )
+        except asyncio.TimeoutError:
+            _record_error(updates, "agent4", f"Final reporting failed: Agent 4 timed out after {self.AGENT4_TIMEOUT_S}s", now_iso)
+        except Exception as e:
+            _record_error(updates, "agent4", f"Final reporting failed: {str(e)}", now_iso)
+        else:
             if agent4_result.get("success"):
-                state["agent4_result"] = agent4_result
+                updates["agent4_result"] = agent4_result
                 
                 # Extract performance metrics
+                final_confidence = state.get("final_confidence", 0.0)
+                performance_grade = state.get("performance_grade", "Unknown")
                 if "analysis_results" in agent4_result:
                     analysis = agent4_result["analysis_results"]
-                    state["final_confidence"] = analysis.get("overall_confidence", 0.0)
-                    state["performance_grade"] = analysis.get("performance_grade", "Unknown")
+                    final_confidence = updates["final_confidence"] = analysis.get("overall_confidence", 0.0)
+                    performance_grade = updates["performance_grade"] = analysis.get("performance_grade", "Unknown")
                 
                 # Add final message
-                state["messages"].append({
+                updates["messages"] = [{
                     "role": "agent",
-                    "content": f"Final report generated. Performance: {state.get('performance_grade', 'Unknown')}",
+                    "content": f"Final report generated. Performance: {performance_grade}",
                     "agent": "agent4",
-                    "timestamp": datetime.utcnow().isoformat(),
+                    "timestamp": now_iso,
                     "data": {
-                        "confidence": state.get("final_confidence", 0.0),
+                        "confidence": final_confidence,
                         "files_generated": len(agent4_result.get("files_generated", []))
                     }
-                })
+                }]
                 
                 logger.info("🔵 [LangGraph] ✅ Final Reporting Agent completed")
             else:
-                logger.warning(f"🟡 [LangGraph] Final reporting completed with issues: {agent4_result.get('error', 'Unknown')}")
-                
-        except Exception as e:
-            error_msg = f"Final reporting failed: {str(e)}"
-            logger.error(f"🔴 [LangGraph] {error_msg}")
-            
-            state["error_messages"].append(error_msg)
-            state["messages"].append({
-                "role": "error",
-                "content": error_msg,
-                "agent": "agent4", 
-                "timestamp": datetime.utcnow().isoformat()
-            })
-        
-        state["phase_timings"]["final_reporting"] = time.time() - phase_start
-        return state
+                logger.warning("🟡 [LangGraph] Final reporting completed with issues: %s", agent4_result.get('error', 'Unknown'))
+        
+        updates["phase_timings"] = {"final_reporting": time.perf_counter() - phase_start}
+        return updates
     
-    async def _finalize_workflow_node(self, state: AutomationState) -> AutomationState:
+    async def _finalize_workflow_node(self, state: AutomationState) -> Dict[str, Any]:
         """Finalize the entire workflow"""
         logger.info("🚀 [LangGraph] Finalizing workflow...")
         
-        state["current_phase"] = "completed"
+        now_iso = datetime.now(timezone.utc).isoformat()
         
         # Calculate overall success
-        state["overall_success"] = (
-            state.get("agent1_result", {}).get("success", False) and
-            state.get("agent2_result", {}).get("success", False) and
-            state.get("agent3_result", {}).get("success", False) and
-            state.get("agent4_result", {}).get("success", False) and
-            len(state.get("error_messages", [])) == 0
+        overall_success = not state.get("error_messages") and all(
+            (state.get(key) or {}).get("success", False) for key in _AGENT_RESULT_KEYS
         )
         
+        # Persist terminal status and progress flags with one commit
+        if state.get("seq_id"):
+            try:
+                await self.db_manager.finalize_task(
+                    state["seq_id"],
+                    "completed" if overall_success else "completed_with_issues",
+                    "langgraph_orchestrator",
+                    **{
+                        flag: True
+                        for flag, key in _PROGRESS_FLAGS.items()
+                        if (state.get(key) or {}).get("success")
+                    }
+                )
+            except Exception as e:
+                logger.error("🔴 [LangGraph] Final task status update failed: %s", e)
+        
         # Calculate total execution time
         total_time = time.time() - state["start_time"]
         
-        # Add final summary message
-        state["messages"].append({
-            "role": "system",
-            "content": f"Workflow completed. Success: {state['overall_success']}. Total time: {total_time:.1f}s",
-            "agent": "orchestrator",
-            "timestamp": datetime.utcnow().isoformat(),
-            "data": {
-                "total_execution_time": total_time,
-                "final_confidence": state.get("final_confidence", 0.0),
-                "performance_grade": state.get("performance_grade", "Unknown"),
-                "testing_env_ready": state.get("testing_env_ready", False)
-            }
-        })
+        updates = {
+            "current_phase": "completed",
+            "overall_success": overall_success,
+            # Add final summary message
+            "messages": [{
+                "role": "system",
+                "content": f"Workflow completed. Success: {overall_success}. Total time: {total_time:.1f}s",
+                "agent": "orchestrator",
+                "timestamp": now_iso,
+                "data": {
+                    "total_execution_time": total_time,
+                    "final_confidence": state.get("final_confidence", 0.0),
+                    "performance_grade": state.get("performance_grade", "Unknown"),
+                    "testing_env_ready": state.get("testing_env_ready", False)
+                }
+            }]
+        }
         
-        logger.info(f"🚀 [LangGraph] ✅ Workflow finalized - Success: {state['overall_success']}")
-        return state
+        logger.info(
+            "🚀 [LangGraph] ✅ Workflow finalized - Success: %s\n🚀 [LangGraph] Phase timings: %s",
+            overall_success, state.get('phase_timings', {})
+        )
+        return updates
     
     # Conditional Edge Functions
     
-    def _should_proceed_to_testing(self, state: AutomationState) -> Literal["testing", "retry_code", "error"]:
-        """Determine if we should proceed to testing or retry code generation"""
+    def _should_proceed_to_testing(self, state: AutomationState) -> Literal["testing", "error"]:
+        """Determine if we should proceed to testing (code retries happen inside the code node)"""
         
         if state.get("error_messages"):
             return "error"
         
-        agent2_result = state.get("agent2_result", {})
+        agent2_result = state.get("agent2_result") or {}
         
-        if not agent2_result.get("success", False):
-            return "retry_code" if len(state.get("messages", [])) < 10 else "error"  # Max retry limit
-        
-        if not agent2_result.get("ready_for_testing", False):
-            return "retry_code"
+        if not agent2_result.get("success", False) or not agent2_result.get("ready_for_testing", False):
+            return "error"
         
         return "testing"
     
@@ -510,28 +719,25 @@ class LangGraphMultiAgentOrchestrator:
         if state.get("error_messages"):
             return "error"
         
-        agent3_result = state.get("agent3_result", {})
-        
-        if not agent3_result.get("success", False):
-            # Check if Agent 3 needs to collaborate with Agent 2
-            collaborations = agent3_result.get("agent2_collaborations", 0)
-            
-            if collaborations < 3:  # Max 3 collaboration attempts
-                return "retry_code"  # Agent 3 requests Agent 2 improvements
-            else:
-                return "retry_testing"  # Try testing again without more code changes
-        
-        # If testing was successful, proceed to results
-        if agent3_result.get("overall_test_success", False):
+        # Retry budget spent - report with what we have
+        if state.get("retry_count", 0) >= MAX_WORKFLOW_RETRIES:
             return "results"
         
-        # If testing failed but we haven't reached collaboration limit
+        agent3_result = state.get("agent3_result") or {}
         collaborations = agent3_result.get("agent2_collaborations", 0)
-        if collaborations < 3:
-            return "retry_code"
+        can_collaborate = collaborations < MAX_AGENT2_COLLABORATIONS
+        
+        if not agent3_result.get("success", False):
+            # Agent 3 requests Agent 2 improvements, or tries testing again without more code changes
+            branch = "retry_code" if can_collaborate else "retry_testing"
+        elif agent3_result.get("overall_test_success", False) or not can_collaborate:
+            # Tests passed, or collaboration limit reached - proceed to results even with testing issues
+            branch = "results"
+        else:
+            branch = "retry_code"
         
-        # Last resort - proceed to results even with testing issues
-        return "results"
+        logger.debug("🟡 [LangGraph] Post-testing branch: %s (collaborations: %s)", branch, collaborations)
+        return branch
     
     # Main Execution Method
     
@@ -540,84 +746,91 @@ class LangGraphMultiAgentOrchestrator:
                                       screenshots: List[bytes],
                                       instruction: str, 
                                       platform: str = "auto-detect",
-                                      additional_data: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Execute complete LangGraph-based workflow"""
+                                      additional_data: Dict[str, Any] = None,
+                                      debug: bool = False) -> Dict[str, Any]:
+        """Execute complete LangGraph-based workflow (debug=True streams and logs each node update)"""
         
         if not self.initialized:
             await self.initialize()
         
         workflow_start_time = time.time()
         
-        logger.info(f"\\n🚀 ========== LANGGRAPH MULTI-AGENT WORKFLOW STARTED ==========")
-        logger.info(f"🚀 Version: {self.orchestrator_version}")
-        logger.info(f"🚀 Instruction: {instruction}")
-        logger.info(f"🚀 Platform: {platform}")
-        logger.info(f"🚀 LangGraph State Management: ✅ ENABLED")
-        logger.info(f"🚀 Automation Tools Integration: ✅ ENABLED")
-        logger.info(f"🚀 =============================================================")
+        logger.info(
+            "\\n🚀 ========== LANGGRAPH MULTI-AGENT WORKFLOW STARTED ==========\n"
+            "🚀 Version: %s\n"
+            "🚀 Instruction: %s\n"
+            "🚀 Platform: %s\n"
+            "🚀 LangGraph State Management: ✅ ENABLED\n"
+            "🚀 Automation Tools Integration: ✅ ENABLED\n"
+            "🚀 =============================================================",
+            self.orchestrator_version, instruction, platform
+        )
         
+        # One id per run: names the inputs dir and the checkpoint thread (its channels accumulate)
+        run_id = uuid.uuid4().hex
+        inputs_dir = INPUTS_DIR / run_id
         try:
-            # Compile the graph with checkpointing
-            compiled_graph = self.graph.compile(checkpointer=self.checkpointer)
+            document_ref, screenshot_refs = await asyncio.to_thread(
+                _write_inputs, inputs_dir, document_content, screenshots or []
+            )
             
             # Initial state
-            initial_state: AutomationState = {
-                "seq_id": None,
+            initial_state: AutomationState = _DEFAULT_STATE | {
                 "instruction": instruction,
                 "platform": platform,
-                "base_path": None,
-                "document_content": document_content,
-                "screenshots": screenshots,
+                "document_ref": document_ref,
+                "screenshot_refs": screenshot_refs,
                 "additional_data": additional_data or {},
-                "agent1_result": None,
-                "agent2_result": None, 
-                "agent3_result": None,
-                "agent4_result": None,
+                "start_time": workflow_start_time,
+                # Containers are created per run so no two workflows share them
                 "messages": [],
-                "current_phase": "starting",
-                "overall_success": False,
                 "error_messages": [],
-                "start_time": workflow_start_time,
                 "phase_timings": {},
-                "final_confidence": 0.0,
-                "performance_grade": "Unknown",
-                "testing_env_ready": False,
-                "virtual_env_path": None,
                 "automation_tools_status": {}
             }
             
             # Execute the graph
-            config = {"configurable": {"thread_id": f"automation_{int(time.time())}"}}
+            config = {"configurable": {"thread_id": f"automation_{run_id}"}}
             
-            final_state = None
-            async for state_update in compiled_graph.astream(initial_state, config=config):
-                final_state = state_update
-                
-                # Log progress
-                current_phase = state_update.get("current_phase", "unknown")
-                logger.info(f"🔄 [LangGraph] Phase: {current_phase}")
+            if debug:
+                final_state = None
+                async for mode, chunk in self.compiled_graph.astream(
+                    initial_state, config=config, stream_mode=["updates", "values"]
+                ):
+                    if mode == "values":
+                        final_state = chunk
+                        continue
+                    for node_name, update in chunk.items():
+                        logger.info("🔄 [LangGraph] %s -> phase: %s", node_name, (update or {}).get('current_phase', 'unknown'))
+            else:
+                final_state = await self.compiled_graph.ainvoke(initial_state, config=config)
             
             if not final_state:
                 raise Exception("LangGraph execution failed - no final state")
             
+            self._maybe_truncate_checkpoint_wal()
+            
             # Extract final results
             total_execution_time = time.time() - workflow_start_time
             
-            # Update final task status in database if we have a seq_id
-            if final_state.get("seq_id"):
+            # The finalize node records the final status; runs that ended early on an error edge never reach it
+            if final_state.get("seq_id") and final_state.get("current_phase") != "completed":
                 final_status = "completed" if final_state.get("overall_success") else "completed_with_issues"
                 await self.db_manager.update_task_status(final_state["seq_id"], final_status, "langgraph_orchestrator")
             
-            logger.info(f"\\n🚀 ========== LANGGRAPH MULTI-AGENT WORKFLOW COMPLETED ==========")
-            logger.info(f"🚀 Overall Result: {'✅ SUCCESS' if final_state.get('overall_success') else '⚠️ COMPLETED WITH ISSUES'}")
-            logger.info(f"🚀 Sequential Task ID: {final_state.get('seq_id', 'N/A')}")
-            logger.info(f"🚀 Final Confidence: {final_state.get('final_confidence', 0.0):.3f}")
-            logger.info(f"🚀 Performance Grade: {final_state.get('performance_grade', 'Unknown')}")
-            logger.info(f"🚀 Total Execution Time: {total_execution_time:.1f} seconds")
-            logger.info(f"🚀 Testing Environment: {'✅ READY' if final_state.get('testing_env_ready') else '❌ NOT READY'}")
-            logger.info(f"🚀 Agent Communications: {len(final_state.get('messages', []))}")
-            logger.info(f"🚀 LangGraph State Transitions: ✅ MANAGED")
-            logger.info(f"🚀 ================================================================")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("\n".join([
+                    "\\n🚀 ========== LANGGRAPH MULTI-AGENT WORKFLOW COMPLETED ==========",
+                    f"🚀 Overall Result: {'✅ SUCCESS' if final_state.get('overall_success') else '⚠️ COMPLETED WITH ISSUES'}",
+                    f"🚀 Sequential Task ID: {final_state.get('seq_id', 'N/A')}",
+                    f"🚀 Final Confidence: {final_state.get('final_confidence', 0.0):.3f}",
+                    f"🚀 Performance Grade: {final_state.get('performance_grade', 'Unknown')}",
+                    f"🚀 Total Execution Time: {total_execution_time:.1f} seconds",
+                    f"🚀 Testing Environment: {'✅ READY' if final_state.get('testing_env_ready') else '❌ NOT READY'}",
+                    f"🚀 Agent Communications: {len(final_state.get('messages', []))}",
+                    "🚀 LangGraph State Transitions: ✅ MANAGED",
+                    "🚀 ================================================================"
+                ]))
             
             return {
                 "success": final_state.get("overall_success", False),
@@ -636,7 +849,7 @@ class LangGraphMultiAgentOrchestrator:
             
         except Exception as e:
             error_msg = f"LangGraph multi-agent workflow failed: {str(e)}"
-            logger.error(f"🔴 {error_msg}")
+            logger.error("🔴 %s", error_msg)
             
             return {
                 "success": False,
@@ -645,6 +858,8 @@ class LangGraphMultiAgentOrchestrator:
                 "message": f"❌ LangGraph workflow failed: {error_msg}",
                 "orchestrator_version": self.orchestrator_version
             }
+        finally:
+            await asyncio.to_thread(shutil.rmtree, inputs_dir, True)
     
     async def get_task_status(self, seq_id: int) -> Dict[str, Any]:
         """Get comprehensive task status including LangGraph state"""
@@ -663,19 +878,52 @@ class LangGraphMultiAgentOrchestrator:
                 "workflow_steps": len(workflow_steps),
                 "langgraph_enabled": True,
                 "orchestrator_version": self.orchestrator_version,
-                "status_check_time": datetime.utcnow().isoformat()
+                "status_check_time": datetime.now(timezone.utc).isoformat()
             }
             
         except Exception as e:
-            logger.error(f"LangGraph task status check failed: {str(e)}")
+            logger.error("LangGraph task status check failed: %s", e)
             return {"error": f"Status check failed: {str(e)}"}
     
+    def _maybe_truncate_checkpoint_wal(self):
+        """Every _WAL_TRUNCATE_EVERY workflows, truncate the checkpoint WAL off the request path"""
+        if self.checkpointer is None:
+            return
+        self._workflows_since_truncate += 1
+        if self._workflows_since_truncate >= _WAL_TRUNCATE_EVERY:
+            self._workflows_since_truncate = 0
+            asyncio.create_task(self._truncate_checkpoint_wal())
+    
+    async def _truncate_checkpoint_wal(self):
+        """Fold the WAL back into the checkpoint database and reset it"""
+        try:
+            await self.checkpointer.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except Exception as e:
+            logger.warning("⚠️ Checkpoint WAL truncate failed: %s", e)
+    
+    async def aclose(self):
+        """Close the checkpointer connection opened in initialize() and the warm browser pool"""
+        # Same lock as initialize(), so a shutdown can't interleave with a concurrent startup
+        async with self._init_lock:
+            await self._close_checkpointer()
+            await playwright_pool.close()
+            self.initialized = False
+    
+    async def _close_checkpointer(self):
+        """Exit the checkpointer context and drop the graph compiled against it"""
+        if self._checkpointer_cm is not None:
+            await self._checkpointer_cm.__aexit__(None, None, None)
+            self._checkpointer_cm = None
+            self.checkpointer = None
+            self.compiled_graph = None
+            logger.info("🔒 LangGraph checkpointer closed")
+    
     async def list_recent_tasks(self, limit: int = 10) -> List[Dict[str, Any]]:
         """List recent tasks managed by LangGraph orchestrator"""
         try:
             return await self.db_manager.list_recent_tasks(limit)
         except Exception as e:
-            logger.error(f"Recent tasks listing failed: {str(e)}")
+            logger.error("Recent tasks listing failed: %s", e)
             return []
 
 # Global LangGraph orchestrator instance
@@ -683,6 +931,7 @@ langgraph_orchestrator = LangGraphMultiAgentOrchestrator()
 
 async def get_langgraph_orchestrator() -> LangGraphMultiAgentOrchestrator:
     """Get the global LangGraph orchestrator instance"""
+    # Fast path without awaiting; initialize() re-checks under its lock
     if not langgraph_orchestrator.initialized:
         await langgraph_orchestrator.initialize()
     return langgraph_orchestrator
\ No newline at end of file
@@ -22,7 +22,8 @@ from contextlib import asynccontextmanager
 # Application imports - Updated to use new orchestrator
 from app.main_orchestrator import get_updated_orchestrator
 from app.database.database_manager import get_testing_db
-from app.langgraph_orchestrator import get_langgraph_orchestrator
+from app.utils.queue_logging import install_queue_logging, remove_queue_logging
+from app.langgraph_orchestrator import get_langgraph_orchestrator, langgraph_orchestrator as _langgraph_orchestrator
 # Global variables
 task_status_store: Dict[str, Dict[str, Any]] = {}
 
@@ -48,6 +49,7 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     """Enhanced application lifespan handler with SQLite integration"""
     # Startup
+    log_listener = install_queue_logging()
     print("🚀 Updated Multi-Agent Automation Framework v2.0.0 starting up...")
     print("🤖 4-Agent System with Testing Environment Integration")
     print("📊 Features: Sequential IDs, Virtual Environments, OCR Validation, Agent Communication")
@@ -79,13 +81,23 @@ async def lifespan(app: FastAPI):
     print("📝 Saving final task status...")
     await save_task_status_to_file()
     
+    # Close the LangGraph checkpointer connection (no-op if it was never initialized)
+    try:
+        await _langgraph_orchestrator.aclose()
+    except Exception as e:
+        print(f"⚠️ LangGraph orchestrator shutdown warning: {str(e)}")
+    
     # Close database connections
     try:
         db_manager = await get_testing_db()
-        # Note: aiosqlite connections are automatically closed
+        await db_manager.close()
         print("🔒 Database connections closed")
     except:
         pass
+    
+    # Flush queued log records and restore direct handlers
+    if log_listener is not None:
+        remove_queue_logging(log_listener)
         
     print("🛑 Updated Multi-Agent Automation Framework shutting down...")
 
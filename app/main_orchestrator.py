@@ -3,23 +3,85 @@ Main Orchestrator - Updated Multi-Agent Workflow with Testing Environment
 Coordinates all 4 agents with proper folder structure and sequential IDs
 """
 import asyncio
-import json
 import logging
 import time
 import os
+import orjson
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from dataclasses import dataclass
+from typing import Dict, List, Any, Optional, AsyncIterator, Union, TYPE_CHECKING
 
-# Import all updated agents
 from app.database.database_manager import get_testing_db
-from app.agents.agent1_blueprint import UpdatedAgent1_BlueprintGenerator
-from app.agents.enhanced_agent2 import EnhancedAgent2_CodeGenerator
-from app.agents.enhanced_agent3 import EnhancedAgent3_IsolatedTesting
-from app.agents.agent4_results import UpdatedAgent4_FinalReporter
+
+# Agent modules (OCR, PDF, code generation stacks) are imported on first initialize()
+if TYPE_CHECKING:
+    from app.agents.agent1_blueprint import UpdatedAgent1_BlueprintGenerator
+    from app.agents.enhanced_agent2 import EnhancedAgent2_CodeGenerator
+    from app.agents.enhanced_agent3 import EnhancedAgent3_IsolatedTesting
+    from app.agents.agent4_results import UpdatedAgent4_FinalReporter
 
 logger = logging.getLogger(__name__)
 
+# Status/listing queries, built once at import
+_SQL_RECENT_COMMS = "SELECT * FROM agent_communications WHERE seq_id = ? ORDER BY created_at DESC LIMIT 10"
+_SQL_RECENT_TASKS = (
+    "SELECT seq_id, instruction, platform, status, created_at, updated_at "
+    "FROM automation_tasks ORDER BY created_at DESC LIMIT ?"
+)
+
+
+# Folder-structure snapshots kept for status polling, keyed by directory mtimes
+FOLDER_SNAPSHOT_CACHE_SIZE = 1024
+
+
+def _mtime_ns(path: Path) -> Optional[int]:
+    """Directory mtime in ns, or None if it doesn't exist"""
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+@lru_cache(maxsize=FOLDER_SNAPSHOT_CACHE_SIZE)
+def _folder_snapshot(base_path: str, base_mtime_ns: Optional[int], agent3_mtime_ns: Optional[int]) -> Dict[str, bool]:
+    """Probe the task folder layout; cached until base/ or agent3/ gains or loses an entry"""
+    base = Path(base_path)
+    return {
+        "base_exists": base_mtime_ns is not None,
+        "agent1_exists": (base / "agent1").exists(),
+        "agent2_exists": (base / "agent2").exists(),
+        "agent3_testing_exists": (base / "agent3" / "testing").exists(),
+        "agent4_exists": (base / "agent4").exists(),
+        "sqlite_db_exists": (base / "sqlite_db.sqlite").exists()
+    }
+
+
+@dataclass
+class PhaseEvent:
+    """Emitted as each agent phase finishes; the full agent result is on disk at result_path"""
+    __slots__ = ("phase", "name", "result_path", "timing", "success")
+    phase: int
+    name: str
+    result_path: str
+    timing: float
+    success: bool
+
+
+@dataclass
+class WorkflowCompleteEvent:
+    """Final event of a workflow run, carrying the same dict execute_complete_workflow returns"""
+    __slots__ = ("result",)
+    result: Dict[str, Any]
+
+
+def _write_json(path: Path, data: Any):
+    """Serialize data with orjson and write it to path (runs in a worker thread)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(orjson.dumps(data, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+
+
 class UpdatedMultiAgentOrchestrator:
     """
     Main orchestrator for the updated 4-agent workflow with testing environment integration
@@ -30,78 +92,143 @@ class UpdatedMultiAgentOrchestrator:
         self.orchestrator_version = "2.0.0"
         self.db_manager = None
         
-        # Initialize all agents
-        self.agent1 = UpdatedAgent1_BlueprintGenerator()
-        self.agent2 = EnhancedAgent2_CodeGenerator()
-        self.agent3 = EnhancedAgent3_IsolatedTesting()
-        self.agent4 = UpdatedAgent4_FinalReporter()
+        # Agents are created in initialize()
+        self.agent1: Optional["UpdatedAgent1_BlueprintGenerator"] = None
+        self.agent2: Optional["EnhancedAgent2_CodeGenerator"] = None
+        self.agent3: Optional["EnhancedAgent3_IsolatedTesting"] = None
+        self.agent4: Optional["UpdatedAgent4_FinalReporter"] = None
         
         self.initialized = False
+        self._init_lock = asyncio.Lock()
     
     async def initialize(self):
         """Initialize database and all agents"""
         if self.initialized:
             return
-        
+        async with self._init_lock:
+            # Re-check: a concurrent caller may have finished initialization while we waited
+            if not self.initialized:
+                await self._initialize()
+    
+    async def _initialize(self):
+        """One-time initialization body (runs under _init_lock)"""
         logger.info("🚀 Initializing Updated Multi-Agent Orchestrator System...")
-        logger.info(f"🚀 Version: {self.orchestrator_version}")
+        logger.info("🚀 Version: %s", self.orchestrator_version)
         logger.info("🚀 Features: Sequential IDs, Testing Environment, OCR Validation, Agent Communication")
         
-        # Initialize database
-        self.db_manager = await get_testing_db()
+        self._create_agents()
         
-        # Initialize all agents
-        await self.agent1.initialize()
-        await self.agent2.initialize()
-        await self.agent3.initialize()
-        await self.agent4.initialize()
+        # Initialize database and all agents concurrently; every agent init awaits get_testing_db()
+        # too, and they all share its lock-guarded one-shot initialization
+        self.db_manager, *_ = await asyncio.gather(
+            get_testing_db(),
+            self.agent1.initialize(),
+            self.agent2.initialize(),
+            self.agent3.initialize(),
+            self.agent4.initialize()
+        )
         
         self.initialized = True
         logger.info("✅ Updated Multi-Agent Orchestrator System initialized")
         logger.info("📋 Ready for automation tasks with testing environment integration")
     
-    async def execute_complete_workflow(self, document_content: bytes, screenshots: List[bytes],
+    def _create_agents(self):
+        """Import and construct all updated agents"""
+        from app.agents.agent1_blueprint import UpdatedAgent1_BlueprintGenerator
+        from app.agents.enhanced_agent2 import EnhancedAgent2_CodeGenerator
+        from app.agents.enhanced_agent3 import EnhancedAgent3_IsolatedTesting
+        from app.agents.agent4_results import UpdatedAgent4_FinalReporter
+        
+        self.agent1 = UpdatedAgent1_BlueprintGenerator()
+        self.agent2 = EnhancedAgent2_CodeGenerator()
+        self.agent3 = EnhancedAgent3_IsolatedTesting()
+        self.agent4 = UpdatedAgent4_FinalReporter()
+    
+    async def execute_complete_workflow(self, document_content: Union[bytes, memoryview],
+                                      screenshots: List[Union[bytes, memoryview]],
                                       instruction: str, platform: str = "auto-detect",
                                       additional_data: Dict[str, Any] = None) -> Dict[str, Any]:
         """
-        Execute complete 4-agent workflow with testing environment integration
+        Execute complete 4-agent workflow and return its final result
+        
+        Consumes stream_complete_workflow(); see there for the arguments.
+        """
+        result: Dict[str, Any] = {}
+        async for event in self.stream_complete_workflow(
+            document_content, screenshots, instruction, platform, additional_data
+        ):
+            if isinstance(event, WorkflowCompleteEvent):
+                result = event.result
+        return result
+    
+    async def stream_complete_workflow(self, document_content: Union[bytes, memoryview],
+                                       screenshots: List[Union[bytes, memoryview]],
+                                       instruction: str, platform: str = "auto-detect",
+                                       additional_data: Dict[str, Any] = None
+                                       ) -> AsyncIterator[Union[PhaseEvent, WorkflowCompleteEvent]]:
+        """
+        Execute complete 4-agent workflow with testing environment integration, streaming phase events
         
         Args:
-            document_content: PDF or document content
+            document_content: PDF or document content (any bytes-like buffer; passed on without copying)
             screenshots: List of screenshot images
             instruction: User instruction (e.g., "Create an account with name Krishna Kumar and DOB 19 Sep 2000")
             platform: Target platform ("mobile", "web", "auto-detect")
             additional_data: Additional user data
             
-        Returns:
-            Complete workflow results with all agent outputs
+        Yields:
+            A PhaseEvent per finished phase, then one WorkflowCompleteEvent with the workflow results
         """
         if not self.initialized:
             await self.initialize()
         
+        # Already loaded by initialize(); bound here to keep the module import light
+        from app.agents.agent1_blueprint import blueprint_template, plan_cache_key
+        
         workflow_start_time = time.time()
+        phase_events: List[PhaseEvent] = []
         
-        logger.info(f"\\n🚀 ========== UPDATED MULTI-AGENT WORKFLOW STARTED ==========")
-        logger.info(f"🚀 Version: {self.orchestrator_version}")
-        logger.info(f"🚀 Instruction: {instruction}")
-        logger.info(f"🚀 Platform: {platform}")
-        logger.info(f"🚀 Document Size: {len(document_content)} bytes")
-        logger.info(f"🚀 Screenshots: {len(screenshots)}")
-        logger.info(f"🚀 =============================================================")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("\n".join([
+                "\\n🚀 ========== UPDATED MULTI-AGENT WORKFLOW STARTED ==========",
+                f"🚀 Version: {self.orchestrator_version}",
+                f"🚀 Instruction: {instruction}",
+                f"🚀 Platform: {platform}",
+                f"🚀 Document Size: {len(document_content)} bytes",
+                f"🚀 Screenshots: {len(screenshots)}",
+                "🚀 ============================================================="
+            ]))
         
         try:
             # PHASE 1: Agent 1 - Blueprint Generation
-            logger.info(f"\\n🔵 ========== PHASE 1: BLUEPRINT GENERATION ==========")
-            logger.info(f"🔵 Agent 1: Processing document and generating blueprint...")
+            logger.info("\\n🔵 ========== PHASE 1: BLUEPRINT GENERATION ==========\n"
+                        "🔵 Agent 1: Processing document and generating blueprint...")
             
             phase1_start = time.time()
-            agent1_result = await self.agent1.process_and_generate_blueprint(
-                document_content=document_content,
-                screenshots=screenshots,
-                instruction=instruction,
-                platform=platform,
-                additional_data=additional_data
-            )
+            
+            # Identical inputs reuse a cached blueprint plan instead of re-running extraction and OCR
+            cache_key = await asyncio.to_thread(plan_cache_key, document_content, screenshots, instruction, platform)
+            cached_plan = await self.db_manager.get_cached_plan(cache_key)
+            if cached_plan:
+                logger.info("🔵 Plan cache hit - adapting cached blueprint")
+                agent1_result = await self.agent1.adapt_cached_blueprint(
+                    cached_plan, instruction, platform, additional_data, screenshots=screenshots
+                )
+            else:
+                agent1_result = await self.agent1.process_and_generate_blueprint(
+                    document_content=document_content,
+                    screenshots=screenshots,
+                    instruction=instruction,
+                    platform=platform,
+                    additional_data=additional_data
+                )
+                if agent1_result['success']:
+                    await self.db_manager.save_cached_plan(
+                        cache_key,
+                        blueprint_template(agent1_result['blueprint']),
+                        agent1_result['blueprint_confidence'],
+                        agent1_result['text_extracted']
+                    )
             phase1_time = time.time() - phase1_start
             
             if not agent1_result['success']:
@@ -110,18 +237,24 @@ class UpdatedMultiAgentOrchestrator:
             seq_id = agent1_result['seq_id']
             base_path = agent1_result['base_path']
             
-            logger.info(f"🔵 Agent 1 Results:")
-            logger.info(f"🔵   Sequential Task ID: {seq_id}")
-            logger.info(f"🔵   Base Path: {base_path}")
-            logger.info(f"🔵   Blueprint Path: {agent1_result['blueprint_path']}")
-            logger.info(f"🔵   Text Extracted: {agent1_result['text_extracted']} chars")
-            logger.info(f"🔵   UI Elements: {agent1_result['ui_elements']}")
-            logger.info(f"🔵   Automation Steps: {agent1_result['automation_steps']}")
-            logger.info(f"🔵   Blueprint Confidence: {agent1_result['blueprint_confidence']:.2f}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("\n".join([
+                    "🔵 Agent 1 Results:",
+                    f"🔵   Sequential Task ID: {seq_id}",
+                    f"🔵   Base Path: {base_path}",
+                    f"🔵   Blueprint Path: {agent1_result['blueprint_path']}",
+                    f"🔵   Text Extracted: {agent1_result['text_extracted']} chars",
+                    f"🔵   UI Elements: {agent1_result['ui_elements']}",
+                    f"🔵   Automation Steps: {agent1_result['automation_steps']}",
+                    f"🔵   Blueprint Confidence: {agent1_result['blueprint_confidence']:.2f}"
+                ]))
+            
+            phase_events.append(await self._phase_event(1, "blueprint", base_path, agent1_result, phase1_time))
+            yield phase_events[-1]
             
             # PHASE 2: Agent 2 - Code Generation & Configuration  
-            logger.info(f"\\n🟢 ========== PHASE 2: CODE GENERATION & CONFIGURATION ==========")
-            logger.info(f"🟢 Agent 2: Generating automation code and preparing OCR logs...")
+            logger.info("\\n🟢 ========== PHASE 2: CODE GENERATION & CONFIGURATION ==========\n"
+                        "🟢 Agent 2: Generating automation code and preparing OCR logs...")
             
             phase2_start = time.time()
             agent2_result = await self.agent2.generate_code_and_setup(seq_id)
@@ -130,51 +263,69 @@ class UpdatedMultiAgentOrchestrator:
             if not agent2_result['success']:
                 raise Exception(f"Agent 2 failed: {agent2_result.get('error', 'Unknown error')}")
             
-            logger.info(f"🟢 Agent 2 Results:")
-            logger.info(f"🟢   Agent2 Path: {agent2_result['agent2_path']}")
-            logger.info(f"🟢   Script Generated: {agent2_result['script_size']} characters")
-            logger.info(f"🟢   Requirements: {agent2_result['requirements_path']}")
-            logger.info(f"🟢   OCR Logs Prepared: {agent2_result['ocr_logs_path']}")
-            logger.info(f"🟢   Workflow Steps: {agent2_result['steps_count']}")
-            logger.info(f"🟢   Ready for Testing: {'✅' if agent2_result['ready_for_testing'] else '❌'}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("\n".join([
+                    "🟢 Agent 2 Results:",
+                    f"🟢   Agent2 Path: {agent2_result['agent2_path']}",
+                    f"🟢   Script Generated: {agent2_result['script_size']} characters",
+                    f"🟢   Requirements: {agent2_result['requirements_path']}",
+                    f"🟢   OCR Logs Prepared: {agent2_result['ocr_logs_path']}",
+                    f"🟢   Workflow Steps: {agent2_result['steps_count']}",
+                    f"🟢   Ready for Testing: {'✅' if agent2_result['ready_for_testing'] else '❌'}"
+                ]))
+            
+            phase_events.append(await self._phase_event(2, "code_generation", base_path, agent2_result, phase2_time))
+            yield phase_events[-1]
             
             # PHASE 3: Agent 3 - Testing Environment Setup & Execution
-            logger.info(f"\\n🟡 ========== PHASE 3: TESTING ENVIRONMENT & EXECUTION ==========")
-            logger.info(f"🟡 Agent 3: Setting up testing environment and executing tests...")
+            logger.info("\\n🟡 ========== PHASE 3: TESTING ENVIRONMENT & EXECUTION ==========\n"
+                        "🟡 Agent 3: Setting up testing environment and executing tests...")
             
             phase3_start = time.time()
             agent3_result = await self.agent3.setup_and_execute_tests(seq_id)
             phase3_time = time.time() - phase3_start
             
             if not agent3_result['success']:
-                logger.warning(f"🟡 Agent 3 completed with issues: {agent3_result.get('error', 'Unknown error')}")
-            
-            logger.info(f"🟡 Agent 3 Results:")
-            logger.info(f"🟡   Testing Path: {agent3_result.get('testing_path', 'N/A')}")
-            logger.info(f"🟡   Virtual Environment: {'✅' if agent3_result.get('venv_setup', {}).get('success') else '❌'}")
-            logger.info(f"🟡   Dependencies Installed: {'✅' if agent3_result.get('dependencies_installed', {}).get('success') else '❌'}")
-            logger.info(f"🟡   Test Execution: {'✅' if agent3_result.get('overall_test_success') else '❌'}")
-            logger.info(f"🟡   Total Test Attempts: {agent3_result.get('total_attempts', 0)}")
-            logger.info(f"🟡   Agent 2 Collaborations: {agent3_result.get('agent2_collaborations', 0)}")
-            logger.info(f"🟡   Ready for Reporting: {'✅' if agent3_result.get('ready_for_reporting') else '❌'}")
+                logger.warning("🟡 Agent 3 completed with issues: %s", agent3_result.get('error', 'Unknown error'))
+            
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("\n".join([
+                    "🟡 Agent 3 Results:",
+                    f"🟡   Testing Path: {agent3_result.get('testing_path', 'N/A')}",
+                    f"🟡   Virtual Environment: {'✅' if agent3_result.get('venv_setup', {}).get('success') else '❌'}",
+                    f"🟡   Dependencies Installed: {'✅' if agent3_result.get('dependencies_installed', {}).get('success') else '❌'}",
+                    f"🟡   Test Execution: {'✅' if agent3_result.get('overall_test_success') else '❌'}",
+                    f"🟡   Total Test Attempts: {agent3_result.get('total_attempts', 0)}",
+                    f"🟡   Agent 2 Collaborations: {agent3_result.get('agent2_collaborations', 0)}",
+                    f"🟡   Ready for Reporting: {'✅' if agent3_result.get('ready_for_reporting') else '❌'}"
+                ]))
+            
+            phase_events.append(await self._phase_event(3, "testing", base_path, agent3_result, phase3_time))
+            yield phase_events[-1]
             
             # PHASE 4: Agent 4 - Final Reporting & CSV Export
-            logger.info(f"\\n🔵 ========== PHASE 4: FINAL REPORTING & CSV EXPORT ==========")
-            logger.info(f"🔵 Agent 4: Generating final report and exporting data...")
+            logger.info("\\n🔵 ========== PHASE 4: FINAL REPORTING & CSV EXPORT ==========\n"
+                        "🔵 Agent 4: Generating final report and exporting data...")
             
             phase4_start = time.time()
             agent4_result = await self.agent4.generate_final_report(seq_id)
             phase4_time = time.time() - phase4_start
             
             if not agent4_result['success']:
-                logger.warning(f"🔵 Agent 4 failed: {agent4_result.get('error', 'Unknown error')}")
+                logger.warning("🔵 Agent 4 failed: %s", agent4_result.get('error', 'Unknown error'))
             
-            logger.info(f"🔵 Agent 4 Results:")
-            logger.info(f"🔵   Agent4 Path: {agent4_result.get('agent4_path', 'N/A')}")
-            logger.info(f"🔵   Final Report: {agent4_result.get('final_report', {}).get('text_report', 'N/A')}")
-            logger.info(f"🔵   CSV Export: {agent4_result.get('csv_export', {}).get('csv_path', 'N/A')}")
-            logger.info(f"🔵   Conversation Log: {agent4_result.get('conversation_log', {}).get('log_path', 'N/A')}")
-            logger.info(f"🔵   Files Generated: {len(agent4_result.get('files_generated', []))}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("\n".join([
+                    "🔵 Agent 4 Results:",
+                    f"🔵   Agent4 Path: {agent4_result.get('agent4_path', 'N/A')}",
+                    f"🔵   Final Report: {agent4_result.get('final_report', {}).get('text_report', 'N/A')}",
+                    f"🔵   CSV Export: {agent4_result.get('csv_export', {}).get('csv_path', 'N/A')}",
+                    f"🔵   Conversation Log: {agent4_result.get('conversation_log', {}).get('log_path', 'N/A')}",
+                    f"🔵   Files Generated: {len(agent4_result.get('files_generated', []))}"
+                ]))
+            
+            phase_events.append(await self._phase_event(4, "reporting", base_path, agent4_result, phase4_time))
+            yield phase_events[-1]
             
             # Calculate final results
             total_execution_time = time.time() - workflow_start_time
@@ -209,11 +360,10 @@ class UpdatedMultiAgentOrchestrator:
                     "phase3_testing": phase3_time,
                     "phase4_reporting": phase4_time
                 },
+                # Full agent results were written to agentN/result.json as each phase finished
                 "agent_results": {
-                    "agent1": agent1_result,
-                    "agent2": agent2_result,
-                    "agent3": agent3_result,
-                    "agent4": agent4_result
+                    f"agent{event.phase}": {"path": event.result_path, "success": event.success}
+                    for event in phase_events
                 },
                 "folder_structure": {
                     "base_path": base_path,
@@ -230,27 +380,33 @@ class UpdatedMultiAgentOrchestrator:
                 }
             }
             
-            # Save workflow summary to base folder
-            await self._save_workflow_summary(seq_id, base_path, workflow_summary)
-            
-            # Update final task status in database
+            # Save workflow summary to base folder while the final task status is written
             final_status = "completed" if overall_success else "completed_with_issues"
-            await self.db_manager.update_task_status(seq_id, final_status, "orchestrator")
-            
-            logger.info(f"\\n🚀 ========== UPDATED MULTI-AGENT WORKFLOW COMPLETED ==========")
-            logger.info(f"🚀 Overall Result: {'✅ SUCCESS' if overall_success else '⚠️ COMPLETED WITH ISSUES'}")
-            logger.info(f"🚀 Sequential Task ID: {seq_id}")
-            logger.info(f"🚀 Final Confidence: {final_confidence:.3f} ({performance_grade})")
-            logger.info(f"🚀 Total Execution Time: {total_execution_time:.1f} seconds")
-            logger.info(f"🚀 Agent 2-3 Collaborations: {agent3_result.get('agent2_collaborations', 0)}")
-            logger.info(f"🚀 Test Attempts: {agent3_result.get('total_attempts', 0)}")
-            logger.info(f"🚀 Base Path: {base_path}")
-            logger.info(f"🚀 SQLite Database: {self.db_manager.db_path}")
-            logger.info(f"🚀 Testing Environment: {'✅ SET UP' if agent3_result.get('success') else '❌ ISSUES'}")
-            logger.info(f"🚀 Final Report: {'✅ GENERATED' if agent4_result.get('success') else '❌ FAILED'}")
-            logger.info(f"🚀 ================================================================")
-            
-            return {
+            _, status_result = await asyncio.gather(
+                self._save_workflow_summary(seq_id, base_path, workflow_summary),
+                self.db_manager.update_task_status(seq_id, final_status, "orchestrator"),
+                return_exceptions=True
+            )
+            if isinstance(status_result, Exception):
+                logger.error("🔴 Failed to record final status for task %s: %s", seq_id, status_result)
+            
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("\n".join([
+                    "\\n🚀 ========== UPDATED MULTI-AGENT WORKFLOW COMPLETED ==========",
+                    f"🚀 Overall Result: {'✅ SUCCESS' if overall_success else '⚠️ COMPLETED WITH ISSUES'}",
+                    f"🚀 Sequential Task ID: {seq_id}",
+                    f"🚀 Final Confidence: {final_confidence:.3f} ({performance_grade})",
+                    f"🚀 Total Execution Time: {total_execution_time:.1f} seconds",
+                    f"🚀 Agent 2-3 Collaborations: {agent3_result.get('agent2_collaborations', 0)}",
+                    f"🚀 Test Attempts: {agent3_result.get('total_attempts', 0)}",
+                    f"🚀 Base Path: {base_path}",
+                    f"🚀 SQLite Database: {self.db_manager.db_path}",
+                    f"🚀 Testing Environment: {'✅ SET UP' if agent3_result.get('success') else '❌ ISSUES'}",
+                    f"🚀 Final Report: {'✅ GENERATED' if agent4_result.get('success') else '❌ FAILED'}",
+                    "🚀 ================================================================"
+                ]))
+            
+            yield WorkflowCompleteEvent(result={
                 "success": overall_success,
                 "seq_id": seq_id,
                 "base_path": base_path,
@@ -260,24 +416,24 @@ class UpdatedMultiAgentOrchestrator:
                 "workflow_summary": workflow_summary,
                 "message": "✅ Updated multi-agent workflow completed successfully" if overall_success else "⚠️ Workflow completed with some issues",
                 "orchestrator_version": self.orchestrator_version
-            }
+            })
             
         except Exception as e:
             error_msg = f"Updated multi-agent workflow failed: {str(e)}"
-            logger.error(f"🔴 {error_msg}")
+            logger.error("🔴 %s", error_msg)
             
             # Update task as failed if we have seq_id
             if 'seq_id' in locals():
                 await self.db_manager.update_task_status(seq_id, "failed", "orchestrator")
             
-            return {
+            yield WorkflowCompleteEvent(result={
                 "success": False,
                 "error": error_msg,
                 "seq_id": locals().get('seq_id'),
                 "total_execution_time": time.time() - workflow_start_time,
                 "message": f"❌ Updated workflow failed: {error_msg}",
                 "orchestrator_version": self.orchestrator_version
-            }
+            })
     
     async def get_task_status(self, seq_id: int) -> Dict[str, Any]:
         """
@@ -290,35 +446,20 @@ class UpdatedMultiAgentOrchestrator:
             Complete task status information
         """
         try:
-            # Get task info from database
-            task_info = await self.db_manager.get_task_info(seq_id)
+            # Task info, workflow steps and recent communications on separate pooled connections
+            task_info, workflow_steps, communications = await asyncio.gather(
+                self.db_manager.get_task_info(seq_id),
+                self.db_manager.get_workflow_steps(seq_id),
+                self._fetch_all(_SQL_RECENT_COMMS, (seq_id,))
+            )
             if not task_info:
                 return {"error": f"Task {seq_id} not found"}
             
-            # Get workflow steps
-            workflow_steps = await self.db_manager.get_workflow_steps(seq_id)
-            
-            # Get agent communications
-            communications = []
-            async with aiosqlite.connect(self.db_manager.db_path) as db:
-                cursor = await db.execute("""
-                    SELECT * FROM agent_communications WHERE seq_id = ? ORDER BY created_at DESC LIMIT 10
-                """, (seq_id,))
-                
-                rows = await cursor.fetchall()
-                columns = [description[0] for description in cursor.description]
-                communications = [dict(zip(columns, row)) for row in rows]
-            
             # Check folder structure
             base_path = Path(task_info['base_path'])
-            folder_status = {
-                "base_exists": base_path.exists(),
-                "agent1_exists": (base_path / "agent1").exists(),
-                "agent2_exists": (base_path / "agent2").exists(),
-                "agent3_testing_exists": (base_path / "agent3" / "testing").exists(),
-                "agent4_exists": (base_path / "agent4").exists(),
-                "sqlite_db_exists": (base_path / "sqlite_db.sqlite").exists()
-            }
+            folder_status = dict(_folder_snapshot(
+                str(base_path), _mtime_ns(base_path), _mtime_ns(base_path / "agent3")
+            ))
             
             return {
                 "seq_id": seq_id,
@@ -330,7 +471,7 @@ class UpdatedMultiAgentOrchestrator:
             }
             
         except Exception as e:
-            logger.error(f"Task status check failed: {str(e)}")
+            logger.error("Task status check failed: %s", e)
             return {"error": f"Status check failed: {str(e)}"}
     
     async def list_recent_tasks(self, limit: int = 10) -> List[Dict[str, Any]]:
@@ -344,45 +485,53 @@ class UpdatedMultiAgentOrchestrator:
             List of recent task summaries
         """
         try:
-            async with aiosqlite.connect(self.db_manager.db_path) as db:
-                cursor = await db.execute("""
-                    SELECT seq_id, instruction, platform, status, created_at, updated_at
-                    FROM automation_tasks 
-                    ORDER BY created_at DESC 
-                    LIMIT ?
-                """, (limit,))
-                
-                rows = await cursor.fetchall()
-                columns = [description[0] for description in cursor.description]
-                tasks = [dict(zip(columns, row)) for row in rows]
-                
-                return tasks
+            return await self._fetch_all(_SQL_RECENT_TASKS, (limit,))
                 
         except Exception as e:
-            logger.error(f"Recent tasks listing failed: {str(e)}")
+            logger.error("Recent tasks listing failed: %s", e)
             return []
     
+    async def _fetch_all(self, sql: str, params: tuple) -> List[Dict[str, Any]]:
+        """Run a read query on a pooled connection and return rows as dicts"""
+        async with self.db_manager.acquire() as db:
+            cursor = await db.execute(sql, params)
+            rows = await cursor.fetchall()
+            columns = [description[0] for description in cursor.description]
+            return [dict(zip(columns, row)) for row in rows]
+    
+    async def _phase_event(self, phase: int, name: str, base_path: str,
+                           result: Dict[str, Any], timing: float) -> PhaseEvent:
+        """Write a phase's full agent result to agentN/result.json and describe it as an event"""
+        # Best-effort like the summary: a failed write leaves result_path empty, not the task failed
+        try:
+            result_path = Path(base_path) / f"agent{phase}" / "result.json"
+            await asyncio.to_thread(_write_json, result_path, result)
+            result_path = str(result_path)
+        except Exception as e:
+            logger.warning("🟡 Failed to save agent %s result: %s", phase, e)
+            result_path = ""
+        return PhaseEvent(phase, name, result_path, timing, bool(result.get("success", False)))
+    
     async def _save_workflow_summary(self, seq_id: int, base_path: str, summary: Dict[str, Any]):
         """Save comprehensive workflow summary"""
         try:
             summary_path = Path(base_path) / "workflow_summary.json"
             summary_path.parent.mkdir(parents=True, exist_ok=True)
             
-            with open(summary_path, 'w', encoding='utf-8') as f:
-                json.dump(summary, f, indent=2, ensure_ascii=False, default=str)
-            
             # Also save as readable text
             text_summary = self._format_workflow_summary_text(summary)
             text_path = Path(base_path) / "workflow_summary.txt"
             
-            with open(text_path, 'w', encoding='utf-8') as f:
-                f.write(text_summary)
+            # Serialize and write both off the event loop
+            await asyncio.gather(
+                asyncio.to_thread(_write_json, summary_path, summary),
+                asyncio.to_thread(text_path.write_text, text_summary, encoding='utf-8')
+            )
             
-            logger.info(f"🚀 Workflow summary saved: {summary_path}")
-            logger.info(f"🚀 Workflow summary (text): {text_path}")
+            logger.info("🚀 Workflow summary saved: %s (text: %s)", summary_path, text_path)
             
         except Exception as e:
-            logger.warning(f"🟡 Failed to save workflow summary: {str(e)}")
+            logger.warning("🟡 Failed to save workflow summary: %s", e)
     
     def _format_workflow_summary_text(self, summary: Dict[str, Any]) -> str:
         """Format workflow summary as readable text"""
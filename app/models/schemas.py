@@ -2,7 +2,8 @@
 Pydantic models for the automation framework
 """
 from typing import List, Dict, Any, Optional, Union
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+from pydantic.dataclasses import dataclass
 from enum import Enum
 
 class PlatformType(str, Enum):
@@ -18,9 +19,11 @@ class AgentStatus(str, Enum):
 
 class WorkflowState(BaseModel):
     """State object passed between agents in the workflow"""
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    
     task_id: str = Field(..., description="Unique task identifier")
-    document_content: Optional[bytes] = Field(None, description="PDF document content")
-    screenshots: List[bytes] = Field(default_factory=list, description="Screenshot images")
+    document_content: Optional[bytes] = Field(None, repr=False, exclude=True, description="PDF document content")
+    screenshots: List[bytes] = Field(default_factory=list, repr=False, exclude=True, description="Screenshot images")
     parameters: Dict[str, Any] = Field(default_factory=dict, description="User parameters")
     
     # Run directory for artifacts
@@ -40,7 +43,7 @@ class WorkflowState(BaseModel):
     # Agent 3 outputs
     execution_result: Optional[Dict[str, Any]] = Field(None, description="Script execution result")
     execution_logs: List[str] = Field(default_factory=list, description="Execution logs")
-    screenshots_taken: List[bytes] = Field(default_factory=list, description="Screenshots during execution")
+    screenshots_taken: List[bytes] = Field(default_factory=list, repr=False, exclude=True, description="Screenshots during execution")
     
     # Agent 4 outputs
     final_output: Optional[Dict[str, Any]] = Field(None, description="Final validated result")
@@ -79,15 +82,19 @@ class TaskStatus(BaseModel):
     run_dir: Optional[str] = None
     artifacts: Dict[str, Any] = Field(default_factory=dict)
 
-class UIElement(BaseModel):
+# Created per detection / per step: slotted, frozen dataclasses instead of BaseModels
+# (slots apply on Python 3.10+; required fields come first since kw_only needs 3.10 too)
+@dataclass(frozen=True, slots=True, config=ConfigDict(extra='forbid'))
+class UIElement:
     """UI element detected from screenshots"""
     type: str = Field(..., description="Element type (button, input, text, etc.)")
-    text: Optional[str] = Field(None, description="Element text content")
     coordinates: Dict[str, int] = Field(..., description="Element coordinates")
+    text: Optional[str] = Field(None, description="Element text content")
     attributes: Dict[str, Any] = Field(default_factory=dict, description="Element attributes")
     selector: Optional[str] = Field(None, description="CSS/XPath selector")
 
-class BlueprintStep(BaseModel):
+@dataclass(frozen=True, slots=True, config=ConfigDict(extra='forbid'))
+class BlueprintStep:
     """Individual step in the automation blueprint"""
     step_number: int = Field(..., description="Step sequence number")
     action: str = Field(..., description="Action to perform")
@@ -104,14 +111,15 @@ class AutomationBlueprint(BaseModel):
     ui_elements: List[UIElement] = Field(default_factory=list, description="UI elements")
     metadata: Dict[str, Any] = Field(default_factory=dict, description="Additional metadata")
 
-class ExecutionStep(BaseModel):
+@dataclass(frozen=True, slots=True, config=ConfigDict(extra='forbid'))
+class ExecutionStep:
     """Individual execution step result"""
     step_number: int
     action: str
     success: bool
     duration: float
     error: Optional[str] = None
-    screenshot: Optional[bytes] = None
+    screenshot: Optional[bytes] = Field(None, repr=False)
     details: Dict[str, Any] = Field(default_factory=dict)
 
 class ExecutionResult(BaseModel):
@@ -298,6 +298,14 @@ async def cleanup_orchestrators():
         if _terminal_manager and hasattr(_terminal_manager, 'cleanup_processes'):
             _terminal_manager.cleanup_processes()
         
+        # Close the LangGraph checkpointer connection
+        if _langgraph_orchestrator:
+            await _langgraph_orchestrator.aclose()
+        
+        # Optimize and close the testing database
+        db = await get_testing_db()
+        await db.close()
+        
         logger.info("✅ Orchestrator cleanup completed")
     except Exception as e:
         logger.warning(f"⚠️ Cleanup had issues: {str(e)}")
@@ -519,12 +527,14 @@ async def execute_enhanced_workflow_safe(
             "current_phase": "initialization"
         })
         
-        workflow_results = await _enhanced_orchestrator.execute_enhanced_workflow(
-            instruction=instruction,
-            platform=platform,
-            document_data=document_data,
-            screenshots=screenshots or [],
-            additional_data={"temp_task_id": temp_task_id}
+        workflow_results = await _enhanced_orchestrator.scheduler.submit(
+            _enhanced_orchestrator.execute_enhanced_workflow(
+                instruction=instruction,
+                platform=platform,
+                document_data=document_data,
+                screenshots=screenshots or [],
+                additional_data={"temp_task_id": temp_task_id}
+            )
         )
         
         final_status = "completed" if workflow_results.get("overall_success") else "completed_with_issues"
@@ -0,0 +1,25 @@
+"""
+Queued logging - hands root log records to a background listener thread
+"""
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+
+def install_queue_logging() -> Optional[QueueListener]:
+    """Move root handlers behind a QueueHandler so log I/O runs on a listener thread"""
+    root = logging.getLogger()
+    if not root.handlers or any(isinstance(h, QueueHandler) for h in root.handlers):
+        return None
+    log_queue = queue.Queue(-1)
+    listener = QueueListener(log_queue, *root.handlers, respect_handler_level=True)
+    listener.start()
+    root.handlers = [QueueHandler(log_queue)]
+    return listener
+
+
+def remove_queue_logging(listener: QueueListener):
+    """Flush queued records and hand the real handlers back to the root logger"""
+    listener.stop()
+    logging.getLogger().handlers = list(listener.handlers)
@@ -192,12 +192,13 @@ class UpdatedAgent2_CodeGenerator:
         
         try:
             # Record communication in database
-            comm_id = await self.db_manager.create_agent_communication(
+            comm_id = await self.db_manager.save_agent_communication(
                 seq_id=seq_id,
                 from_agent="agent3",
                 to_agent=self.agent_name,
                 message_type="test_feedback",
-                message_content=json.dumps(feedback_data)
+                message_content=json.dumps(feedback_data),
+                status="pending"
             )
             
             # Get current script version